@@ -0,0 +1,114 @@
+"""
+Сжатие ответов API.
+
+gzip доступен всегда, br и zstd - если установлены пакеты brotli
+и zstandard. Порядок предпочтения задаёт RESPONSE_COMPRESSION_ENCODINGS:
+выбирается первый кодек, который принимает клиент (Accept-Encoding).
+Ответы меньше RESPONSE_COMPRESSION_MIN_SIZE байт не сжимаются.
+
+Каждый кодек умеет два режима: быстрый - для сжатия ответа при каждом
+запросе и максимальный - для ответов, которые сжимаются один раз
+и хранятся в кеше (см. api.response_cache).
+"""
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript',
+                      'application/xml', 'text/')
+
+
+def gzip_compress(data, best):
+    return gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
+
+
+def brotli_compress(data, best):
+    return brotli.compress(data, quality=11 if best else 5)
+
+
+def zstd_compress(data, best):
+    return zstandard.ZstdCompressor(level=19 if best else 3).compress(data)
+
+
+CODECS = {'gzip': gzip_compress}
+if brotli is not None:
+    CODECS['br'] = brotli_compress
+if zstandard is not None:
+    CODECS['zstd'] = zstd_compress
+
+
+def available_encodings():
+    """Доступные кодеки в порядке предпочтения."""
+    return [encoding for encoding in settings.RESPONSE_COMPRESSION_ENCODINGS
+            if encoding in CODECS]
+
+
+def parse_accept_encoding(header):
+    """`gzip, br;q=0.5` -> {'gzip': 1.0, 'br': 0.5}."""
+    accepted = {}
+    for part in header.split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def choose_encoding(header, encodings):
+    """Первый из encodings, который принимает клиент, или None."""
+    accepted = parse_accept_encoding(header or '')
+    default = accepted.get('*', 0.0)
+    for encoding in encodings:
+        if accepted.get(encoding, default) > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding, best=False):
+    return CODECS[encoding](data, best)
+
+
+def is_compressible(response):
+    """Ответ можно сжать: тело целиком в памяти, текстовый тип,
+    ещё не сжат и не меньше минимального размера.
+    """
+    return (not response.streaming
+            and not response.has_header('Content-Encoding')
+            and response.get('Content-Type', '').startswith(
+                COMPRESSIBLE_TYPES)
+            and len(response.content)
+            >= settings.RESPONSE_COMPRESSION_MIN_SIZE)
+
+
+def compress_response(response, encoding):
+    """Сжимает ответ кодеком encoding, если это уменьшает его размер."""
+    if not is_compressible(response):
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if encoding is None:
+        return response
+    content = compress(response.content, encoding)
+    if len(content) >= len(response.content):
+        return response
+    response.content = content
+    response['Content-Encoding'] = encoding
+    response['Content-Length'] = str(len(content))
+    return response
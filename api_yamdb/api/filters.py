@@ -1,16 +1,98 @@
 import django_filters
+from django.conf import settings
+from django.db.models import Exists, OuterRef
 
+from reviews.genre_index import bitmap_to_ids, genre_index
 from reviews.models import Title
 
 
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    """Фильтр по списку значений, перечисленных через запятую."""
+
+
 class TitleFilter(django_filters.FilterSet):
-    category = django_filters.CharFilter(
+    GENRE_MODE_ANY = 'any'
+    GENRE_MODE_ALL = 'all'
+    GENRE_MODE_CHOICES = (
+        (GENRE_MODE_ANY, 'Любой из жанров'),
+        (GENRE_MODE_ALL, 'Все жанры'),
+    )
+
+    category = CharInFilter(
         field_name='category__slug',
-        lookup_expr='exact')
-    genre = django_filters.CharFilter(
-        field_name='genre__slug',
-        lookup_expr='exact')
+        lookup_expr='in')
+    genre = CharInFilter(method='filter_genre')
+    genre_exclude = CharInFilter(method='filter_genre')
+    genre_mode = django_filters.ChoiceFilter(
+        choices=GENRE_MODE_CHOICES,
+        method='filter_genre_mode')
+    year_min = django_filters.NumberFilter(
+        field_name='year',
+        lookup_expr='gte')
+    year_max = django_filters.NumberFilter(
+        field_name='year',
+        lookup_expr='lte')
+    rating_min = django_filters.NumberFilter(
+        field_name='rating',
+        lookup_expr='gte')
+    ordering = django_filters.OrderingFilter(
+        fields=(
+            ('name', 'name'),
+            ('year', 'year'),
+            ('rating', 'rating'),
+            ('review_count', 'review_count'),
+            ('weighted_rating', 'weighted_rating'),
+        )
+    )
 
     class Meta():
         model = Title
         fields = ['name', 'year', 'genre', 'category']
+
+    @staticmethod
+    def genre_exists(slugs):
+        """Полусоединение с таблицей связи произведений и жанров.
+        В отличие от JOIN не размножает строки произведений.
+        """
+        return Exists(Title.genre.through.objects.filter(
+            title_id=OuterRef('pk'),
+            genre__slug__in=slugs
+        ))
+
+    def filter_genre(self, queryset, name, value):
+        """Фильтрация по жанрам genre (с режимом genre_mode)
+        и genre_exclude.
+        Условия сначала вычисляются по битовому индексу жанров; если
+        подходящих произведений немного, в БД уходит фильтр по id,
+        иначе - полусоединения EXISTS с таблицей связи.
+        """
+        if name == 'genre_exclude' and self.form.cleaned_data.get('genre'):
+            return queryset
+        include = [slug for slug in self.form.cleaned_data.get('genre') or ()
+                   if slug]
+        exclude = [slug for slug in
+                   self.form.cleaned_data.get('genre_exclude') or ()
+                   if slug]
+        if not include and not exclude:
+            return queryset
+        mode_all = (self.form.cleaned_data.get('genre_mode')
+                    == self.GENRE_MODE_ALL)
+        bitmap = genre_index.resolve(
+            all_of=include if mode_all else (),
+            any_of=() if mode_all else include,
+            none_of=exclude,
+        )
+        if bin(bitmap).count('1') <= settings.GENRE_INDEX_MAX_IDS:
+            return queryset.filter(pk__in=bitmap_to_ids(bitmap))
+        if include and mode_all:
+            for slug in include:
+                queryset = queryset.filter(self.genre_exists([slug]))
+        elif include:
+            queryset = queryset.filter(self.genre_exists(include))
+        if exclude:
+            queryset = queryset.filter(~self.genre_exists(exclude))
+        return queryset
+
+    def filter_genre_mode(self, queryset, name, value):
+        """Режим учитывается в filter_genre."""
+        return queryset
@@ -0,0 +1,81 @@
+"""
+Хранилище ответов для ключей идемпотентности.
+
+Запись хранится в кеше Django под хешем ключа (пользователь, метод, путь,
+значение заголовка Idempotency-Key) и занимает один кортеж: отпечаток
+тела запроса, код ответа, заголовки ответа (без заголовков соединения
+и измерений конкретного запроса) и сжатое тело ответа.
+Пока первый запрос выполняется, под ключом лежит отметка о выполнении
+с коротким временем жизни, чтобы параллельный повтор не выполнил
+запрос второй раз. Записи удаляются кешем по истечении
+IDEMPOTENCY_TTL секунд.
+"""
+import hashlib
+import zlib
+
+PENDING = 'pending'
+DONE = 'done'
+# Заголовки, которые относятся к соединению или к выполнению первого
+# запроса и не повторяются.
+SKIPPED_HEADERS = ('connection', 'keep-alive', 'transfer-encoding',
+                   'content-length', 'set-cookie', 'server-timing',
+                   'x-profile-id')
+
+
+def fingerprint(request):
+    """Отпечаток тела запроса: повтор ключа с другими данными - ошибка."""
+    digest = hashlib.sha256(request.content_type.encode())
+    digest.update(request.body)
+    return digest.hexdigest()[:32]
+
+
+class StoredResponse:
+    __slots__ = ('status', 'headers', 'content')
+
+    def __init__(self, status, headers, content):
+        self.status = status
+        self.headers = headers
+        self.content = content
+
+
+class IdempotencyStore:
+
+    def __init__(self, backend, ttl, pending_ttl, prefix='idempotency'):
+        self.cache = backend
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        self.prefix = prefix
+
+    def make_key(self, *parts):
+        digest = hashlib.sha256('\n'.join(map(str, parts)).encode())
+        return f'{self.prefix}:{digest.hexdigest()}'
+
+    def begin(self, key, body_fingerprint):
+        """
+        Отмечает начало выполнения запроса.
+        Возвращает (True, None), если запрос нужно выполнить,
+        иначе (False, запись): отметка о выполнении или сохранённый ответ.
+        """
+        record = (PENDING, body_fingerprint)
+        if self.cache.add(key, record, self.pending_ttl):
+            return True, None
+        return False, self.cache.get(key)
+
+    def save(self, key, body_fingerprint, response):
+        headers = [(header, value) for header, value in response.items()
+                   if header.lower() not in SKIPPED_HEADERS]
+        self.cache.set(key, (
+            DONE, body_fingerprint, response.status_code, headers,
+            zlib.compress(response.content)
+        ), self.ttl)
+
+    def release(self, key):
+        self.cache.delete(key)
+
+    @staticmethod
+    def load(record):
+        _, _, status, headers, content = record
+        if isinstance(headers, str):
+            # Запись прежнего формата: только тип содержимого.
+            headers = [('Content-Type', headers)]
+        return StoredResponse(status, headers, zlib.decompress(content))
@@ -0,0 +1,243 @@
+"""
+Сбор метрик производительности запросов.
+
+RequestMetrics накапливает данные одного запроса: SQL-запросы и время их
+выполнения, время сериализации. Текущий экземпляр доступен через
+contextvar, поэтому сериализаторы и обёртка курсора БД пишут в него без
+передачи параметров. Каждый SQL-запрос помечается полем сериализатора,
+при обработке которого он выполнен, что позволяет указать источник
+проблемы N+1. MetricsRegistry агрегирует метрики по обработчикам
+(например, `TitleViewSet.list`) в пределах процесса и отдаёт их в
+текстовом формате Prometheus.
+"""
+import threading
+from collections import OrderedDict, defaultdict
+from contextvars import ContextVar
+from time import perf_counter
+
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class NPlusOneQueryError(Exception):
+    """Повторяющиеся SQL-запросы одной формы в строгом режиме."""
+
+
+class RequestMetrics:
+    """Метрики одного запроса."""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.wall_time = 0.0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.field_path = None
+        self.queries = []
+        self.response_size = 0
+        self.view_name = 'unresolved'
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    def query_shapes(self):
+        """SQL без параметров -> список наборов параметров."""
+        shapes = defaultdict(list)
+        for sql, params, _, _ in self.queries:
+            shapes[sql].append(params)
+        return shapes
+
+    def repeated_queries(self, threshold):
+        """Формы SQL-запросов, выполненные не менее threshold раз
+        с разными параметрами: (sql, количество, поля сериализатора).
+        """
+        repeated = []
+        for sql, params_list in self.query_shapes().items():
+            distinct = {repr(params) for params in params_list}
+            if len(distinct) < threshold:
+                continue
+            paths = sorted({path for query, _, _, path in self.queries
+                            if query == sql and path})
+            repeated.append((sql, len(params_list), paths))
+        return repeated
+
+    @property
+    def duplicate_count(self):
+        """Число повторов одинаковых по форме SQL-запросов."""
+        return sum(len(params) - 1 for params in self.query_shapes().values())
+
+    def finish(self, response_size):
+        self.wall_time = perf_counter() - self.started
+        self.response_size = response_size
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing."""
+        return ', '.join((
+            f'app;dur={self.wall_time * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="{self.query_count} queries, '
+            f'{self.duplicate_count} duplicates"',
+            f'ser;dur={self.serializer_time * 1000:.1f}',
+        ))
+
+
+class QueryRecorder:
+    """Обёртка для connection.execute_wrapper, записывающая запросы."""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - start
+            self.metrics.db_time += duration
+            self.metrics.queries.append(
+                (sql, params, duration, self.metrics.field_path)
+            )
+
+
+class TimedRepresentationMixin:
+    """Учитывает время to_representation верхнего уровня
+    в метриках текущего запроса и помечает SQL-запросы полем
+    сериализатора, при обработке которого они выполнены.
+    """
+
+    def to_representation(self, instance):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return super().to_representation(instance)
+        if metrics.serializer_depth:
+            return self._represent_fields(instance, metrics)
+        metrics.serializer_depth += 1
+        start = perf_counter()
+        try:
+            return self._represent_fields(instance, metrics)
+        finally:
+            metrics.serializer_depth -= 1
+            metrics.serializer_time += perf_counter() - start
+
+    def _represent_fields(self, instance, metrics):
+        """Аналог Serializer.to_representation с отметкой текущего поля."""
+        ret = OrderedDict()
+        for field in self._readable_fields:
+            previous_path = metrics.field_path
+            metrics.field_path = f'{type(self).__name__}.{field.field_name}'
+            try:
+                try:
+                    attribute = field.get_attribute(instance)
+                except SkipField:
+                    continue
+                check_for_none = (attribute.pk
+                                  if isinstance(attribute, PKOnlyObject)
+                                  else attribute)
+                ret[field.field_name] = (
+                    None if check_for_none is None
+                    else field.to_representation(attribute)
+                )
+            finally:
+                metrics.field_path = previous_path
+        return ret
+
+
+class ViewMetrics:
+    """Накопленные метрики одного обработчика."""
+
+    def __init__(self):
+        self.count = 0
+        self.wall_time = 0.0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.queries = 0
+        self.duplicates = 0
+        self.response_bytes = 0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+
+    def add(self, metrics):
+        self.count += 1
+        self.wall_time += metrics.wall_time
+        self.db_time += metrics.db_time
+        self.serializer_time += metrics.serializer_time
+        self.queries += metrics.query_count
+        self.duplicates += metrics.duplicate_count
+        self.response_bytes += metrics.response_size
+        for index, bound in enumerate(DURATION_BUCKETS):
+            if metrics.wall_time <= bound:
+                self.buckets[index] += 1
+
+
+class MetricsRegistry:
+    """Метрики обработчиков в пределах процесса."""
+
+    COUNTERS = (
+        ('yamdb_db_duration_seconds_total', 'db_time',
+         'Время выполнения SQL-запросов.'),
+        ('yamdb_db_queries_total', 'queries',
+         'Количество SQL-запросов.'),
+        ('yamdb_db_duplicate_queries_total', 'duplicates',
+         'Количество повторов одинаковых по форме SQL-запросов.'),
+        ('yamdb_serializer_duration_seconds_total', 'serializer_time',
+         'Время сериализации ответа.'),
+        ('yamdb_response_bytes_total', 'response_bytes',
+         'Размер тела ответа.'),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(ViewMetrics)
+
+    def record(self, metrics):
+        with self._lock:
+            self._views[metrics.view_name].add(metrics)
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {name: vars(view).copy()
+                    for name, view in self._views.items()}
+
+    def render_prometheus(self):
+        views = sorted(self.snapshot().items())
+        lines = [
+            '# HELP yamdb_request_duration_seconds Время обработки запроса.',
+            '# TYPE yamdb_request_duration_seconds histogram',
+        ]
+        for name, view in views:
+            for bound, count in zip(DURATION_BUCKETS, view['buckets']):
+                lines.append(
+                    'yamdb_request_duration_seconds_bucket'
+                    f'{{view="{name}",le="{bound}"}} {count}'
+                )
+            lines.append(
+                'yamdb_request_duration_seconds_bucket'
+                f'{{view="{name}",le="+Inf"}} {view["count"]}'
+            )
+            lines.append(
+                f'yamdb_request_duration_seconds_sum{{view="{name}"}} '
+                f'{view["wall_time"]:.6f}'
+            )
+            lines.append(
+                f'yamdb_request_duration_seconds_count{{view="{name}"}} '
+                f'{view["count"]}'
+            )
+        for metric, attribute, description in self.COUNTERS:
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} counter')
+            for name, view in views:
+                lines.append(
+                    f'{metric}{{view="{name}"}} {view[attribute]:g}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,312 @@
+import logging
+import random
+import re
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from api.compression import (available_encodings, choose_encoding,
+                             compress_response)
+from api.idempotency import PENDING, IdempotencyStore, fingerprint
+from api.metrics import (NPlusOneQueryError, QueryRecorder, RequestMetrics,
+                         current_metrics, registry)
+from api.profiling import RequestProfiler, StackSampler
+from api.response_cache import REQUEST_HEADERS, ResponseCache
+from reviews.models import CustomUser
+from reviews.user_state import is_user_active, remember_user
+
+logger = logging.getLogger(__name__)
+
+
+def get_view_name(request, view_func):
+    """Имя обработчика вида `TitleViewSet.list`."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__name__', 'unknown')
+    method = request.method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{cls.__name__}.{actions.get(method, method)}'
+
+
+def get_request_user(request):
+    """
+    Пользователь запроса до аутентификации в DRF:
+    из сессии или по JWT-токену. Для анонима возвращает None.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return authenticated[0] if authenticated else None
+
+
+def get_request_user_id(request):
+    """
+    id пользователя запроса без обращения к БД: из сессии
+    или из проверенного JWT-токена. Для анонима возвращает None.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.pk
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = header and authentication.get_raw_token(header)
+    if not raw_token:
+        return None
+    try:
+        token = authentication.get_validated_token(raw_token)
+    except AuthenticationFailed:
+        return None
+    return token.get(jwt_settings.USER_ID_CLAIM)
+
+
+def is_admin(user):
+    return user is not None and user.has_capability(
+        CustomUser.CAN_ADMINISTER
+    )
+
+
+class PerformanceMiddleware:
+    """
+    Измеряет время обработки запроса, время и количество SQL-запросов,
+    повторы одинаковых запросов, время сериализации и размер ответа.
+    Результаты добавляются в заголовок Server-Timing и в реестр метрик,
+    доступный по адресу /api/v1/_metrics.
+
+    Повторяющиеся запросы одной формы с разными параметрами (признак N+1)
+    в режиме QUERY_GUARD_MODE = 'log' записываются в журнал, а в режиме
+    'strict' приводят к исключению NPlusOneQueryError.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        guard_mode = settings.QUERY_GUARD_MODE
+        if not settings.PERFORMANCE_METRICS_ENABLED and guard_mode == 'off':
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        request.metrics = metrics
+        token = current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(QueryRecorder(metrics))
+                    )
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        metrics.finish(
+            0 if response.streaming else len(response.content)
+        )
+        if guard_mode != 'off':
+            self.check_repeated_queries(metrics, guard_mode)
+        if settings.PERFORMANCE_METRICS_ENABLED:
+            response['Server-Timing'] = metrics.server_timing()
+            registry.record(metrics)
+        return response
+
+    @staticmethod
+    def check_repeated_queries(metrics, guard_mode):
+        repeated = metrics.repeated_queries(settings.QUERY_GUARD_THRESHOLD)
+        if not repeated:
+            return
+        message = '\n'.join(
+            f'{metrics.view_name}: {count} запросов вида "{sql}" '
+            f'в {", ".join(paths) or "коде обработчика"}'
+            for sql, count, paths in repeated
+        )
+        if guard_mode == 'strict':
+            raise NPlusOneQueryError(message)
+        logger.warning('Обнаружены повторяющиеся SQL-запросы (N+1):\n%s',
+                       message)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            metrics.view_name = get_view_name(request, view_func)
+
+
+class ProfilerMiddleware:
+    """
+    Профилирует запрос, если администратор передал заголовок `X-Profile`
+    или параметр `_profile` (значения `sampling`, `cprofile` или `1`),
+    а также случайную долю PROFILER_SAMPLE_RATE всех запросов.
+    Профиль сохраняется в PROFILER_OUTPUT_DIR, имя файла возвращается
+    в заголовке `X-Profile-Id`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sampler = StackSampler(settings.PROFILER_INTERVAL)
+
+    def __call__(self, request):
+        mode = self.get_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        profiler = RequestProfiler(self.sampler, settings.PROFILER_OUTPUT_DIR,
+                                   settings.PROFILER_MAX_FILES)
+        name = request.path.strip('/').replace('/', '_') or 'root'
+        response, filename = profiler.run(
+            mode, name, self.get_response, request
+        )
+        if filename is not None:
+            response['X-Profile-Id'] = filename
+        return response
+
+    @staticmethod
+    def get_mode(request):
+        requested = (request.headers.get('X-Profile')
+                     or request.GET.get('_profile'))
+        if requested and is_admin(get_request_user(request)):
+            if requested in RequestProfiler.MODES:
+                return requested
+            return RequestProfiler.SAMPLING
+        if random.random() < settings.PROFILER_SAMPLE_RATE:
+            return RequestProfiler.SAMPLING
+        return None
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы для клиентов, которые принимают сжатие
+    (см. api.compression).
+    Ответы каталога для анонимов отдаются из кеша уже сжатыми
+    (см. api.response_cache). Перед ответом из кеша проверяются
+    ограничения частоты запросов DRF; если запрос их превышает,
+    он передаётся обработчику, который вернёт ответ 429.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        encodings = available_encodings()
+        encoding = choose_encoding(
+            request.headers.get('Accept-Encoding'), encodings
+        )
+        if not self.is_cacheable(request):
+            return compress_response(self.get_response(request), encoding)
+        store = ResponseCache(cache, settings.RESPONSE_CACHE_TTL)
+        key = store.make_key(request)
+        cached = store.get(key)
+        if cached is not None and self.allow_request(request):
+            metrics = getattr(request, 'metrics', None)
+            if metrics is not None:
+                metrics.view_name = 'ResponseCache.hit'
+            return cached.to_response(encoding)
+        response = self.get_response(request)
+        if (response.status_code != 200 or response.streaming
+                or response.cookies):
+            return compress_response(response, encoding)
+        result = store.save(
+            key, response, encodings, store.ttl_for(request)
+        ).to_response(encoding)
+        for header in REQUEST_HEADERS:
+            if response.has_header(header):
+                result[header] = response[header]
+        return result
+
+    @staticmethod
+    def is_cacheable(request):
+        return (request.method == 'GET'
+                and re.match(settings.RESPONSE_CACHE_URL_PATTERN,
+                             request.path)
+                and 'HTTP_AUTHORIZATION' not in request.META
+                and not request.user.is_authenticated)
+
+    @staticmethod
+    def allow_request(request):
+        return all(
+            throttle().allow_request(request, None)
+            for throttle in api_settings.DEFAULT_THROTTLE_CLASSES
+        )
+
+
+class IdempotencyMiddleware:
+    """
+    Повторный запрос аутентифицированного пользователя с тем же
+    заголовком `Idempotency-Key` (методы IDEMPOTENCY_METHODS) получает
+    сохранённый ответ первого запроса с его заголовками и заголовком
+    `Idempotent-Replayed: true`, не доходя до обработчика. Запрос
+    заблокированного или удалённого пользователя передаётся обработчику,
+    который отклонит его при аутентификации.
+    Повтор ключа с другим телом запроса отклоняется со статусом 422,
+    повтор во время выполнения первого запроса - со статусом 409.
+    Ответы 5xx, 401, 403 и 429 не сохраняются: такой запрос можно
+    повторить.
+    """
+    NOT_STORED = (401, 403, 429)
+    MAX_KEY_LENGTH = 255
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        value = request.headers.get('Idempotency-Key')
+        if not value or request.method not in settings.IDEMPOTENCY_METHODS:
+            return self.get_response(request)
+        user_id = get_request_user_id(request)
+        if user_id is None:
+            return self.get_response(request)
+        if len(value) > self.MAX_KEY_LENGTH:
+            return JsonResponse(
+                {'detail': 'Слишком длинный ключ идемпотентности.'},
+                status=400
+            )
+        store = IdempotencyStore(
+            cache, settings.IDEMPOTENCY_TTL, settings.IDEMPOTENCY_PENDING_TTL
+        )
+        key = store.make_key(user_id, request.method, request.path, value)
+        body_fingerprint = fingerprint(request)
+        started, record = store.begin(key, body_fingerprint)
+        if not started:
+            if not is_user_active(user_id):
+                return self.get_response(request)
+            return self.replay(store, record, body_fingerprint)
+        try:
+            response = self.get_response(request)
+        except Exception:
+            store.release(key)
+            raise
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            remember_user(user)
+        if (response.streaming or response.status_code >= 500
+                or response.status_code in self.NOT_STORED):
+            store.release(key)
+        else:
+            store.save(key, body_fingerprint, response)
+        return response
+
+    @staticmethod
+    def replay(store, record, body_fingerprint):
+        if record is None or record[0] == PENDING:
+            return JsonResponse(
+                {'detail': 'Запрос с этим ключом идемпотентности '
+                           'ещё выполняется.'},
+                status=409
+            )
+        if record[1] != body_fingerprint:
+            return JsonResponse(
+                {'detail': 'Ключ идемпотентности уже использован '
+                           'с другими данными.'},
+                status=422
+            )
+        stored = store.load(record)
+        response = HttpResponse(stored.content, status=stored.status)
+        for header, value in stored.headers:
+            response[header] = value
+        response['Idempotent-Replayed'] = 'true'
+        return response
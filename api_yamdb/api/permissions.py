@@ -3,27 +3,51 @@ from rest_framework import permissions
 from reviews.models import CustomUser
 
 
+def has_capability(user, capability):
+    """Проверка возможности роли; для анонима - всегда False."""
+    return user.is_authenticated and user.has_capability(capability)
+
+
+def is_owner(user, obj):
+    """Объект принадлежит пользователю. Сравниваются id,
+    поэтому связанный автор не загружается из БД.
+    """
+    if isinstance(obj, CustomUser):
+        return obj.pk == user.pk
+    return obj.author_id == user.pk
+
+
+def can_modify(user, obj):
+    """Автор, модератор или администратор может изменять объект."""
+    return user.is_authenticated and (
+        is_owner(user, obj)
+        or user.has_capability(CustomUser.CAN_MODERATE)
+    )
+
+
 class IsOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        return obj.user == request.user
+        return request.user.is_authenticated and is_owner(request.user, obj)
 
 
 class IsAdminUser(permissions.BasePermission):
     def has_permission(self, request, view):
-        return (getattr(request.user, 'role', None)
-                == CustomUser.ADMIN or request.user.is_superuser)
+        return has_capability(request.user, CustomUser.CAN_ADMINISTER)
 
     def has_object_permission(self, request, view, obj):
-        return (getattr(request.user, 'role', None)
-                == CustomUser.ADMIN or request.user.is_superuser)
+        return has_capability(request.user, CustomUser.CAN_ADMINISTER)
 
 
 class IsModeratorIsAdminOrReadonly(permissions.BasePermission):
 
     def has_permission(self, request, view):
         return (request.method in permissions.SAFE_METHODS
-                or request.user.is_authenticated
-                and request.user.role == CustomUser.ADMIN)
+                or has_capability(request.user, CustomUser.CAN_ADMINISTER))
+
+
+class IsModeratorOrAdmin(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return has_capability(request.user, CustomUser.CAN_MODERATE)
 
 
 class IsOwnerIsModeratorIsAdminOrReadOnly(permissions.BasePermission):
@@ -33,6 +57,4 @@ class IsOwnerIsModeratorIsAdminOrReadOnly(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         return (request.method in permissions.SAFE_METHODS
-                or obj.author == request.user
-                or request.user.role == CustomUser.ADMIN
-                or request.user.role == CustomUser.MODERATOR)
+                or can_modify(request.user, obj))
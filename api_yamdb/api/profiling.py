@@ -0,0 +1,149 @@
+"""
+Профилирование отдельных запросов в рабочем окружении.
+
+Поддерживаются два профилировщика:
+- выборочный (sampling): фоновый поток с интервалом PROFILER_INTERVAL
+  снимает стек потока, обрабатывающего запрос, и считает одинаковые стеки.
+  Результат сохраняется в формате folded stacks (`a;b;c 12`), который
+  понимают flamegraph.pl, speedscope и inferno;
+- детерминированный (cprofile): стандартный cProfile, результат
+  сохраняется в формате pstats (.prof).
+
+Один поток-сэмплер обслуживает все профилируемые запросы процесса
+и останавливается, когда их не остаётся.
+"""
+import cProfile
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+
+def fold_stack(frame):
+    """Стек кадра в виде `модуль.функция;...` от корня к вершине."""
+    names = []
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '?')
+        names.append(f'{module}.{frame.f_code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Периодически снимает стеки зарегистрированных потоков."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._targets = {}
+        self._thread = None
+
+    def start(self, ident):
+        with self._lock:
+            self._targets[ident] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='stack-sampler', daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, ident):
+        with self._lock:
+            return self._targets.pop(ident, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._targets:
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for ident, stacks in self._targets.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        stacks[fold_stack(frame)] += 1
+
+
+class RequestProfiler:
+    """Профилирует обработку одного запроса и сохраняет результат.
+    В каталоге хранится не больше max_files последних профилей.
+    """
+
+    SAMPLING = 'sampling'
+    CPROFILE = 'cprofile'
+    MODES = (SAMPLING, CPROFILE)
+    EXTENSIONS = ('.prof', '.folded')
+    MAX_NAME_LENGTH = 80
+
+    def __init__(self, sampler, output_dir, max_files=None):
+        self.sampler = sampler
+        self.output_dir = output_dir
+        self.max_files = max_files
+
+    def run(self, mode, name, func, *args):
+        """Вызывает func(*args) под профилировщиком.
+        Возвращает результат вызова и имя файла с профилем или None,
+        если профиль не удалось сохранить: ошибка записи не должна
+        превращать уже обработанный запрос в ответ 500.
+        """
+        if mode == self.CPROFILE:
+            profile = cProfile.Profile()
+            result = profile.runcall(func, *args)
+            return result, self._save(name, 'prof', profile.dump_stats)
+        ident = threading.get_ident()
+        self.sampler.start(ident)
+        try:
+            result = func(*args)
+        finally:
+            stacks = self.sampler.stop(ident)
+
+        def write(path):
+            with open(path, 'w') as file:
+                for stack, count in stacks.most_common():
+                    file.write(f'{stack} {count}\n')
+        return result, self._save(name, 'folded', write)
+
+    def _save(self, name, extension, write):
+        filename = self._filename(name, extension)
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            write(os.path.join(self.output_dir, filename))
+            self._prune()
+        except OSError:
+            logger.exception('Не удалось сохранить профиль запроса')
+            return None
+        return filename
+
+    def _prune(self):
+        """Удаляет самые старые профили сверх max_files."""
+        if not self.max_files:
+            return
+        profiles = sorted(
+            (entry.stat().st_mtime, entry.path)
+            for entry in os.scandir(self.output_dir)
+            if entry.name.endswith(self.EXTENSIONS)
+        )
+        for _, path in profiles[:-self.max_files]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _filename(self, name, extension):
+        """Имя файла из метки времени, очищенного и укороченного имени
+        запроса и случайного суффикса.
+        """
+        name = re.sub(r'[^\w.-]+', '_', name, flags=re.ASCII)
+        if len(name) > self.MAX_NAME_LENGTH:
+            digest = hashlib.sha1(name.encode()).hexdigest()[:8]
+            name = f'{name[:self.MAX_NAME_LENGTH]}-{digest}'
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        return f'{stamp}-{name}-{uuid.uuid4().hex[:8]}.{extension}'
@@ -0,0 +1,178 @@
+"""
+Кеш ответов каталога в сжатом виде.
+
+Ответ на анонимный GET-запрос к адресам RESPONSE_CACHE_URL_PATTERN
+(списки и страницы произведений, жанров и категорий) сохраняется в кеше
+Django сразу сжатым всеми доступными кодеками с максимальной степенью
+сжатия. Сжатие выполняется один раз при промахе, а попадание отдаёт
+готовые байты без затрат процессора на сериализацию и сжатие.
+
+Ключ записи включает полный адрес запроса (схему и Host, как
+cache_page Django: от них зависят ссылки next и previous) и версию
+каталога в общем кеше. Изменение произведений, жанров или категорий
+увеличивает версию после фиксации транзакции, и старые записи больше
+не читаются (кеш удаляет их по истечении RESPONSE_CACHE_TTL).
+
+Рейтинг меняется с каждым отзывом, и сброс всего кеша на каждый отзыв
+заставлял бы заново сжимать ответы почти при каждом запросе. Поэтому
+изменение рейтинга (reviews.changes.ratings_updated) сбрасывает только
+страницы затронутых произведений и лучшие произведения (titles/top):
+в их ключ входят версии произведения и рейтингов. Списки произведений
+хранятся RESPONSE_CACHE_RATING_TTL секунд, и рейтинг в них отстаёт
+не больше чем на это время.
+"""
+import hashlib
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from api.compression import compress, is_compressible
+from reviews.changes import ratings_updated, titles_updated
+from reviews.deletion import pre_raw_delete
+from reviews.genre_index import bump_shared_version, get_shared_version
+from reviews.models import Category, Genre, Title
+
+CATALOG_VERSION_KEY = 'response_cache:version'
+# Версия рейтингов всех произведений и лучших произведений.
+RATINGS_VERSION_KEY = 'response_cache:ratings'
+TOP_VERSION_KEY = 'response_cache:top'
+TITLE_VERSION_KEY = 'response_cache:title:{}'
+TITLE_DETAIL = re.compile(r'/titles/(\d+)/$')
+# При изменении рейтинга большего числа произведений сбрасываются
+# страницы всех произведений.
+MAX_TITLE_VERSIONS = 100
+IDENTITY = 'identity'
+# Заголовки, которые выставляются заново при ответе из кеша.
+SKIPPED_HEADERS = ('content-length', 'content-encoding', 'server-timing')
+# Заголовки, которые относятся только к запросу, сохранившему ответ.
+REQUEST_HEADERS = ('x-profile-id',)
+
+
+class CachedResponse:
+    __slots__ = ('status', 'headers', 'bodies')
+
+    def __init__(self, status, headers, bodies):
+        self.status = status
+        self.headers = headers
+        self.bodies = bodies
+
+    def to_response(self, encoding):
+        """Ответ с телом, сжатым кодеком encoding, если такое есть."""
+        if encoding not in self.bodies:
+            encoding = IDENTITY
+        content = self.bodies[encoding]
+        response = HttpResponse(content, status=self.status)
+        for header, value in self.headers:
+            response[header] = value
+        if encoding != IDENTITY:
+            response['Content-Encoding'] = encoding
+        if len(self.bodies) > 1:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        response['Content-Length'] = str(len(content))
+        return response
+
+
+class ResponseCache:
+
+    def __init__(self, backend, ttl, prefix='response'):
+        self.cache = backend
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @staticmethod
+    def version_keys(path):
+        """Версии, от которых зависит ответ по адресу path."""
+        keys = [CATALOG_VERSION_KEY]
+        detail = TITLE_DETAIL.search(path)
+        if detail:
+            keys += [RATINGS_VERSION_KEY,
+                     TITLE_VERSION_KEY.format(detail.group(1))]
+        elif path.endswith('/titles/top/'):
+            keys += [RATINGS_VERSION_KEY, TOP_VERSION_KEY]
+        return keys
+
+    def ttl_for(self, request):
+        """Время хранения ответа: списки произведений с рейтингом
+        хранятся RESPONSE_CACHE_RATING_TTL секунд.
+        """
+        if request.path.endswith('/titles/'):
+            return min(self.ttl, settings.RESPONSE_CACHE_RATING_TTL)
+        return self.ttl
+
+    def make_key(self, request):
+        """Ключ ответа для текущих версий данных. Версии читаются до
+        выполнения запроса: если данные изменятся во время его обработки,
+        ответ попадёт в уже устаревшую версию и не будет прочитан.
+        """
+        digest = hashlib.sha256('\n'.join((
+            *(str(get_shared_version(key))
+              for key in self.version_keys(request.path)),
+            request.build_absolute_uri(),
+            request.headers.get('Accept', ''),
+        )).encode())
+        return f'{self.prefix}:{digest.hexdigest()}'
+
+    def get(self, key):
+        record = self.cache.get(key)
+        return CachedResponse(*record) if record is not None else None
+
+    def save(self, key, response, encodings, ttl=None):
+        """Сохраняет ответ с телом, сжатым каждым из encodings."""
+        content = response.content
+        bodies = {IDENTITY: content}
+        if is_compressible(response):
+            for encoding in encodings:
+                compressed = compress(content, encoding, best=True)
+                if len(compressed) < len(content):
+                    bodies[encoding] = compressed
+        headers = [(header, value) for header, value in response.items()
+                   if header.lower() not in SKIPPED_HEADERS + REQUEST_HEADERS]
+        record = (response.status_code, headers, bodies)
+        self.cache.set(key, record, self.ttl if ttl is None else ttl)
+        return CachedResponse(*record)
+
+
+def invalidate_catalog():
+    bump_shared_version(CATALOG_VERSION_KEY)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(m2m_changed, sender=Title.genre.through)
+@receiver(pre_raw_delete, sender=Title)
+@receiver(pre_raw_delete, sender=Genre)
+@receiver(pre_raw_delete, sender=Category)
+@receiver(titles_updated, sender=Title)
+def catalog_changed(sender, **kwargs):
+    """Сбрасывает кеш ответов каталога после фиксации изменения."""
+    if kwargs.get('action', 'post').startswith('pre'):
+        return
+    transaction.on_commit(invalidate_catalog)
+
+
+def invalidate_ratings(title_ids):
+    keys = [TOP_VERSION_KEY]
+    if title_ids is None or len(title_ids) > MAX_TITLE_VERSIONS:
+        keys.append(RATINGS_VERSION_KEY)
+    else:
+        keys += [TITLE_VERSION_KEY.format(title_id)
+                 for title_id in title_ids]
+    for key in keys:
+        bump_shared_version(key)
+
+
+@receiver(ratings_updated, sender=Title)
+def ratings_changed(sender, title_ids=None, **kwargs):
+    """Сбрасывает страницы произведений с изменённым рейтингом и лучшие
+    произведения после фиксации изменения.
+    """
+    transaction.on_commit(lambda: invalidate_ratings(title_ids))
@@ -1,13 +1,107 @@
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
+from django.db import IntegrityError, transaction
+from django.utils.encoding import smart_str
 from rest_framework import serializers
-from rest_framework.relations import SlugRelatedField
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField, SlugRelatedField
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueValidator
 
-from reviews.models import Category, Comment, CustomUser, Genre, Review, Title
+from api.metrics import TimedRepresentationMixin
+from reviews.models import (Category, Comment, CustomUser, Genre,
+                            ModerationJob, Review, Title)
+from reviews.reference_cache import REFERENCES, categories, genres
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class ModelSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    """Базовый сериализатор с учётом времени сериализации в метриках."""
+
+
+def sparse_fields(request, fields):
+    """
+    Поля ответа, выбранные параметрами запроса fields и omit (списки
+    через запятую), в порядке fields. None - параметры не заданы или
+    запрос не безопасный.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = request.query_params
+    if 'fields' not in params and 'omit' not in params:
+        return None
+    chosen = {}
+    for param in ('fields', 'omit'):
+        names = [name.strip() for name in params.get(param, '').split(',')
+                 if name.strip()]
+        unknown = [name for name in names if name not in fields]
+        if unknown:
+            raise serializers.ValidationError({param: [
+                f'Неизвестные поля: {", ".join(unknown)}. '
+                f'Допустимые поля: {", ".join(fields)}.']})
+        chosen[param] = set(names)
+    selected = chosen['fields'] or set(fields)
+    return tuple(name for name in fields
+                 if name in selected and name not in chosen['omit'])
+
+
+class SparseFieldsMixin:
+    """Вывод только полей, выбранных параметрами fields и omit."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = sparse_fields(self.context.get('request'),
+                                 self.Meta.fields)
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+
+class CachedSlugRelatedField(SlugRelatedField):
+    """Объект справочника по слагу из копии в памяти процесса."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('slug_field', 'slug')
+        super().__init__(**kwargs)
+        self.reference = REFERENCES[self.queryset.model]
+
+    def to_internal_value(self, data):
+        slug = smart_str(data)
+        found = self.reference.by_slugs([slug])
+        if slug not in found:
+            self.fail('does_not_exist', slug_name=self.slug_field,
+                      value=slug)
+        return found[slug]
+
+
+class SlugManyRelatedField(ManyRelatedField):
+    """Список объектов по слагам, получаемый одним запросом
+    или из копии справочника.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        slugs = [smart_str(value) for value in data]
+        if isinstance(child, CachedSlugRelatedField):
+            objects = child.reference.by_slugs(slugs)
+        else:
+            objects = {
+                getattr(obj, child.slug_field): obj
+                for obj in child.get_queryset().filter(
+                    **{f'{child.slug_field}__in': slugs}
+                )
+            }
+        for slug in slugs:
+            if slug not in objects:
+                child.fail('does_not_exist',
+                           slug_name=child.slug_field, value=slug)
+        return [objects[slug] for slug in slugs]
+
+
+class CategorySerializer(ModelSerializer):
     """Сериализатор категории произведения."""
 
     class Meta:
@@ -16,7 +110,7 @@ class CategorySerializer(serializers.ModelSerializer):
         lookup_field = 'slug'
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(ModelSerializer):
     """Сериализатор жанра произведения."""
 
     class Meta:
@@ -25,7 +119,36 @@ class GenreSerializer(serializers.ModelSerializer):
         lookup_field = 'slug'
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class CachedGenresField(serializers.Field):
+    """Жанры произведения: id из prefetch_related('genre') или только что
+    записанные, названия и слаги - из копии справочника.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, title):
+        genre_ids = getattr(title, '_genre_ids', None)
+        if genre_ids is None:
+            genre_ids = [genre.pk for genre in title.genre.all()]
+        return genres.get_many(genre_ids)
+
+
+class CachedCategoryField(serializers.Field):
+    """Категория произведения из копии справочника."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        kwargs['source'] = 'category_id'
+        super().__init__(**kwargs)
+
+    def to_representation(self, category_id):
+        return categories.get(category_id)
+
+
+class ReviewSerializer(SparseFieldsMixin, ModelSerializer):
     """Сериализатор отзыва на произведение."""
     author = SlugRelatedField(slug_field='username', read_only=True)
 
@@ -34,17 +157,52 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'score', 'pub_date',)
         read_only_fields = ('title', 'pub_date',)
 
-    def validate(self, data):
-        if Review.objects.filter(
-            author=self.context['request'].user,
-            title=self.context['view'].kwargs['title_id']
-        ).exists():
-            raise serializers.ValidationError(
-                'Нельзя отправить отзыв на этот фильм второй раз')
-        return data
+    def create(self, validated_data):
+        """Повторный отзыв отсекается ограничением unique_author_title
+        в БД, без предварительного запроса на существование.
+        """
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Нельзя отправить отзыв на этот фильм второй раз'
+                ]
+            })
+
+
+class BulkReviewSerializer(ModelSerializer):
+    """
+    Элемент пакетного создания отзывов.
+    Произведение и автор проверяются одним запросом на весь пакет,
+    поэтому здесь передаются как id и username.
+    """
+    title = serializers.IntegerField(required=False)
+    author = serializers.CharField(max_length=150, required=False)
+
+    class Meta:
+        model = Review
+        fields = ('title', 'author', 'text', 'score')
+
+
+class BulkTitleSerializer(ModelSerializer):
+    """
+    Элемент пакетной загрузки произведений: с id произведение
+    перезаписывается, без id - создаётся. Жанры и категория ищутся
+    в справочниках сразу для всего пакета, поэтому здесь передаются
+    как слаги.
+    """
+    id = serializers.IntegerField(required=False)
+    genre = serializers.ListField(child=serializers.SlugField(max_length=50))
+    category = serializers.SlugField(max_length=50)
+
+    class Meta:
+        model = Title
+        fields = ('id', 'name', 'year', 'description', 'genre', 'category')
 
 
-class ReviewPatchSerializer(serializers.ModelSerializer):
+class ReviewPatchSerializer(ModelSerializer):
     """Сериализатор отзыва на произведение."""
     author = SlugRelatedField(slug_field='username', read_only=True)
 
@@ -54,41 +212,59 @@ class ReviewPatchSerializer(serializers.ModelSerializer):
         read_only_fields = ('title', 'pub_date',)
 
 
-class TitleSafeRequestSerializer(serializers.ModelSerializer):
+class TitleSafeRequestSerializer(SparseFieldsMixin, ModelSerializer):
     """
     Сериализатор произведения для безопасных запросов.
     Необходим для вывода информации о жанре и категории в виде словаря.
+    Жанры загружаются через prefetch_related, категория и названия
+    жанров берутся из копий справочников.
     """
-    genre = GenreSerializer(many=True, read_only=True)
-    category = CategorySerializer(read_only=True)
+    genre = CachedGenresField()
+    category = CachedCategoryField()
     rating = serializers.IntegerField(read_only=True)
+    weighted_rating = serializers.FloatField(read_only=True)
 
     class Meta:
         model = Title
-        fields = ('id', 'name', 'year',
-                  'description', 'genre', 'category', 'rating')
+        fields = ('id', 'name', 'year', 'description', 'genre',
+                  'category', 'rating', 'weighted_rating')
 
 
-class TitleUnsafeRequestSerializer(serializers.ModelSerializer):
+class TitleUnsafeRequestSerializer(ModelSerializer):
     """
     Сериализатор произведения для небезопасных запросов.
     Необходим для получения информации о жанре и категории в виде слага.
     """
-    genre = SlugRelatedField(
-        slug_field='slug',
-        queryset=Genre.objects.all(),
-        many=True
-    )
-    category = SlugRelatedField(
-        slug_field='slug',
-        queryset=Category.objects.all()
+    genre = SlugManyRelatedField(
+        child_relation=CachedSlugRelatedField(queryset=Genre.objects.all())
     )
+    category = CachedSlugRelatedField(queryset=Category.objects.all())
 
     class Meta:
         model = Title
         fields = (
             'name', 'year', 'description', 'genre', 'category')
 
+    def create(self, validated_data):
+        """У нового произведения нет жанров: связи только добавляются,
+        без сравнения с текущим набором, как в set().
+        """
+        genre = validated_data.pop('genre', [])
+        title = super().create(validated_data)
+        title.genre.add(*genre)
+        return title
+
+    def save(self, **kwargs):
+        """Запоминает жанры произведения для ответа, чтобы не
+        перечитывать их из БД.
+        """
+        title = super().save(**kwargs)
+        if 'genre' in self.validated_data:
+            title._genre_ids = [
+                genre.pk for genre in self.validated_data['genre']
+            ]
+        return title
+
     def to_representation(self, title):
         """Переопределение стандартного метода.
         Информация о жанре и категории выводится в виде слага.
@@ -97,7 +273,7 @@ class TitleUnsafeRequestSerializer(serializers.ModelSerializer):
         return serializer.data
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, ModelSerializer):
     """Сериализатор комментария к отзыву на произведение."""
     author = SlugRelatedField(slug_field='username', read_only=True)
 
@@ -107,13 +283,47 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ('review',)
 
 
+class BulkCommentSerializer(ModelSerializer):
+    """Элемент пакетного создания комментариев."""
+    author = serializers.CharField(max_length=150, required=False)
+
+    class Meta:
+        model = Comment
+        fields = ('author', 'text')
+
+
+class ModerationJobSerializer(ModelSerializer):
+    """Сериализатор задания массовой модерации."""
+    moderator = SlugRelatedField(slug_field='username', read_only=True)
+
+    class Meta:
+        model = ModerationJob
+        fields = ('id', 'target', 'action', 'author', 'title_id',
+                  'date_from', 'date_to', 'text', 'moderator', 'status',
+                  'total', 'processed', 'error', 'created', 'finished')
+        read_only_fields = ('status', 'total', 'processed', 'error',
+                            'created', 'finished')
+
+    def validate(self, data):
+        if not any(data.get(field) not in (None, '') for field in (
+                'author', 'title_id', 'date_from', 'date_to', 'text')):
+            raise serializers.ValidationError(
+                'Укажите хотя бы один фильтр: author, title_id, '
+                'date_from, date_to или text.')
+        if (data.get('date_from') and data.get('date_to')
+                and data['date_from'] >= data['date_to']):
+            raise serializers.ValidationError(
+                {'date_to': 'Конец периода должен быть позже начала.'})
+        return data
+
+
 def validate_username_not_me(value):
     """Валидатор, запрещающий использование me в качестве username."""
     if value.lower() == 'me':
         raise ValidationError('Username cannot be "me".')
 
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(ModelSerializer):
     """Базовый сериализатор Пользователя."""
     username = serializers.CharField(
         max_length=150,
@@ -132,7 +342,24 @@ class CustomUserSerializer(serializers.ModelSerializer):
                   'last_name', 'bio', 'role')
 
 
-class CustomTokenDateNotNull(serializers.ModelSerializer):
+class SignUpSerializer(serializers.Serializer):
+    """
+    Сериализатор регистрации. Проверяет формат данных без запросов к БД:
+    занятость username и email проверяется в обработчике одним запросом.
+    """
+    username = serializers.CharField(
+        max_length=150,
+        validators=[
+            RegexValidator(
+                regex=r'^[\w.@+-]+\Z',
+                message='Используются недопустимые символы в username'
+            ), validate_username_not_me
+        ]
+    )
+    email = serializers.EmailField(max_length=254)
+
+
+class CustomTokenDateNotNull(ModelSerializer):
     """Сериализатор токена."""
     confirmation_code = serializers.CharField(max_length=100, required=True)
     username = serializers.CharField(max_length=150, required=True)
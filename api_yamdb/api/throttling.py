@@ -0,0 +1,151 @@
+"""
+Ограничение частоты запросов по алгоритму «ведро с токенами».
+
+Ведро вмещает num токенов и пополняется со скоростью num за период
+(частота задаётся в DEFAULT_THROTTLE_RATES в формате DRF: `10/min`),
+каждый запрос забирает один токен. Поэтому клиент может сделать до num
+запросов подряд, а дальше - не чаще, чем позволяет скорость пополнения.
+Ключ ведра - область (scope) и пользователь, для анонима - IP-адрес.
+
+Счётчики хранятся вне БД (THROTTLE_STORE):
+- `local` - словарь в памяти процесса, разбитый на сегменты со своими
+  блокировками; подходит для одного узла;
+- `cache` - кеш Django, общий для нескольких узлов. Кеш не умеет
+  атомарно сравнивать и заменять значение, поэтому ведро в нём
+  приближается скользящим окном из двух счётчиков, изменяемых
+  атомарными add/incr.
+Проверка в обоих случаях занимает O(1).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """`10/min` -> (10, 60): ёмкость ведра и период пополнения."""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class LocalBucketStore:
+    """Вёдра в памяти процесса.
+    Каждый сегмент хранит не больше max_keys вёдер; при переполнении
+    удаляется ведро, к которому дольше всех не обращались.
+    """
+
+    def __init__(self, shards=16, max_keys=100_000):
+        self.max_keys = max(1, max_keys // shards)
+        self._shards = [(threading.Lock(), {}) for _ in range(shards)]
+
+    def consume(self, key, capacity, rate, now):
+        """Забирает токен. Возвращает (разрешено, секунд до токена)."""
+        lock, buckets = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            tokens, updated = buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            buckets[key] = (tokens, now)
+            if len(buckets) > self.max_keys:
+                del buckets[next(iter(buckets))]
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def clear(self):
+        for lock, buckets in self._shards:
+            with lock:
+                buckets.clear()
+
+
+class CacheBucketStore:
+    """Приближение ведра скользящим окном в общем кеше.
+    Окно равно времени полного пополнения ведра; число запросов в нём
+    оценивается как счётчик текущего окна плюс доля счётчика
+    предыдущего.
+    """
+
+    def __init__(self, backend, prefix='throttle'):
+        self.cache = backend
+        self.prefix = prefix
+
+    def consume(self, key, capacity, rate, now):
+        window = capacity / rate
+        number = int(now // window)
+        elapsed = now - number * window
+        current = f'{self.prefix}:{key}:{number}'
+        timeout = int(window * 2) + 1
+        self.cache.add(current, 0, timeout)
+        try:
+            count = self.cache.incr(current)
+        except ValueError:
+            self.cache.set(current, 1, timeout)
+            count = 1
+        previous = self.cache.get(f'{self.prefix}:{key}:{number - 1}', 0)
+        estimate = previous * (1 - elapsed / window) + count
+        if estimate <= capacity:
+            return True, 0
+        self.cache.decr(current)
+        return False, (estimate - capacity) / rate
+
+
+local_store = LocalBucketStore()
+
+
+def get_store():
+    if settings.THROTTLE_STORE == 'cache':
+        return CacheBucketStore(cache)
+    return local_store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Ведро с токенами для области scope.
+    methods ограничивает проверку методами запроса.
+    """
+    scope = None
+    methods = None
+
+    def allow_request(self, request, view):
+        if self.methods is not None and request.method not in self.methods:
+            return True
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if rate is None:
+            return True
+        capacity, period = parse_rate(rate)
+        allowed, self.wait_time = get_store().consume(
+            self.get_cache_key(request), capacity, capacity / period,
+            time.time()
+        )
+        return allowed
+
+    def get_cache_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'{self.scope}:user:{request.user.pk}'
+        return f'{self.scope}:ip:{self.get_ident(request)}'
+
+    def wait(self):
+        return self.wait_time
+
+
+class SignupThrottle(TokenBucketThrottle):
+    scope = 'signup'
+
+
+class TokenThrottle(TokenBucketThrottle):
+    scope = 'token'
+
+
+class ReadThrottle(TokenBucketThrottle):
+    scope = 'reads'
+    methods = SAFE_METHODS
+
+
+class WriteThrottle(TokenBucketThrottle):
+    scope = 'writes'
+    methods = ('POST', 'PUT', 'PATCH', 'DELETE')
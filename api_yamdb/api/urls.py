@@ -2,8 +2,9 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter, SimpleRouter
 
 from .views import (CategoryViewSet, CommentViewSet, CustomTokenObtainPairView,
-                    GenreViewSet, ReviewViewSet, TitleViewSet, UserProfileView,
-                    UserSignUpView, UserViewSet)
+                    GenreViewSet, MetricsView, ModerationJobViewSet,
+                    ReviewBulkView, ReviewViewSet, TitleViewSet,
+                    UserProfileView, UserSignUpView, UserViewSet)
 
 router_title_genre_category = DefaultRouter()
 router_title_genre_category.register(
@@ -30,6 +31,11 @@ router_comment.register(r'comments', CommentViewSet, basename='comments')
 
 router_users = SimpleRouter()
 router_users.register(r'users', UserViewSet, basename='users')
+router_users.register(
+    r'moderation/jobs',
+    ModerationJobViewSet,
+    basename='moderation-jobs'
+)
 
 
 urlpatterns = [
@@ -38,9 +44,11 @@ urlpatterns = [
          include(router_review.urls)),
     path('titles/<int:title_id>/reviews/<int:review_id>/',
          include(router_comment.urls)),
+    path('reviews/bulk/', ReviewBulkView.as_view(), name='reviews-bulk'),
     path('auth/token/', CustomTokenObtainPairView.as_view(),
          name='token_obtain_pair'),
     path('auth/signup/', UserSignUpView.as_view(), name='registration'),
     path('users/me/', UserProfileView.as_view(), name='user-profile'),
+    path('_metrics', MetricsView.as_view(), name='metrics'),
 ]
 urlpatterns += router_users.urls
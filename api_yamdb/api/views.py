@@ -1,28 +1,47 @@
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
 from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import CreateAPIView
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.relations import SlugRelatedField
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from api.filters import TitleFilter
+from api.metrics import registry
 from api.permissions import (IsAdminUser, IsModeratorIsAdminOrReadonly,
-                             IsOwner, IsOwnerIsModeratorIsAdminOrReadOnly)
-from api.serializers import (CategorySerializer, CommentSerializer,
-                             CustomTokenCodeValidate, CustomTokenDateNotNull,
-                             CustomUserSerializer, GenreSerializer,
-                             ReviewPatchSerializer, ReviewSerializer,
+                             IsModeratorOrAdmin, IsOwner,
+                             IsOwnerIsModeratorIsAdminOrReadOnly)
+from api.serializers import (BulkCommentSerializer, BulkReviewSerializer,
+                             BulkTitleSerializer, CategorySerializer,
+                             CommentSerializer, CustomTokenCodeValidate,
+                             CustomTokenDateNotNull, GenreSerializer,
+                             ModerationJobSerializer, ReviewPatchSerializer,
+                             ReviewSerializer, SignUpSerializer,
                              TitleSafeRequestSerializer,
                              TitleUnsafeRequestSerializer,
-                             UserProfileSerializer, UserSerializer)
-from reviews.models import Category, CustomUser, Genre, Review, Title
+                             UserProfileSerializer, UserSerializer,
+                             sparse_fields)
+from api.throttling import SignupThrottle, TokenThrottle
+from reviews.bulk import (bulk_create_comments, bulk_create_reviews,
+                          bulk_upsert_titles)
+from reviews.deletion import delete_queryset
+from reviews.models import (Category, Comment, CustomUser, Genre,
+                            ModerationJob, Review, Title)
+from reviews.moderation import start_job
+from reviews.purge import soft_delete_title, soft_delete_user
+from reviews.reference_cache import categories, genres
 
 
 class ListCreateDeleteModelViewSet(mixins.ListModelMixin,
@@ -32,55 +51,392 @@ class ListCreateDeleteModelViewSet(mixins.ListModelMixin,
     pass
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class NestedParentMixin:
+    """
+    Вложенный ресурс (отзывы произведения, комментарии к отзыву).
+    Родительский объект не загружается при чтении: список строится одним
+    запросом с фильтром по id родителя из URL, а существование родителя
+    проверяется через EXISTS только если список оказался пустым.
+    При создании родитель проверяется один раз за запрос.
+    """
+    parent_model = None
+    parent_lookups = {}
+    parent_filters = {}
+
+    def get_parent_filter(self):
+        return {**self.parent_filters,
+                **{field: self.kwargs.get(kwarg)
+                   for field, kwarg in self.parent_lookups.items()}}
+
+    def check_parent_exists(self):
+        if hasattr(self, '_parent_exists'):
+            return
+        if not self.parent_model.objects.filter(
+                **self.get_parent_filter()).exists():
+            raise Http404
+        self._parent_exists = True
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page:
+            self.check_parent_exists()
+        return page
+
+
+class SparseFieldsetMixin:
+    """
+    Для ответа с полями, выбранными параметрами fields и omit, из БД
+    загружаются только нужные колонки, а связанные таблицы
+    присоединяются, только если их поля выводятся.
+    sparse_columns - колонки для полей ответа, которые не совпадают
+    с колонками по имени; поле без колонок - пустой кортеж.
+    sparse_prefetches - prefetch_related для полей ответа: выполняется,
+    только если поле выводится.
+    """
+    sparse_columns = {}
+    sparse_prefetches = {}
+
+    def prune_queryset(self, queryset, serializer_class=None):
+        serializer_class = serializer_class or self.get_serializer_class()
+        selected = sparse_fields(self.request, serializer_class.Meta.fields)
+        if selected is None:
+            return queryset
+        columns = set()
+        for name in selected:
+            columns.update(self.sparse_columns.get(name, (name,)))
+        related = {column.split('__')[0] for column in columns
+                   if '__' in column}
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        prefetches = [lookup for name, lookup in self.sparse_prefetches.items()
+                      if name in selected]
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        return queryset.only('pk', *columns)
+
+
+class BulkCreateMixin:
+    """
+    Пакетное создание и обновление объектов: до BULK_MAX_ITEMS элементов
+    в одном запросе. Каждый элемент проверяется сериализатором отдельно,
+    а связанные объекты (авторы, произведения) ищутся одним запросом
+    на весь пакет. В ответе возвращается статус каждого элемента;
+    код ответа 201, если созданы все элементы, 200, если все элементы
+    записаны, иначе 207.
+    """
+
+    def get_bulk_items(self, request, serializer_class, max_items=None):
+        items = request.data
+        max_items = max_items or settings.BULK_MAX_ITEMS
+        if not isinstance(items, list):
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Ожидается список объектов.']})
+        if not items:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Список объектов пуст.']})
+        if len(items) > max_items:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                f'Не больше {max_items} объектов в одном запросе.']})
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = serializer_class(data=item)
+            if serializer.is_valid():
+                valid.append((index, dict(serializer.validated_data)))
+            else:
+                results[index] = self.bulk_error(
+                    index, status.HTTP_400_BAD_REQUEST, serializer.errors)
+        return results, valid
+
+    def resolve_authors(self, request, results, valid):
+        """
+        Подставляет автора каждому элементу. Указать другого автора
+        может только модератор или администратор.
+        """
+        user = request.user
+        privileged = user.has_capability(CustomUser.CAN_MODERATE)
+        authors = {user.username: user}
+        usernames = {data['author'] for _, data in valid
+                     if data.get('author')} - authors.keys()
+        if usernames and privileged:
+            authors.update(
+                (author.username, author)
+                for author in CustomUser.objects.filter(
+                    username__in=usernames)
+            )
+        resolved = []
+        for index, data in valid:
+            username = data.pop('author', None) or user.username
+            if username not in authors and not privileged:
+                results[index] = self.bulk_error(
+                    index, status.HTTP_403_FORBIDDEN,
+                    {'author': ['Недостаточно прав для указания автора.']})
+            elif username not in authors:
+                results[index] = self.bulk_error(
+                    index, status.HTTP_400_BAD_REQUEST,
+                    {'author': ['Пользователь не найден.']})
+            else:
+                resolved.append((index, data, authors[username]))
+        return resolved
+
+    def create_reviews_in_bulk(self, request, title_id=None):
+        """Отзывы на одно произведение (title_id) или на разные,
+        если произведение указано в каждом элементе.
+        """
+        results, valid = self.get_bulk_items(request, BulkReviewSerializer)
+        if title_id is not None:
+            for _, data in valid:
+                data['title'] = title_id
+        else:
+            title_ids = {data['title'] for _, data in valid
+                         if 'title' in data}
+            existing = set(Title.objects.filter(
+                pk__in=title_ids, is_deleted=False
+            ).values_list('pk', flat=True))
+            checked = []
+            for index, data in valid:
+                if 'title' not in data:
+                    results[index] = self.bulk_error(
+                        index, status.HTTP_400_BAD_REQUEST,
+                        {'title': ['Обязательное поле.']})
+                elif data['title'] not in existing:
+                    results[index] = self.bulk_error(
+                        index, status.HTTP_404_NOT_FOUND,
+                        {'title': ['Произведение не найдено.']})
+                else:
+                    checked.append((index, data))
+            valid = checked
+        reviews = [
+            (index, Review(title_id=data['title'], author=author,
+                           text=data['text'], score=data['score']))
+            for index, data, author in self.resolve_authors(
+                request, results, valid)
+        ]
+        _, skipped = bulk_create_reviews([review for _, review in reviews])
+        skipped = {id(review) for review in skipped}
+        for index, review in reviews:
+            if id(review) in skipped:
+                results[index] = self.bulk_error(
+                    index, status.HTTP_400_BAD_REQUEST,
+                    {api_settings.NON_FIELD_ERRORS_KEY: [
+                        'Нельзя отправить отзыв на этот фильм второй раз']})
+            else:
+                results[index] = self.bulk_created(
+                    index, ReviewSerializer(review).data)
+        return self.bulk_response(results)
+
+    def create_comments_in_bulk(self, request, review_id):
+        results, valid = self.get_bulk_items(request, BulkCommentSerializer)
+        comments = [
+            (index, Comment(review_id=review_id, author=author,
+                            text=data['text']))
+            for index, data, author in self.resolve_authors(
+                request, results, valid)
+        ]
+        bulk_create_comments([comment for _, comment in comments])
+        for index, comment in comments:
+            results[index] = self.bulk_created(
+                index, CommentSerializer(comment).data)
+        return self.bulk_response(results)
+
+    def upsert_titles_in_bulk(self, request):
+        """
+        Произведения с id перезаписываются, без id - создаются.
+        Слаги жанров и категорий всего пакета ищутся в справочниках
+        одним обращением, в ответе - только id произведений.
+        """
+        results, valid = self.get_bulk_items(
+            request, BulkTitleSerializer, settings.TITLE_BULK_MAX_ITEMS)
+        found_genres = genres.by_slugs(
+            {slug for _, data in valid for slug in data['genre']})
+        found_categories = categories.by_slugs(
+            {data['category'] for _, data in valid})
+        ids = {data['id'] for _, data in valid if 'id' in data}
+        existing = set(Title.objects.filter(
+            pk__in=ids, is_deleted=False
+        ).values_list('pk', flat=True)) if ids else set()
+        does_not_exist = SlugRelatedField.default_error_messages[
+            'does_not_exist']
+        seen = set()
+        created, updated = [], []
+        for index, data in valid:
+            missing = [slug for slug in data['genre']
+                       if slug not in found_genres]
+            if data['category'] not in found_categories:
+                missing = None
+            title_id = data.get('id')
+            if missing:
+                results[index] = self.bulk_error(
+                    index, status.HTTP_400_BAD_REQUEST,
+                    {'genre': [does_not_exist.format(
+                        slug_name='slug', value=slug) for slug in missing]})
+            elif missing is None:
+                results[index] = self.bulk_error(
+                    index, status.HTTP_400_BAD_REQUEST,
+                    {'category': [does_not_exist.format(
+                        slug_name='slug', value=data['category'])]})
+            elif title_id is not None and title_id not in existing:
+                results[index] = self.bulk_error(
+                    index, status.HTTP_404_NOT_FOUND,
+                    {'id': ['Произведение не найдено.']})
+            elif title_id is not None and title_id in seen:
+                results[index] = self.bulk_error(
+                    index, status.HTTP_400_BAD_REQUEST,
+                    {'id': ['Произведение повторяется в пакете.']})
+            else:
+                seen.add(title_id)
+                title = Title(
+                    pk=title_id, name=data['name'], year=data['year'],
+                    description=data['description'],
+                    category_id=found_categories[data['category']].pk)
+                genre_ids = list(dict.fromkeys(
+                    found_genres[slug].pk for slug in data['genre']))
+                (created if title_id is None else updated).append(
+                    (index, title, genre_ids))
+        bulk_upsert_titles(
+            [title for _, title, _ in created],
+            [title for _, title, _ in updated],
+            [genre_ids for _, _, genre_ids in created + updated]
+        )
+        for index, title, _ in created:
+            results[index] = self.bulk_created(index, {'id': title.pk})
+        for index, title, _ in updated:
+            results[index] = self.bulk_updated(index, {'id': title.pk})
+        return self.bulk_response(results)
+
+    @staticmethod
+    def bulk_created(index, data):
+        return {'index': index, 'status': status.HTTP_201_CREATED,
+                'data': data}
+
+    @staticmethod
+    def bulk_updated(index, data):
+        return {'index': index, 'status': status.HTTP_200_OK, 'data': data}
+
+    @staticmethod
+    def bulk_error(index, code, errors):
+        return {'index': index, 'status': code, 'errors': errors}
+
+    @staticmethod
+    def bulk_response(results):
+        codes = {result['status'] for result in results}
+        if codes == {status.HTTP_201_CREATED}:
+            return Response(results, status=status.HTTP_201_CREATED)
+        if codes <= {status.HTTP_200_OK, status.HTTP_201_CREATED}:
+            return Response(results, status=status.HTTP_200_OK)
+        return Response(results, status=status.HTTP_207_MULTI_STATUS)
+
+
+class CommentViewSet(NestedParentMixin, BulkCreateMixin, SparseFieldsetMixin,
+                     viewsets.ModelViewSet):
     """
     Класс-обработчик API-запросов к комментариям к отзывам на произведения.
     """
     serializer_class = CommentSerializer
     permission_classes = (IsOwnerIsModeratorIsAdminOrReadOnly,)
     http_method_names = ('get', 'post', 'patch', 'delete',)
-
-    def get_review(self):
-        review_id = self.kwargs.get('review_id')
-        title_id = self.kwargs.get('title_id')
-        return get_object_or_404(Review, id=review_id, title_id=title_id)
+    parent_model = Review
+    parent_lookups = {'id': 'review_id', 'title_id': 'title_id'}
+    parent_filters = {'is_hidden': False, 'title__is_deleted': False}
+    sparse_columns = {'author': ('author__username',)}
 
     def get_queryset(self):
-        review = self.get_review()
-        return review.comments_for_review.all()
+        return self.prune_queryset(Comment.objects.filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id'),
+            review__is_hidden=False,
+            review__title__is_deleted=False,
+            is_hidden=False,
+            author__is_deleted=False,
+        ).select_related('author'))
 
     def perform_create(self, serializer):
-        review = self.get_review()
-        serializer.save(review=review,
+        self.check_parent_exists()
+        serializer.save(review_id=self.kwargs.get('review_id'),
                         author=self.request.user)
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request, title_id, review_id):
+        """Пакетное создание комментариев к отзыву."""
+        self.check_parent_exists()
+        return self.create_comments_in_bulk(request, review_id)
 
-class ReviewViewSet(viewsets.ModelViewSet):
+
+class ReviewViewSet(NestedParentMixin, BulkCreateMixin, SparseFieldsetMixin,
+                    viewsets.ModelViewSet):
     """
     Класс-обработчик API-запросов к отзывам на произведения.
     """
     permission_classes = (IsOwnerIsModeratorIsAdminOrReadOnly,)
     http_method_names = ['get', 'post', 'patch', 'delete']
-
-    def get_title(self):
-        title_id = self.kwargs.get('title_id')
-        return get_object_or_404(Title, id=title_id)
+    parent_model = Title
+    parent_lookups = {'id': 'title_id'}
+    parent_filters = {'is_deleted': False}
+    sparse_columns = {'author': ('author__username',)}
 
     def get_queryset(self):
-        title = self.get_title()
-        return title.reviews_for_title.all()
+        return self.prune_queryset(Review.objects.filter(
+            title_id=self.kwargs.get('title_id'),
+            is_hidden=False,
+            title__is_deleted=False,
+            author__is_deleted=False,
+        ).select_related('author'))
 
     def perform_create(self, serializer):
-        title = self.get_title()
-        serializer.save(title=title,
+        self.check_parent_exists()
+        serializer.save(title_id=self.kwargs.get('title_id'),
                         author=self.request.user)
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request, title_id):
+        """Пакетное создание отзывов на произведение."""
+        self.check_parent_exists()
+        return self.create_reviews_in_bulk(request, title_id)
+
+    def perform_destroy(self, instance):
+        """Отзыв удаляется вместе с комментариями без их загрузки,
+        одной транзакцией: комментарий, добавленный между удалением
+        комментариев и отзыва, не оставит удаление наполовину.
+        """
+        with transaction.atomic():
+            delete_queryset(Review.objects.filter(pk=instance.pk))
+
     def get_serializer_class(self):
         if self.action == 'partial_update':
             return ReviewPatchSerializer
         return ReviewSerializer
 
 
+class ReviewBulkView(BulkCreateMixin, APIView):
+    """
+    Пакетное создание отзывов на разные произведения:
+    в каждом элементе указывается id произведения.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        return self.create_reviews_in_bulk(request)
+
+
+class ModerationJobViewSet(mixins.CreateModelMixin,
+                           mixins.ListModelMixin,
+                           mixins.RetrieveModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Задания массовой модерации отзывов и комментариев.
+    Создание задания запускает его обработку пачками, прогресс
+    доступен по адресу задания.
+    """
+    queryset = ModerationJob.objects.select_related('moderator')
+    serializer_class = ModerationJobSerializer
+    permission_classes = (IsModeratorOrAdmin,)
+
+    def perform_create(self, serializer):
+        job = serializer.save(moderator=self.request.user)
+        start_job(job)
+
+
 class CategoryViewSet(ListCreateDeleteModelViewSet):
     """
     Класс-обработчик API-запросов к категориям произведений.
@@ -105,15 +461,28 @@ class GenreViewSet(ListCreateDeleteModelViewSet):
     permission_classes = (IsModeratorIsAdminOrReadonly,)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(BulkCreateMixin, SparseFieldsetMixin,
+                   viewsets.ModelViewSet):
     """
     Класс-обработчик API-запросов произведениям.
     """
-    queryset = Title.objects.annotate(rating=Avg('reviews_for_title__score'))
+    queryset = Title.objects.filter(is_deleted=False).prefetch_related(
+        'genre')
     http_method_names = ('get', 'post', 'patch', 'delete',)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
     permission_classes = (IsModeratorIsAdminOrReadonly,)
+    leaderboard_orderings = {
+        'rating': ('-rating', 'rating'),
+        'weighted_rating': ('-weighted_rating', 'weighted_rating'),
+        'review_count': ('-review_count', None),
+        'recent': ('-last_review_date', 'last_review_date'),
+    }
+    sparse_columns = {'genre': ()}
+    sparse_prefetches = {'genre': 'genre'}
+
+    def get_queryset(self):
+        return self.prune_queryset(super().get_queryset())
 
     def get_serializer_class(self):
         """
@@ -125,31 +494,100 @@ class TitleViewSet(viewsets.ModelViewSet):
             return TitleSafeRequestSerializer
         return TitleUnsafeRequestSerializer
 
+    @action(detail=False, url_path='top')
+    def top(self, request):
+        """
+        Лучшие произведения по рейтингу, количеству отзывов
+        или дате последнего отзыва.
+        Выборка идёт по индексированным денормализованным колонкам
+        и ограничивается первыми limit записями.
+        """
+        by = request.query_params.get('by', 'rating')
+        if by not in self.leaderboard_orderings:
+            raise ValidationError(
+                {'by': f'Допустимые значения: '
+                       f'{", ".join(self.leaderboard_orderings)}.'})
+        try:
+            limit = int(request.query_params.get(
+                'limit', settings.LEADERBOARD_DEFAULT_LIMIT))
+        except ValueError:
+            raise ValidationError({'limit': 'Ожидается целое число.'})
+        limit = max(1, min(limit, settings.LEADERBOARD_MAX_LIMIT))
+        ordering, not_null_field = self.leaderboard_orderings[by]
+        queryset = Title.objects.filter(is_deleted=False).prefetch_related(
+            'genre')
+        if not_null_field:
+            queryset = queryset.filter(**{f'{not_null_field}__isnull': False})
+        for param, lookup in (('category', 'category__slug'),
+                              ('genre', 'genre__slug'),
+                              ('year', 'year')):
+            value = request.query_params.get(param)
+            if value:
+                queryset = queryset.filter(**{lookup: value})
+        queryset = self.prune_queryset(
+            queryset, TitleSafeRequestSerializer
+        ).order_by(ordering, 'pk')[:limit]
+        serializer = TitleSafeRequestSerializer(
+            queryset, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
+
+    @action(detail=False, methods=('post',), url_path='bulk',
+            permission_classes=(IsAdminUser,))
+    def bulk(self, request):
+        """Пакетная загрузка каталога произведений."""
+        return self.upsert_titles_in_bulk(request)
+
+    def perform_destroy(self, instance):
+        """Произведение скрывается сразу, а удаляется вместе с отзывами
+        и комментариями фоновой задачей.
+        """
+        soft_delete_title(instance)
+
 
 class UserSignUpView(CreateAPIView):
     """
     Класс-создатель нового пользователя.
     """
     queryset = CustomUser.objects.all()
-    serializer_class = CustomUserSerializer
+    serializer_class = SignUpSerializer
     permission_classes = (AllowAny,)
+    throttle_classes = (SignupThrottle,)
 
     def create(self, request, *args, **kwargs):
-        if CustomUser.objects.filter(
-                username=request.data.get('username'),
-                email=request.data.get('email')):
-            return Response(
-                {'message': 'Пользователь уже зарегистрирован'},
-                status=status.HTTP_200_OK
-            )
+        """
+        Регистрация за два запроса к БД: один поиск по username или email
+        разбирает все конфликты, одна вставка сразу сохраняет
+        код подтверждения.
+        """
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         username = serializer.validated_data['username']
         email = serializer.validated_data['email']
-        user = serializer.save()
+        existing = list(CustomUser.objects.filter(
+            Q(username=username) | Q(email=email)
+        ).order_by().values_list('username', 'email')[:2])
+        if (username, email) in existing:
+            return Response(
+                {'message': 'Пользователь уже зарегистрирован'},
+                status=status.HTTP_200_OK
+            )
+        errors = {}
+        if any(row[0] == username for row in existing):
+            errors['username'] = ['Пользователь с таким username '
+                                  'уже существует.']
+        if any(row[1] == email for row in existing):
+            errors['email'] = ['Пользователь с таким email уже существует.']
+        if errors:
+            raise ValidationError(errors)
+        user = CustomUser(username=username, email=email)
         confirmation_code = default_token_generator.make_token(user)
         user.confirmation_code = confirmation_code
-        user.save()
+        try:
+            user.save(force_insert=True)
+        except IntegrityError:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Пользователь с таким username или email уже существует.'
+            ]})
         send_mail(
             'Confirmation Code',
             f'Your confirmation code: {confirmation_code}',
@@ -168,6 +606,7 @@ class CustomTokenObtainPairView(CreateAPIView):
     """
     queryset = CustomUser.objects.all()
     permission_classes = (AllowAny,)
+    throttle_classes = (TokenThrottle,)
 
     def create(self, request, *args, **kwargs):
         serializer = CustomTokenDateNotNull(data=request.data)
@@ -212,7 +651,7 @@ class UserViewSet(viewsets.ModelViewSet):
     """
     Класс-обработчик API-запросов от администратора.
     """
-    queryset = CustomUser.objects.all()
+    queryset = CustomUser.objects.filter(is_deleted=False)
     serializer_class = UserSerializer
     permission_classes = (IsAdminUser,)
     filter_backends = (filters.SearchFilter,)
@@ -233,6 +672,12 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer.save()
         return Response(data=request.data, status=status.HTTP_201_CREATED)
 
+    def perform_destroy(self, instance):
+        """Пользователь блокируется сразу, а удаляется вместе с отзывами
+        и комментариями фоновой задачей.
+        """
+        soft_delete_user(instance)
+
     def update(self, request, *args, **kwargs):
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
@@ -254,3 +699,17 @@ class UserViewSet(viewsets.ModelViewSet):
         result_page = paginator.paginate_queryset(queryset, request)
         serializer = self.get_serializer(result_page, many=True)
         return paginator.get_paginated_response(serializer.data)
+
+
+class MetricsView(APIView):
+    """
+    Метрики производительности обработчиков в формате Prometheus.
+    Доступны только администратору.
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render_prometheus(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
@@ -24,11 +24,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.middleware.ProfilerMiddleware',
+    'api.middleware.IdempotencyMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -61,6 +65,17 @@ DATABASES = {
     }
 }
 
+# В кеше Django хранятся версии индекса жанров и копий справочников, кеш
+# ответов каталога, средняя оценка и счётчики ограничения частоты.
+# LocMemCache - своя копия в каждом процессе, подходит для runserver
+# и тестов. Для нескольких процессов нужен общий бэкенд (memcached, redis),
+# иначе при DEBUG = False проверка reviews.W001 выдаёт предупреждение.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': ('django.contrib.auth.'
@@ -90,9 +105,27 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': ('rest_framework.pagination.'
                                  'LimitOffsetPagination'),
-    'PAGE_SIZE': 20
+    'PAGE_SIZE': 20,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.ReadThrottle',
+        'api.throttling.WriteThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'signup': '10/hour',
+        'token': '20/hour',
+        'reads': '1000/min',
+        'writes': '200/min',
+    },
+    # Количество доверенных прокси перед приложением: адрес клиента для
+    # ограничения частоты берётся из X-Forwarded-For только за ними.
+    # 0 - адрес соединения (REMOTE_ADDR), заголовок клиента не учитывается.
+    'NUM_PROXIES': 0,
 }
 
+# Хранилище счётчиков ограничения частоты запросов: 'local' - память
+# процесса (один узел), 'cache' - кеш Django (несколько узлов).
+THROTTLE_STORE = 'local'
+
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
@@ -118,3 +151,78 @@ AUTH_USER_MODEL = 'reviews.CustomUser'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 DOMAIN_NAME = 'example.com'
+
+LEADERBOARD_DEFAULT_LIMIT = 10
+LEADERBOARD_MAX_LIMIT = 100
+
+# Взвешенный (байесовский) рейтинг: число «виртуальных» отзывов со средней
+# оценкой по всем произведениям и время жизни этой средней в кеше.
+RATING_PRIOR_WEIGHT = 10
+RATING_PRIOR_TTL = 300
+# Интервал (секунды) пакетного применения изменений рейтинга; он же
+# ограничивает отставание рейтинга. 0 - рейтинг обновляется сразу.
+RATING_FLUSH_INTERVAL = 0
+
+# Если битовый индекс жанров находит не больше произведений, чем указано,
+# фильтр по жанрам передаётся в БД списком id, иначе - через EXISTS.
+GENRE_INDEX_MAX_IDS = 500
+# Индекс жанров перестраивается не реже чем раз в столько секунд. При общем
+# кеше изменения других процессов видны сразу, с LocMemCache - через TTL.
+GENRE_INDEX_TTL = 60
+# То же для копий справочников жанров и категорий в памяти процесса.
+REFERENCE_CACHE_TTL = 60
+
+PERFORMANCE_METRICS_ENABLED = True
+
+# Поиск повторяющихся SQL-запросов (N+1): 'off', 'log' или 'strict'.
+QUERY_GUARD_MODE = 'log'
+QUERY_GUARD_THRESHOLD = 5
+
+# Профилирование запросов: доля случайно профилируемых запросов,
+# интервал снятия стеков (секунды), каталог для сохранения профилей
+# и число хранимых в нём последних профилей.
+PROFILER_SAMPLE_RATE = 0.0
+PROFILER_INTERVAL = 0.005
+PROFILER_OUTPUT_DIR = BASE_DIR / 'profiles'
+PROFILER_MAX_FILES = 500
+
+# Максимальное число объектов в одном запросе пакетного создания.
+BULK_MAX_ITEMS = 100
+# Для пакетной загрузки каталога произведений.
+TITLE_BULK_MAX_ITEMS = 1000
+
+# Размер пачки при массовой модерации.
+MODERATION_CHUNK_SIZE = 1000
+# Задание, исполнитель которого не сообщал о себе столько секунд,
+# может продолжить другой процесс (runmoderationjobs).
+MODERATION_JOB_LEASE = 300
+
+# Размер пачки id при удалении без загрузки объектов (reviews.deletion).
+DELETION_CHUNK_SIZE = 1000
+
+# Выполнять фоновые задачи сразу в обработчике запроса (тесты, отладка).
+BACKGROUND_TASKS_EAGER = False
+
+# Ключи идемпотентности: методы, время хранения ответа и время,
+# в течение которого повтор считается параллельным первому запросу.
+IDEMPOTENCY_METHODS = ('POST',)
+IDEMPOTENCY_TTL = 24 * 60 * 60
+IDEMPOTENCY_PENDING_TTL = 60
+# Время хранения признака активности пользователя (reviews.user_state),
+# по которому повтор ответа отказывает заблокированным пользователям.
+USER_STATE_TTL = 300
+
+# Сжатие ответов: кодеки в порядке предпочтения (br и zstd - если
+# установлены brotli и zstandard) и минимальный размер сжимаемого ответа.
+RESPONSE_COMPRESSION_ENCODINGS = ('br', 'zstd', 'gzip')
+RESPONSE_COMPRESSION_MIN_SIZE = 1024
+
+# Кеш сжатых ответов каталога для анонимных GET-запросов
+# (api.response_cache): адреса и время хранения в секундах.
+RESPONSE_CACHE_URL_PATTERN = (
+    r'^/api/v1/(titles|genres|categories)/((\d+|top)/)?$'
+)
+RESPONSE_CACHE_TTL = 300
+# Время хранения списков произведений: рейтинг в них обновляется
+# не при каждом отзыве, а по истечении этого времени.
+RESPONSE_CACHE_RATING_TTL = 30
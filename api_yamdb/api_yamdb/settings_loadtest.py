@@ -0,0 +1,17 @@
+"""
+Настройки сервера для benchmarks/loadtest.py: ограничения частоты
+запросов отключены, иначе нагрузка с одного адреса упирается в ответы
+429, а не в обработчики. Письма с кодами подтверждения пишутся
+в отдельный каталог, откуда их читает скрипт.
+"""
+from api_yamdb.settings import *  # noqa: F401,F403
+from api_yamdb.settings import BASE_DIR, REST_FRAMEWORK
+
+EMAIL_FILE_PATH = BASE_DIR / 'sent_emails' / 'loadtest'
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {
+        scope: None for scope in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+    },
+}
@@ -0,0 +1,194 @@
+"""
+Пакетная запись отзывов, комментариев и произведений.
+
+Проверки уникальности выполняются одним запросом на весь пакет, вставка -
+через bulk_create, а рейтинг всех затронутых произведений обновляется
+одним запросом.
+"""
+import operator
+from collections import defaultdict
+from functools import reduce
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+
+from reviews.changes import titles_updated
+from reviews.genre_index import genre_index
+from reviews.models import Comment, Review, Title
+from reviews.ratings import record_review_deltas
+
+
+def review_pairs_filter(pairs):
+    """Условие на точный набор пар (title_id, author_id), а не на
+    декартово произведение их произведений и авторов.
+    """
+    return reduce(operator.or_, (
+        Q(title_id=title_id, author_id=author_id)
+        for title_id, author_id in pairs
+    ))
+
+
+def existing_review_pairs(pairs):
+    """Пары (title_id, author_id), для которых отзыв уже существует.
+    Выполняется один запрос на весь набор пар.
+    """
+    if not pairs:
+        return set()
+    return set(Review.objects.filter(
+        review_pairs_filter(pairs)
+    ).values_list('title_id', 'author_id'))
+
+
+def bulk_create_reviews(reviews, batch_size=500):
+    """
+    Создаёт отзывы пакетом, пропуская повторы пары (произведение, автор)
+    как внутри пакета, так и относительно уже сохранённых отзывов.
+    Возвращает списки созданных и пропущенных отзывов.
+    """
+    unique = {}
+    skipped = []
+    for review in reviews:
+        key = (review.title_id, review.author_id)
+        if key in unique:
+            skipped.append(review)
+        else:
+            unique[key] = review
+    existing = existing_review_pairs(list(unique))
+    created = []
+    for key, review in unique.items():
+        (skipped if key in existing else created).append(review)
+    if not created:
+        return created, skipped
+
+    try:
+        with transaction.atomic():
+            insert_reviews(created, batch_size)
+            record_review_deltas(review_deltas(created))
+        return created, skipped
+    except IntegrityError:
+        # Параллельный запрос создал отзыв с той же парой после проверки.
+        # Пакет откатан; отзывы создаются по одному, занятые пары
+        # пропускаются.
+        pass
+    inserted = []
+    with transaction.atomic():
+        for review in created:
+            review.pk = None
+            try:
+                with transaction.atomic():
+                    insert_reviews([review], batch_size)
+            except IntegrityError:
+                skipped.append(review)
+            else:
+                inserted.append(review)
+        record_review_deltas(review_deltas(inserted))
+    return inserted, skipped
+
+
+def insert_reviews(reviews, batch_size):
+    Review.objects.bulk_create(reviews, batch_size=batch_size)
+    if not connection.features.can_return_rows_from_bulk_insert:
+        assign_review_ids(reviews)
+
+
+def review_deltas(reviews):
+    """Приращения рейтинга произведений от новых отзывов."""
+    deltas = defaultdict(lambda: [0, 0, None])
+    for review in reviews:
+        delta = deltas[review.title_id]
+        delta[0] += review.score
+        delta[1] += 1
+        if delta[2] is None or review.pub_date > delta[2]:
+            delta[2] = review.pub_date
+    return deltas
+
+
+def assign_review_ids(reviews):
+    """Проставляет id отзывам после bulk_create в БД, которые не
+    возвращают первичные ключи вставленных строк. Пара
+    (произведение, автор) уникальна, поэтому хватает одного запроса.
+    """
+    ids = {
+        (title_id, author_id): pk
+        for title_id, author_id, pk in Review.objects.filter(
+            review_pairs_filter(
+                [(review.title_id, review.author_id) for review in reviews]
+            )
+        ).values_list('title_id', 'author_id', 'pk')
+    }
+    for review in reviews:
+        review.pk = ids.get((review.title_id, review.author_id))
+
+
+def bulk_create_comments(comments, batch_size=500):
+    """Создаёт комментарии пакетом и возвращает их список."""
+    if not comments:
+        return comments
+    with transaction.atomic():
+        insert_objects(Comment, comments, batch_size)
+    return comments
+
+
+def insert_objects(model, objects, batch_size):
+    """bulk_create, после которого у объектов есть id.
+    Если БД не возвращает id вставленных строк, на SQLite пакету
+    проставляются последние id таблицы: запись в транзакции блокирует
+    других писателей, и пакет получает id подряд. На других БД без
+    RETURNING (MySQL) параллельные вставки перемешивают id, поэтому
+    объекты сохраняются по одному.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        model.objects.bulk_create(objects, batch_size=batch_size)
+    elif connection.vendor == 'sqlite':
+        with transaction.atomic(savepoint=False):
+            model.objects.bulk_create(objects, batch_size=batch_size)
+            assign_last_ids(model, objects)
+    else:
+        for instance in objects:
+            instance.save(force_insert=True)
+
+
+def assign_last_ids(model, objects):
+    """Проставляет объектам последние id таблицы по возрастанию.
+    Только для SQLite, см. insert_objects.
+    """
+    ids = model._base_manager.order_by('-pk').values_list(
+        'pk', flat=True)[:len(objects)]
+    for instance, pk in zip(objects, reversed(list(ids))):
+        instance.pk = pk
+
+
+def bulk_upsert_titles(created, updated, title_genres, batch_size=500):
+    """
+    Создаёт новые произведения (created) и перезаписывает существующие
+    (updated) пакетом. title_genres - списки id жанров в порядке
+    произведений created + updated; связи обновлённых произведений
+    с жанрами заменяются целиком.
+    Рейтинг не пересчитывается: у новых произведений отзывов нет,
+    а у обновлённых отзывы не меняются.
+    """
+    through = Title.genre.through
+    with transaction.atomic():
+        if created:
+            insert_objects(Title, created, batch_size)
+        if updated:
+            Title.objects.bulk_update(
+                updated, ('name', 'year', 'description', 'category'),
+                batch_size=batch_size
+            )
+            through.objects.filter(
+                title_id__in=[title.pk for title in updated]
+            ).delete()
+        relations = {
+            title.pk: genre_ids
+            for title, genre_ids in zip(created + updated, title_genres)
+        }
+        through.objects.bulk_create(
+            (through(title_id=title_id, genre_id=genre_id)
+             for title_id, genre_ids in relations.items()
+             for genre_id in genre_ids),
+            batch_size=batch_size
+        )
+        genre_index.on_commit('set_title_genres', relations)
+    titles_updated.send(sender=Title)
+    return created, updated
@@ -0,0 +1,19 @@
+"""
+Сигналы об изменении произведений в обход сигналов моделей.
+
+Пакетная загрузка и скрытие произведений пишут в таблицу запросами
+UPDATE и bulk_create, для которых post_save не отправляется. После
+таких записей отправляется titles_updated, чтобы подписчики (например,
+кеш ответов API) могли сбросить свои данные.
+
+Рейтинг меняется с каждым отзывом, поэтому о нём сообщает отдельный
+сигнал ratings_updated со списком затронутых произведений: подписчикам
+не нужно сбрасывать все данные на каждый отзыв.
+"""
+from django.dispatch import Signal
+
+# Аргументы: sender (модель Title).
+titles_updated = Signal()
+# Аргументы: sender (модель Title), title_ids (список id произведений
+# или None, если рейтинг менялся у всех).
+ratings_updated = Signal()
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    """Версии индекса жанров и справочников должны быть общими для всех
+    процессов сервера, иначе процессы не видят изменений друг друга
+    до истечения GENRE_INDEX_TTL и REFERENCE_CACHE_TTL.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.DEBUG or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f'Кеш по умолчанию ({backend}) не общий для процессов сервера.',
+        hint=('Задайте в CACHES общий бэкенд (memcached, redis): через него '
+              'процессы узнают об изменениях жанров, справочников '
+              'и каталога.'),
+        id='reviews.W001',
+    )]
@@ -0,0 +1,82 @@
+"""
+Удаление без загрузки объектов в память.
+
+Стандартный Collector перед удалением загружает все зависимые объекты,
+если у модели есть обработчики сигналов удаления (как у отзывов), поэтому
+удаление пользователя или произведения с большим количеством отзывов
+требует памяти пропорционально их числу. delete_queryset обходит те же
+связи, что и Collector, но удаляет строки запросами DELETE по пачкам id
+размером DELETION_CHUNK_SIZE в порядке зависимостей: сначала зависимые
+таблицы (комментарии -> отзывы), затем сами объекты. В памяти одновременно
+находится не больше одной пачки id.
+
+Вместо post_delete на каждый объект перед удалением каждой пачки
+отправляется сигнал pre_raw_delete со списком id: по нему обновляются
+рейтинг произведений и индекс жанров (см. reviews.signals).
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.deletion import (ProtectedError,
+                                       get_candidate_relations_to_delete)
+from django.dispatch import Signal
+
+# Аргументы: sender (модель), ids (id удаляемой пачки).
+pre_raw_delete = Signal()
+
+
+def delete_queryset(queryset, chunk_size=None):
+    """
+    Удаляет объекты queryset вместе с зависимыми строками.
+    Возвращает количество удалённых строк по моделям, как
+    QuerySet.delete().
+    """
+    counter = Counter()
+    _delete(queryset, chunk_size or settings.DELETION_CHUNK_SIZE, counter)
+    return sum(counter.values()), dict(counter)
+
+
+def _delete(queryset, chunk_size, counter):
+    model = queryset.model
+    parents = queryset.values('pk')
+    for relation in get_candidate_relations_to_delete(model._meta):
+        field = relation.field
+        on_delete = field.remote_field.on_delete
+        if on_delete is models.DO_NOTHING:
+            continue
+        related = relation.related_model._base_manager.filter(
+            **{f'{field.name}__in': parents}
+        )
+        if relation.related_model is model:
+            raise NotImplementedError(
+                f'Связь {model.__name__}.{field.name} ссылается '
+                'на ту же модель.'
+            )
+        if on_delete is models.CASCADE:
+            _delete(related, chunk_size, counter)
+        elif on_delete is models.SET_NULL:
+            related.update(**{field.name: None})
+        elif on_delete in (models.PROTECT, models.RESTRICT):
+            if related.exists():
+                raise ProtectedError(
+                    f'Удаление {model.__name__} запрещено связью '
+                    f'{relation.related_model.__name__}.{field.name}.',
+                    set(related[:1])
+                )
+        else:
+            raise NotImplementedError(
+                f'Обработчик on_delete связи '
+                f'{relation.related_model.__name__}.{field.name} '
+                'не поддерживается.'
+            )
+
+    ordered = queryset.order_by('pk')
+    while True:
+        ids = list(ordered.values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return
+        chunk = model._base_manager.filter(pk__in=ids)
+        with transaction.atomic(using=chunk.db):
+            pre_raw_delete.send(sender=model, ids=ids)
+            counter[model._meta.label] += chunk._raw_delete(chunk.db)
@@ -0,0 +1,218 @@
+"""
+Битовый индекс жанров произведений в памяти процесса.
+
+Для каждого жанра хранится целое число, в котором установлен бит с номером
+id каждого произведения этого жанра. Комбинации жанров (И/ИЛИ/НЕ)
+вычисляются побитовыми операциями и превращаются в список id без обращения
+к таблице связи Title.genre.
+
+Индекс строится при первом обращении и поддерживается
+сигналами при записи произведений. Версия индекса хранится в кеше Django:
+если другой процесс изменил данные, индекс перестраивается при следующем
+обращении. Это работает, только если кеш общий для всех процессов
+(memcached, redis; см. CACHES и проверку reviews.W001). С LocMemCache
+каждый процесс видит лишь свои изменения, поэтому индекс в любом случае
+перестраивается не реже чем раз в GENRE_INDEX_TTL секунд.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from reviews.models import Genre, Title
+
+GENRE_INDEX_VERSION_KEY = 'genre_index:version'
+
+
+def bitmap_to_ids(bitmap):
+    """Список номеров установленных битов по возрастанию."""
+    bits = format(bitmap, 'b')[::-1]
+    ids = []
+    position = bits.find('1')
+    while position != -1:
+        ids.append(position)
+        position = bits.find('1', position + 1)
+    return ids
+
+
+def ids_to_bitmap(ids):
+    bitmap = 0
+    for pk in ids:
+        bitmap |= 1 << pk
+    return bitmap
+
+
+def get_shared_version(key=GENRE_INDEX_VERSION_KEY):
+    """Версия данных в общем кеше.
+    После очистки кеша версия начинается со случайного значения, чтобы
+    процессы не приняли старую копию данных за актуальную.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, random.randrange(1 << 30), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_shared_version(key=GENRE_INDEX_VERSION_KEY):
+    """Увеличивает версию данных в общем кеше и возвращает её."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        get_shared_version(key)
+        return cache.incr(key)
+
+
+class GenreBitmapIndex:
+    """Отображение жанр -> битовая карта id произведений."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None
+        self._bitmaps = {}
+        self._slugs = {}
+        self._titles = 0
+        self._built_at = 0.0
+
+    def _build(self, version):
+        titles = ids_to_bitmap(Title.objects.values_list('pk', flat=True))
+        slugs = {}
+        bitmaps = {}
+        for genre_id, slug in Genre.objects.values_list('pk', 'slug'):
+            slugs[slug] = genre_id
+            bitmaps[genre_id] = 0
+        relations = Title.genre.through.objects.values_list(
+            'genre_id', 'title_id'
+        )
+        for genre_id, title_id in relations.iterator():
+            bitmaps[genre_id] = bitmaps.get(genre_id, 0) | (1 << title_id)
+        self._slugs = slugs
+        self._bitmaps = bitmaps
+        self._titles = titles
+        self._version = version
+        self._built_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        version = get_shared_version()
+        expired = (time.monotonic() - self._built_at
+                   >= settings.GENRE_INDEX_TTL)
+        if self._version != version or expired:
+            self._build(version)
+
+    def _apply(self, change):
+        """Применяет изменение к индексу и публикует новую версию.
+        Если с момента построения индекс менял другой процесс,
+        локальная копия сбрасывается и будет перестроена.
+        """
+        with self._lock:
+            known = self._version
+            version = bump_shared_version()
+            if known is not None and version == known + 1:
+                change()
+                self._version = version
+            else:
+                self._version = None
+
+    def genre_ids(self, slugs):
+        """id жанров по слагам; неизвестные слаги возвращаются как None."""
+        with self._lock:
+            self._ensure_fresh()
+            return [self._slugs.get(slug) for slug in slugs]
+
+    def resolve(self, all_of=(), any_of=(), none_of=()):
+        """Битовая карта произведений, у которых есть все жанры all_of,
+        хотя бы один из any_of и ни одного из none_of.
+        Жанры задаются слагами.
+        """
+        with self._lock:
+            self._ensure_fresh()
+            result = self._titles
+            for slug in all_of:
+                result &= self._bitmaps.get(self._slugs.get(slug), 0)
+            if any_of:
+                union = 0
+                for slug in any_of:
+                    union |= self._bitmaps.get(self._slugs.get(slug), 0)
+                result &= union
+            for slug in none_of:
+                result &= ~self._bitmaps.get(self._slugs.get(slug), 0)
+            return result
+
+    def add_relations(self, genre_ids, title_ids):
+        def change():
+            bits = ids_to_bitmap(title_ids)
+            self._titles |= bits
+            for genre_id in genre_ids:
+                self._bitmaps[genre_id] = self._bitmaps.get(genre_id, 0) | bits
+        self._apply(change)
+
+    def remove_relations(self, genre_ids, title_ids):
+        def change():
+            bits = ids_to_bitmap(title_ids)
+            for genre_id in genre_ids:
+                if genre_id in self._bitmaps:
+                    self._bitmaps[genre_id] &= ~bits
+        self._apply(change)
+
+    def set_title_genres(self, title_genres):
+        """Заменяет жанры произведений: {id произведения: id жанров}."""
+        def change():
+            bits = ids_to_bitmap(title_genres)
+            self._titles |= bits
+            for genre_id in self._bitmaps:
+                self._bitmaps[genre_id] &= ~bits
+            for title_id, genre_ids in title_genres.items():
+                for genre_id in genre_ids:
+                    self._bitmaps[genre_id] = (
+                        self._bitmaps.get(genre_id, 0) | (1 << title_id)
+                    )
+        self._apply(change)
+
+    def add_title(self, title_id):
+        def change():
+            self._titles |= 1 << title_id
+        self._apply(change)
+
+    def remove_title(self, title_id):
+        def change():
+            bit = 1 << title_id
+            self._titles &= ~bit
+            for genre_id in self._bitmaps:
+                self._bitmaps[genre_id] &= ~bit
+        self._apply(change)
+
+    def remove_titles(self, title_ids):
+        def change():
+            bits = ids_to_bitmap(title_ids)
+            self._titles &= ~bits
+            for genre_id in self._bitmaps:
+                self._bitmaps[genre_id] &= ~bits
+        self._apply(change)
+
+    def remove_relation_pairs(self, pairs):
+        """Удаляет связи, заданные парами (id жанра, id произведения)."""
+        titles_by_genre = {}
+        for genre_id, title_id in pairs:
+            titles_by_genre.setdefault(genre_id, []).append(title_id)
+
+        def change():
+            for genre_id, title_ids in titles_by_genre.items():
+                if genre_id in self._bitmaps:
+                    self._bitmaps[genre_id] &= ~ids_to_bitmap(title_ids)
+        self._apply(change)
+
+    def invalidate(self):
+        """Сбрасывает индекс во всех процессах."""
+        with self._lock:
+            self._version = None
+            bump_shared_version()
+
+    def on_commit(self, method, *args):
+        """Откладывает изменение индекса до фиксации транзакции."""
+        transaction.on_commit(lambda: getattr(self, method)(*args))
+
+
+genre_index = GenreBitmapIndex()
@@ -0,0 +1,84 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.genre_index import genre_index
+from reviews.ratings import recalculate_ratings, refresh_weighted_ratings
+from reviews.reference_cache import REFERENCES
+from reviews.synthetic import generate
+
+
+class Command(BaseCommand):
+    help = """
+    Команда генерирует синтетический набор данных для нагрузочных
+    испытаний: отзывы на произведения по закону Ципфа, степенную
+    активность пользователей и наборы жанров с частотами из образца
+    static/data. Без --csv строки добавляются в базу после существующих,
+    с --csv записываются csv-файлы в формате команды importcsv.
+    При одинаковых параметрах и --seed результат не зависит от --workers.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=1000,
+                            help='Количество произведений.')
+        parser.add_argument('--users', type=int, default=10_000,
+                            help='Количество пользователей.')
+        parser.add_argument('--reviews', type=int, default=100_000,
+                            help='Ожидаемое количество отзывов.')
+        parser.add_argument('--comments', type=int, default=200_000,
+                            help='Количество комментариев.')
+        parser.add_argument('--title-exponent', type=float, default=1.0,
+                            help='Показатель закона Ципфа для отзывов.')
+        parser.add_argument('--user-exponent', type=float, default=0.8,
+                            help='Показатель активности пользователей.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Количество процессов.')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Размер пакета записи.')
+        parser.add_argument(
+            '--sample', default=os.path.join(settings.BASE_DIR, 'static',
+                                             'data'),
+            help='Каталог csv-файлов образца.'
+        )
+        parser.add_argument('--csv', metavar='DIRECTORY',
+                            help='Записать csv-файлы в каталог.')
+
+    def handle(self, *args, **options):
+        for name in ('titles', 'users', 'reviews', 'comments'):
+            if options[name] < 0:
+                raise CommandError(f'--{name} не может быть отрицательным.')
+        if options['comments'] and not (options['reviews']
+                                        and options['users']):
+            raise CommandError('Для комментариев нужны отзывы '
+                               'и пользователи.')
+
+        def progress(totals):
+            self.stdout.write(
+                ', '.join(f'{table}: {count}'
+                          for table, count in totals.items()),
+                ending='\r'
+            )
+
+        totals = generate(
+            options['sample'], options['titles'], options['users'],
+            options['reviews'], options['comments'], seed=options['seed'],
+            title_exponent=options['title_exponent'],
+            user_exponent=options['user_exponent'],
+            workers=max(options['workers'] or 1, 1),
+            directory=options['csv'], batch_size=options['batch_size'],
+            progress=progress,
+        )
+        self.stdout.write('')
+        if options['csv'] is None:
+            recalculate_ratings()
+            refresh_weighted_ratings()
+            genre_index.invalidate()
+            for reference in REFERENCES.values():
+                reference.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            'Сгенерировано: ' + ', '.join(
+                f'{table} - {count}' for table, count in totals.items())
+            + '.'
+        ))
@@ -5,7 +5,11 @@ from django import apps
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
 
+from reviews.deletion import delete_queryset
+from reviews.genre_index import genre_index
 from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.ratings import recalculate_ratings
+from reviews.reference_cache import REFERENCES
 
 
 class Command(BaseCommand):
@@ -52,10 +56,10 @@ class Command(BaseCommand):
             try:
                 df = pandas.read_csv(self.CSV_DIRECTORY + csv_file, sep=',')
                 df_dict = df.to_dict('records')
-                model.objects.all().delete()
+                delete_queryset(model.objects.all())
                 model.objects.bulk_create(model(**row) for row in df_dict)
             except Exception as error:
-                model.objects.all().delete()
+                delete_queryset(model.objects.all())
                 if dump_data:
                     for item in dump_data:
                         model.objects.create(**item)
@@ -66,3 +70,7 @@ class Command(BaseCommand):
                 print(text_color_green + f'Данные из файла {csv_file} успешно'
                       f' импортированы в таблицу {model.__name__}.'
                       + text_color_reset)
+        recalculate_ratings()
+        genre_index.invalidate()
+        for reference in REFERENCES.values():
+            reference.invalidate()
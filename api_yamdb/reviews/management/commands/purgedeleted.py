@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from reviews.purge import purge_deleted
+
+
+class Command(BaseCommand):
+    help = """
+    Команда окончательно удаляет помеченные произведения и пользователей
+    вместе с отзывами и комментариями. Дочищает записи, удаление которых
+    фоновой задачей было прервано.
+    """
+
+    def handle(self, *args, **options):
+        titles, users = purge_deleted()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено произведений: {titles}, пользователей: {users}.'
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from reviews.ratings import reconcile_ratings, refresh_weighted_ratings
+
+
+class Command(BaseCommand):
+    help = """
+    Команда пересчитывает среднюю оценку по каталогу и взвешенный рейтинг
+    всех произведений. Предназначена для периодического запуска (cron).
+    С ключом --exact предварительно применяет накопленные приращения и
+    пересчитывает суммы и количество оценок по таблице отзывов.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--exact',
+            action='store_true',
+            help='Точный пересчёт рейтинга по таблице отзывов.'
+        )
+
+    def handle(self, *args, **options):
+        if options['exact']:
+            reconcile_ratings()
+        prior = refresh_weighted_ratings()
+        self.stdout.write(self.style.SUCCESS(
+            f'Взвешенный рейтинг пересчитан, средняя оценка: {prior:.2f}.'
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import ModerationJob
+from reviews.moderation import run_job
+
+
+class Command(BaseCommand):
+    help = """
+    Команда выполняет задания массовой модерации, которые ещё в очереди
+    или были прерваны (например, при перезапуске процесса): исполнитель
+    выполняющегося задания не сообщал о себе дольше
+    MODERATION_JOB_LEASE секунд. Обработанные объекты не попадают
+    в повторный отбор, поэтому задание продолжается с места остановки.
+    """
+
+    def handle(self, *args, **options):
+        jobs = ModerationJob.objects.filter(
+            status__in=(ModerationJob.PENDING, ModerationJob.RUNNING)
+        ).order_by('created')
+        for job in jobs:
+            if run_job(job) is None:
+                self.stdout.write(
+                    f'Задание #{job.pk} выполняет другой процесс.')
+                continue
+            self.stdout.write(
+                f'Задание #{job.pk}: {job.get_status_display()}, '
+                f'обработано {job.processed} из {job.total}.'
+            )
@@ -0,0 +1,37 @@
+# Generated by Django 3.2 on 2026-10-19 17:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, FloatField, Sum
+from django.db.models.functions import Cast, NullIf
+
+
+def fill_weighted_ratings(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    totals = Title.objects.aggregate(
+        score_sum=Sum('score_sum'), review_count=Sum('review_count')
+    )
+    if not totals['review_count']:
+        return
+    prior = totals['score_sum'] / totals['review_count']
+    weight = settings.RATING_PRIOR_WEIGHT
+    Title.objects.update(weighted_rating=(
+        Cast(F('score_sum') + weight * prior, FloatField())
+        / (NullIf(F('review_count'), 0) + weight)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_title_rating_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='weighted_rating',
+            field=models.FloatField(blank=True, db_index=True, null=True, verbose_name='Взвешенный рейтинг'),
+        ),
+        migrations.RunPython(fill_weighted_ratings, migrations.RunPython.noop),
+    ]
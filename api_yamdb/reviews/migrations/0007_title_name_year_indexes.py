@@ -0,0 +1,24 @@
+# Generated by Django 3.2 on 2026-10-19 17:46
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_title_weighted_rating'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='title',
+            name='name',
+            field=models.CharField(db_index=True, max_length=256),
+        ),
+        migrations.AlterField(
+            model_name='title',
+            name='year',
+            field=models.PositiveSmallIntegerField(db_index=True, validators=[django.core.validators.MinValueValidator(1876), django.core.validators.MaxValueValidator(2026)]),
+        ),
+    ]
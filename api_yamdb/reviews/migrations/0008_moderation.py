@@ -0,0 +1,48 @@
+# Generated by Django 3.2 on 2026-10-19 18:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_title_name_year_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='is_hidden',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='Скрыт модератором'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='is_hidden',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='Скрыт модератором'),
+        ),
+        migrations.CreateModel(
+            name='ModerationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(choices=[('reviews', 'Отзывы'), ('comments', 'Комментарии')], max_length=20, verbose_name='Объекты')),
+                ('action', models.CharField(choices=[('delete', 'Удалить'), ('hide', 'Скрыть'), ('unhide', 'Восстановить')], max_length=20, verbose_name='Действие')),
+                ('author', models.CharField(blank=True, max_length=150, verbose_name='Имя автора')),
+                ('title_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='id произведения')),
+                ('date_from', models.DateTimeField(blank=True, null=True, verbose_name='Опубликовано с')),
+                ('date_to', models.DateTimeField(blank=True, null=True, verbose_name='Опубликовано до')),
+                ('text', models.CharField(blank=True, max_length=200, verbose_name='Фрагмент текста')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Выполнено'), ('failed', 'Ошибка')], default='pending', max_length=20, verbose_name='Статус')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Найдено объектов')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Обработано объектов')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('moderator', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='moderation_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Модератор')),
+            ],
+            options={
+                'ordering': ('-created',),
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_moderation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='is_deleted',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='Удалён'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='is_deleted',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='Удалено'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2 on 2026-10-19 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_soft_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title_id', models.PositiveIntegerField(db_index=True, verbose_name='id произведения')),
+                ('score_delta', models.IntegerField(verbose_name='Изменение суммы оценок')),
+                ('count_delta', models.IntegerField(verbose_name='Изменение количества отзывов')),
+                ('review_date', models.DateTimeField(blank=True, null=True, verbose_name='Дата отзыва')),
+                ('refresh_date', models.BooleanField(default=False, verbose_name='Пересчитать дату последнего отзыва')),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-19 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_ratingdelta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='moderationjob',
+            name='heartbeat',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последняя пачка'),
+        ),
+        migrations.AddField(
+            model_name='moderationjob',
+            name='lease',
+            field=models.CharField(blank=True, max_length=32, verbose_name='Исполнитель'),
+        ),
+    ]
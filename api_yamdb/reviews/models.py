@@ -3,6 +3,7 @@ from datetime import datetime
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils.functional import cached_property
 
 MAX_SCORE = 10
 MIN_SCORE = 1
@@ -21,6 +22,16 @@ class CustomUser(AbstractUser):
         (ADMIN, 'Administrator'),
     )
 
+    # Возможности ролей в виде битовой маски.
+    CAN_MODERATE = 1
+    CAN_ADMINISTER = 2
+    ALL_CAPABILITIES = CAN_MODERATE | CAN_ADMINISTER
+    ROLE_CAPABILITIES = {
+        USER: 0,
+        MODERATOR: CAN_MODERATE,
+        ADMIN: ALL_CAPABILITIES,
+    }
+
     bio = models.TextField('Биография', blank=True)
     role = models.CharField(
         'Роль',
@@ -47,6 +58,9 @@ class CustomUser(AbstractUser):
         blank=False,
         null=False
     )
+    is_deleted = models.BooleanField(
+        'Удалён', default=False, db_index=True
+    )
 
     class Meta:
         ordering = ('username',)
@@ -54,6 +68,18 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return self.username
 
+    @cached_property
+    def capabilities(self):
+        """Битовая маска возможностей роли, вычисляется один раз
+        на объект пользователя. Суперпользователю доступно всё.
+        """
+        if self.is_superuser:
+            return self.ALL_CAPABILITIES
+        return self.ROLE_CAPABILITIES.get(self.role, 0)
+
+    def has_capability(self, capability):
+        return self.capabilities & capability == capability
+
 
 class Genre(models.Model):
     """Модель жанра произведения."""
@@ -81,14 +107,18 @@ class Category(models.Model):
 
 class Title(models.Model):
     """Модель произведения, к которому пишут отзывы."""
-    name = models.CharField(max_length=256)
+    name = models.CharField(max_length=256, db_index=True)
     year = models.PositiveSmallIntegerField(
         validators=[
             MinValueValidator(MIN_YEAR),
             MaxValueValidator(MAX_YEAR)
-        ]
+        ],
+        db_index=True
     )
     description = models.TextField()
+    is_deleted = models.BooleanField(
+        'Удалено', default=False, db_index=True
+    )
     genre = models.ManyToManyField(
         Genre,
         related_name='titles_for_genre',
@@ -101,9 +131,47 @@ class Title(models.Model):
         blank=True,
         null=True
     )
+    rating = models.FloatField(
+        'Рейтинг',
+        blank=True,
+        null=True,
+        db_index=True
+    )
+    weighted_rating = models.FloatField(
+        'Взвешенный рейтинг',
+        blank=True,
+        null=True,
+        db_index=True
+    )
+    score_sum = models.PositiveIntegerField('Сумма оценок', default=0)
+    review_count = models.PositiveIntegerField(
+        'Количество отзывов',
+        default=0,
+        db_index=True
+    )
+    last_review_date = models.DateTimeField(
+        'Дата последнего отзыва',
+        blank=True,
+        null=True,
+        db_index=True
+    )
 
     class Meta:
         ordering = ('name',)
+        indexes = [
+            models.Index(
+                fields=['category', '-rating'],
+                name='title_category_rating_idx'
+            ),
+            models.Index(
+                fields=['category', '-review_count'],
+                name='title_category_reviews_idx'
+            ),
+            models.Index(
+                fields=['category', '-last_review_date'],
+                name='title_category_activity_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -126,6 +194,9 @@ class Review(models.Model):
     )
     pub_date = models.DateTimeField(verbose_name='Дата отзыва',
                                     auto_now_add=True)
+    is_hidden = models.BooleanField(
+        'Скрыт модератором', default=False, db_index=True
+    )
 
     class Meta:
         ordering = ('-pub_date',)
@@ -137,10 +208,36 @@ class Review(models.Model):
             )
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает загруженную оценку для пересчёта рейтинга."""
+        instance = super().from_db(db, field_names, values)
+        score = dict(zip(field_names, values)).get('score')
+        instance._loaded_score = None if score is models.DEFERRED else score
+        return instance
+
     def __str__(self):
         return self.text
 
 
+class RatingDelta(models.Model):
+    """
+    Изменение рейтинга произведения, ещё не применённое к его колонкам
+    (при RATING_FLUSH_INTERVAL > 0). Записывается в одной транзакции
+    с изменением отзыва и общее для всех процессов сервера.
+    """
+    title_id = models.PositiveIntegerField('id произведения', db_index=True)
+    score_delta = models.IntegerField('Изменение суммы оценок')
+    count_delta = models.IntegerField('Изменение количества отзывов')
+    review_date = models.DateTimeField('Дата отзыва', null=True, blank=True)
+    refresh_date = models.BooleanField(
+        'Пересчитать дату последнего отзыва', default=False
+    )
+
+    def __str__(self):
+        return f'{self.title_id}: {self.score_delta:+}/{self.count_delta:+}'
+
+
 class Comment(models.Model):
     """Модель комментария к отзыву на произведение."""
     review = models.ForeignKey(
@@ -152,9 +249,76 @@ class Comment(models.Model):
         verbose_name='Автор комментария')
     pub_date = models.DateTimeField(verbose_name='Дата комментария',
                                     auto_now_add=True)
+    is_hidden = models.BooleanField(
+        'Скрыт модератором', default=False, db_index=True
+    )
 
     class Meta:
         ordering = ('-pub_date',)
 
     def __str__(self):
         return self.text
+
+
+class ModerationJob(models.Model):
+    """
+    Задание массовой модерации: удаление, скрытие или восстановление
+    отзывов либо комментариев, отобранных по автору, произведению,
+    периоду публикации и фрагменту текста.
+    """
+    REVIEWS = 'reviews'
+    COMMENTS = 'comments'
+    TARGET_CHOICES = (
+        (REVIEWS, 'Отзывы'),
+        (COMMENTS, 'Комментарии'),
+    )
+
+    DELETE = 'delete'
+    HIDE = 'hide'
+    UNHIDE = 'unhide'
+    ACTION_CHOICES = (
+        (DELETE, 'Удалить'),
+        (HIDE, 'Скрыть'),
+        (UNHIDE, 'Восстановить'),
+    )
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнено'),
+        (FAILED, 'Ошибка'),
+    )
+
+    moderator = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, null=True,
+        related_name='moderation_jobs', verbose_name='Модератор')
+    target = models.CharField('Объекты', choices=TARGET_CHOICES,
+                              max_length=20)
+    action = models.CharField('Действие', choices=ACTION_CHOICES,
+                              max_length=20)
+    author = models.CharField('Имя автора', max_length=150, blank=True)
+    title_id = models.PositiveIntegerField('id произведения', null=True,
+                                           blank=True)
+    date_from = models.DateTimeField('Опубликовано с', null=True, blank=True)
+    date_to = models.DateTimeField('Опубликовано до', null=True, blank=True)
+    text = models.CharField('Фрагмент текста', max_length=200, blank=True)
+    status = models.CharField('Статус', choices=STATUS_CHOICES,
+                              default=PENDING, max_length=20)
+    total = models.PositiveIntegerField('Найдено объектов', default=0)
+    processed = models.PositiveIntegerField('Обработано объектов', default=0)
+    error = models.TextField('Ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    finished = models.DateTimeField('Завершено', null=True, blank=True)
+    lease = models.CharField('Исполнитель', max_length=32, blank=True)
+    heartbeat = models.DateTimeField('Последняя пачка', null=True,
+                                     blank=True)
+
+    class Meta:
+        ordering = ('-created',)
+
+    def __str__(self):
+        return f'{self.action} {self.target} #{self.pk}'
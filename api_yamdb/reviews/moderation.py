@@ -0,0 +1,155 @@
+"""
+Массовая модерация отзывов и комментариев.
+
+Задание (ModerationJob) обрабатывается пачками по MODERATION_CHUNK_SIZE
+объектов: id очередной пачки выбираются одним запросом, после чего
+пачка удаляется (reviews.deletion) или скрывается запросами к таблицам,
+без загрузки объектов и сигналов на каждый объект. Рейтинг произведений
+поправляется приращениями, посчитанными одним агрегирующим запросом
+на пачку.
+После каждой пачки сохраняется прогресс задания; обработанные объекты
+перестают подходить под отбор, поэтому прерванное задание можно
+продолжить повторным запуском.
+
+Исполнитель захватывает задание условным UPDATE: из очереди или
+выполняющееся, если его исполнитель не сообщал о себе дольше
+MODERATION_JOB_LEASE секунд. Каждая пачка обрабатывается, только если
+задание всё ещё за этим исполнителем, поэтому два процесса не
+обрабатывают одно задание одновременно.
+
+Задание выполняется в фоновом потоке (см. reviews.tasks).
+"""
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from reviews.deletion import delete_queryset
+from reviews.models import Comment, ModerationJob, Review
+from reviews.ratings import record_review_deltas, review_rating_deltas
+from reviews.tasks import run_after_commit
+
+logger = logging.getLogger(__name__)
+
+
+class JobLeaseLost(Exception):
+    """Задание перехватил другой исполнитель."""
+
+
+def job_queryset(job):
+    """Объекты, ещё не обработанные заданием."""
+    model = Review if job.target == ModerationJob.REVIEWS else Comment
+    queryset = model.objects.order_by('pk')
+    if job.action == ModerationJob.HIDE:
+        queryset = queryset.filter(is_hidden=False)
+    elif job.action == ModerationJob.UNHIDE:
+        queryset = queryset.filter(is_hidden=True)
+    if job.author:
+        queryset = queryset.filter(author__username=job.author)
+    if job.title_id is not None:
+        lookup = ('title_id' if job.target == ModerationJob.REVIEWS
+                  else 'review__title_id')
+        queryset = queryset.filter(**{lookup: job.title_id})
+    if job.date_from is not None:
+        queryset = queryset.filter(pub_date__gte=job.date_from)
+    if job.date_to is not None:
+        queryset = queryset.filter(pub_date__lt=job.date_to)
+    if job.text:
+        queryset = queryset.filter(text__icontains=job.text)
+    return queryset
+
+
+def process_reviews(action, review_ids):
+    if action == ModerationJob.DELETE:
+        delete_queryset(Review.objects.filter(pk__in=review_ids))
+        return
+    hide = action == ModerationJob.HIDE
+    with transaction.atomic(savepoint=False):
+        # Блокируем отзывы, которые ещё в исходном состоянии: рейтинг
+        # поправляется только по строкам, которые меняет UPDATE.
+        changed = list(Review.objects.select_for_update().filter(
+            pk__in=review_ids, is_hidden=not hide
+        ).values_list('pk', flat=True))
+        deltas = review_rating_deltas(changed, -1 if hide else 1)
+        Review.objects.filter(pk__in=changed, is_hidden=not hide).update(
+            is_hidden=hide
+        )
+        record_review_deltas(deltas)
+
+
+def process_comments(action, comment_ids):
+    comments = Comment.objects.filter(pk__in=comment_ids)
+    if action == ModerationJob.DELETE:
+        delete_queryset(comments)
+    else:
+        hide = action == ModerationJob.HIDE
+        comments.filter(is_hidden=not hide).update(is_hidden=hide)
+
+
+def claim_job(job):
+    """Захватывает задание из очереди или с истёкшей арендой.
+    Возвращает False, если задание выполняет другой исполнитель.
+    """
+    now = timezone.now()
+    expired = now - timedelta(seconds=settings.MODERATION_JOB_LEASE)
+    lease = uuid.uuid4().hex
+    claimed = ModerationJob.objects.filter(pk=job.pk).filter(
+        Q(status=ModerationJob.PENDING)
+        | Q(status=ModerationJob.RUNNING, heartbeat__lt=expired)
+        | Q(status=ModerationJob.RUNNING, heartbeat__isnull=True)
+    ).update(status=ModerationJob.RUNNING, lease=lease, heartbeat=now)
+    if claimed:
+        job.status, job.lease, job.heartbeat = (
+            ModerationJob.RUNNING, lease, now)
+    return bool(claimed)
+
+
+def run_job(job):
+    """Выполняет задание пачками с сохранением прогресса. Возвращает
+    None, если задание выполняет другой исполнитель.
+    """
+    if not claim_job(job):
+        return None
+    jobs = ModerationJob.objects.filter(pk=job.pk, lease=job.lease)
+    queryset = job_queryset(job)
+    job.total = job.processed + queryset.count()
+    jobs.update(total=job.total)
+    process = (process_reviews if job.target == ModerationJob.REVIEWS
+               else process_comments)
+    try:
+        while True:
+            ids = list(queryset.values_list(
+                'pk', flat=True)[:settings.MODERATION_CHUNK_SIZE])
+            if not ids:
+                break
+            with transaction.atomic():
+                # UPDATE блокирует строку задания: пачку обработает
+                # только его текущий исполнитель.
+                if not jobs.update(processed=F('processed') + len(ids),
+                                   heartbeat=timezone.now()):
+                    raise JobLeaseLost
+                process(job.action, ids)
+            job.processed += len(ids)
+    except JobLeaseLost:
+        logger.warning('Задание модерации #%s перехвачено другим '
+                       'исполнителем', job.pk)
+        return None
+    except Exception as error:
+        logger.exception('Задание модерации #%s завершилось ошибкой', job.pk)
+        job.status = ModerationJob.FAILED
+        job.error = str(error)
+    else:
+        job.status = ModerationJob.DONE
+    job.finished = timezone.now()
+    jobs.update(status=job.status, error=job.error, finished=job.finished)
+    return job
+
+
+def start_job(job):
+    """Запускает задание после фиксации транзакции, в которой оно создано."""
+    run_after_commit(f'moderation-{job.pk}', run_job, job)
+    return job
@@ -0,0 +1,57 @@
+"""
+Окончательное удаление помеченных произведений и пользователей.
+
+Удаление произведения или пользователя через API только помечает запись
+(is_deleted): она сразу пропадает из выдачи, а пользователь теряет
+доступ. Связанные комментарии и отзывы удаляются фоновой задачей через
+reviews.deletion: пачками, в порядке зависимостей и без загрузки
+объектов в память. Помеченные записи сами служат очередью: команда
+purgedeleted дочищает то, что не успела фоновая задача.
+"""
+from reviews.changes import titles_updated
+from reviews.deletion import delete_queryset
+from reviews.models import CustomUser, Title
+from reviews.tasks import run_after_commit
+from reviews.user_state import forget_user
+
+
+def purge_title(title_id):
+    delete_queryset(Title.objects.filter(pk=title_id, is_deleted=True))
+
+
+def purge_user(user_id):
+    delete_queryset(CustomUser.objects.filter(pk=user_id, is_deleted=True))
+
+
+def purge_deleted():
+    """Окончательно удаляет все помеченные произведения и пользователей.
+    Возвращает их количество.
+    """
+    title_ids = list(
+        Title.objects.filter(is_deleted=True).values_list('pk', flat=True)
+    )
+    user_ids = list(
+        CustomUser.objects.filter(is_deleted=True).values_list(
+            'pk', flat=True)
+    )
+    for title_id in title_ids:
+        purge_title(title_id)
+    for user_id in user_ids:
+        purge_user(user_id)
+    return len(title_ids), len(user_ids)
+
+
+def soft_delete_title(title):
+    """Скрывает произведение и ставит его удаление в очередь."""
+    Title.objects.filter(pk=title.pk).update(is_deleted=True)
+    titles_updated.send(sender=Title)
+    run_after_commit(f'purge-title-{title.pk}', purge_title, title.pk)
+
+
+def soft_delete_user(user):
+    """Блокирует пользователя и ставит его удаление в очередь."""
+    CustomUser.objects.filter(pk=user.pk).update(
+        is_deleted=True, is_active=False
+    )
+    forget_user(user.pk)
+    run_after_commit(f'purge-user-{user.pk}', purge_user, user.pk)
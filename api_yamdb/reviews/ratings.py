@@ -0,0 +1,350 @@
+"""
+Поддержка денормализованного рейтинга произведений.
+
+Рейтинг, сумма оценок, количество отзывов и дата последнего отзыва хранятся
+в колонках модели Title и обновляются приращениями при записи отзывов,
+поэтому сортировки и выборки лучших произведений идут по индексам, а не
+через агрегацию всех отзывов. Дата последнего отзыва при удалении,
+скрытии и восстановлении отзывов пересчитывается подзапросом по видимым
+отзывам этих произведений.
+
+Взвешенный рейтинг смешивает среднюю оценку произведения со средней оценкой
+по всему каталогу (априорной), поэтому произведение с единственным отзывом
+не обгоняет произведения с тысячами отзывов. Априорная средняя считается
+одним агрегирующим запросом и хранится в кеше RATING_PRIOR_TTL секунд.
+
+При RATING_FLUSH_INTERVAL > 0 приращения не записываются в строку
+произведения сразу, а добавляются в таблицу RatingDelta в той же
+транзакции, что и изменение отзыва. Фоновый поток любого процесса
+применяет накопленные приращения одним UPDATE на произведение за
+интервал и удаляет их в той же транзакции. Так всплеск отзывов на одно
+произведение не выстраивается в очередь за блокировкой его строки,
+рейтинг отстаёт от отзывов не больше чем на интервал, а приращения
+не теряются при перезапуске процессов. reconcile_ratings() точно
+пересчитывает рейтинг и применяет накопленные приращения в одной
+транзакции, поэтому отзывы из них не учитываются дважды.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import (Case, Count, F, FloatField, Max, OuterRef,
+                              Subquery, Sum, Value, When)
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from reviews.changes import ratings_updated
+from reviews.models import MAX_SCORE, MIN_SCORE, RatingDelta, Review, Title
+
+RATING_PRIOR_CACHE_KEY = 'ratings:prior'
+
+logger = logging.getLogger(__name__)
+
+
+def rating_expression(score_delta=0, count_delta=0):
+    """Выражение среднего рейтинга с учётом приращений.
+    При нулевом количестве отзывов рейтинг равен NULL.
+    """
+    return (
+        Cast(F('score_sum') + score_delta, FloatField())
+        / NullIf(F('review_count') + count_delta, 0)
+    )
+
+
+def weighted_rating_expression(prior, score_delta=0, count_delta=0):
+    """Выражение взвешенного рейтинга с учётом приращений.
+    weighted = (сумма + m * prior) / (количество + m),
+    где m - RATING_PRIOR_WEIGHT. Без отзывов рейтинг равен NULL.
+    """
+    weight = settings.RATING_PRIOR_WEIGHT
+    return (
+        Cast(F('score_sum') + score_delta + weight * prior, FloatField())
+        / (NullIf(F('review_count') + count_delta, 0) + weight)
+    )
+
+
+def calculate_rating_prior():
+    """Средняя оценка по всем произведениям одним агрегирующим запросом."""
+    totals = Title.objects.aggregate(
+        score_sum=Sum('score_sum'), review_count=Sum('review_count')
+    )
+    if not totals['review_count']:
+        return (MIN_SCORE + MAX_SCORE) / 2
+    return totals['score_sum'] / totals['review_count']
+
+
+def get_rating_prior():
+    """Априорная средняя оценка из кеша с ленивым обновлением."""
+    prior = cache.get(RATING_PRIOR_CACHE_KEY)
+    if prior is None:
+        prior = calculate_rating_prior()
+        cache.set(RATING_PRIOR_CACHE_KEY, prior, settings.RATING_PRIOR_TTL)
+    return prior
+
+
+def refresh_weighted_ratings():
+    """Пересчитывает априорную среднюю и взвешенный рейтинг всех
+    произведений: один агрегирующий запрос и один UPDATE.
+    """
+    prior = calculate_rating_prior()
+    cache.set(RATING_PRIOR_CACHE_KEY, prior, settings.RATING_PRIOR_TTL)
+    Title.objects.update(weighted_rating=weighted_rating_expression(prior))
+    ratings_updated.send(sender=Title, title_ids=None)
+    return prior
+
+
+def last_review_date_subquery(excluded_review_ids=()):
+    """Дата последнего видимого отзыва произведения."""
+    reviews = Review.objects.filter(title=OuterRef('pk'), is_hidden=False)
+    if excluded_review_ids:
+        reviews = reviews.exclude(pk__in=excluded_review_ids)
+    return Subquery(
+        reviews.order_by().values('title').annotate(last=Max('pub_date'))
+        .values('last')
+    )
+
+
+def refresh_last_review_dates(title_ids, excluded_review_ids=()):
+    """Пересчитывает дату последнего отзыва произведений после
+    удаления, скрытия или восстановления отзывов. excluded_review_ids -
+    отзывы, которые удаляются пачкой: сигнал о них отправляется до
+    DELETE, и в таблице они ещё есть.
+    """
+    Title.objects.filter(pk__in=title_ids).update(
+        last_review_date=last_review_date_subquery(excluded_review_ids)
+    )
+
+
+def apply_review_delta(title_id, score_delta, count_delta, review_date=None,
+                       refresh_date=False, excluded_review_ids=()):
+    """Применяет изменение оценок к произведению одним UPDATE."""
+    updates = {
+        'score_sum': F('score_sum') + score_delta,
+        'review_count': F('review_count') + count_delta,
+        'rating': rating_expression(score_delta, count_delta),
+        'weighted_rating': weighted_rating_expression(
+            get_rating_prior(), score_delta, count_delta),
+    }
+    if refresh_date or (count_delta and review_date is None):
+        updates['last_review_date'] = last_review_date_subquery(
+            excluded_review_ids)
+    elif review_date is not None:
+        updates['last_review_date'] = review_date
+    Title.objects.filter(pk=title_id).update(**updates)
+    ratings_updated.send(sender=Title, title_ids=[title_id])
+
+
+def apply_review_deltas(deltas, excluded_review_ids=()):
+    """Применяет изменения оценок нескольких произведений одним UPDATE.
+    deltas - словарь {title_id: (score_delta, count_delta, review_date)}.
+    """
+    if len(deltas) == 1:
+        (title_id, delta), = deltas.items()
+        apply_review_delta(title_id, *delta,
+                           excluded_review_ids=excluded_review_ids)
+        return
+
+    def per_title(position, default):
+        return Case(
+            *(When(pk=title_id, then=Value(delta[position]))
+              for title_id, delta in deltas.items()
+              if delta[position] is not None),
+            default=default
+        )
+
+    score_delta = per_title(0, Value(0))
+    count_delta = per_title(1, Value(0))
+    updates = {
+        'score_sum': F('score_sum') + score_delta,
+        'review_count': F('review_count') + count_delta,
+        'rating': rating_expression(score_delta, count_delta),
+        'weighted_rating': weighted_rating_expression(
+            get_rating_prior(), score_delta, count_delta),
+    }
+    if any(delta[2] is not None for delta in deltas.values()):
+        updates['last_review_date'] = per_title(2, F('last_review_date'))
+    Title.objects.filter(pk__in=list(deltas)).update(**updates)
+    refreshed = [
+        title_id for title_id, (_, count_delta, review_date)
+        in deltas.items() if count_delta and review_date is None
+    ]
+    if refreshed:
+        refresh_last_review_dates(refreshed, excluded_review_ids)
+    ratings_updated.send(sender=Title, title_ids=list(deltas))
+
+
+def review_rating_deltas(review_ids, sign):
+    """Приращения рейтинга произведений при удалении или скрытии
+    (sign = -1) видимых отзывов либо восстановлении (sign = 1) скрытых.
+    Считаются одним агрегирующим запросом.
+    """
+    totals = Review.objects.filter(
+        pk__in=review_ids, is_hidden=(sign > 0)
+    ).order_by().values('title_id').annotate(
+        score=Sum('score'), count=Count('pk')
+    )
+    return {
+        row['title_id']: (sign * row['score'], sign * row['count'], None)
+        for row in totals
+    }
+
+
+def recalculate_ratings(title_ids=None):
+    """Точный пересчёт рейтинга по таблице отзывов без учёта скрытых.
+    Если title_ids не указан, пересчитываются все произведения.
+    Ещё не применённые приращения (RatingDelta) вычитаются: они будут
+    применены позже, и их отзывы не учитываются дважды.
+    """
+    titles = Title.objects.all()
+    if title_ids is not None:
+        titles = titles.filter(pk__in=title_ids)
+    reviews = Review.objects.filter(
+        title=OuterRef('pk'), is_hidden=False
+    ).order_by().values('title')
+    pending = RatingDelta.objects.filter(
+        title_id=OuterRef('pk')
+    ).order_by().values('title_id')
+
+    def total(queryset, expression):
+        return Coalesce(Subquery(
+            queryset.annotate(total=expression).values('total')), 0)
+
+    titles.update(
+        score_sum=(total(reviews, Sum('score'))
+                   - total(pending, Sum('score_delta'))),
+        review_count=(total(reviews, Count('pk'))
+                      - total(pending, Sum('count_delta'))),
+        last_review_date=last_review_date_subquery(),
+    )
+    titles.update(
+        rating=rating_expression(),
+        weighted_rating=weighted_rating_expression(get_rating_prior()),
+    )
+    ratings_updated.send(
+        sender=Title,
+        title_ids=list(title_ids) if title_ids is not None else None
+    )
+
+
+class RatingUpdateBuffer:
+    """Применение приращений оценок из таблицы RatingDelta."""
+    BATCH_SIZE = 10_000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, title_id, score_delta, count_delta, review_date=None,
+            refresh_date=False):
+        self.add_many({title_id: (score_delta, count_delta, review_date,
+                                  refresh_date)})
+
+    def add_many(self, deltas):
+        """Записывает приращения в текущей транзакции.
+        deltas - словарь {title_id: (score_delta, count_delta,
+        review_date[, refresh_date])}.
+        """
+        # Дату последнего отзыва после удаления или скрытия
+        # пересчитываем по таблице отзывов.
+        RatingDelta.objects.bulk_create(
+            RatingDelta(
+                title_id=title_id, score_delta=score_delta,
+                count_delta=count_delta, review_date=review_date,
+                refresh_date=any(refresh) or bool(
+                    count_delta and review_date is None),
+            )
+            for title_id, (score_delta, count_delta, review_date, *refresh)
+            in deltas.items()
+        )
+        self.start()
+
+    def start(self):
+        """Запускает фоновый поток применения приращений."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='rating-flusher', daemon=True
+                )
+                self._thread.start()
+
+    def pending(self):
+        """Количество произведений с неприменёнными приращениями."""
+        return RatingDelta.objects.values('title_id').distinct().count()
+
+    def flush(self, title_ids=None):
+        """Применяет накопленные приращения, по одному UPDATE
+        на произведение. Возвращает количество обновлённых произведений.
+        """
+        updated = set()
+        while True:
+            with transaction.atomic():
+                rows = RatingDelta.objects.select_for_update().order_by('pk')
+                if title_ids is not None:
+                    rows = rows.filter(title_id__in=title_ids)
+                rows = list(rows[:self.BATCH_SIZE])
+                deltas = {}
+                for row in rows:
+                    delta = deltas.setdefault(
+                        row.title_id, [0, 0, None, False])
+                    delta[0] += row.score_delta
+                    delta[1] += row.count_delta
+                    if row.review_date is not None and (
+                            delta[2] is None or row.review_date > delta[2]):
+                        delta[2] = row.review_date
+                    delta[3] = delta[3] or row.refresh_date
+                for title_id, delta in deltas.items():
+                    apply_review_delta(title_id, *delta)
+                RatingDelta.objects.filter(
+                    pk__in=[row.pk for row in rows]).delete()
+            updated.update(deltas)
+            if len(rows) < self.BATCH_SIZE:
+                return len(updated)
+
+    def _run(self):
+        while True:
+            time.sleep(settings.RATING_FLUSH_INTERVAL or 1)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось применить приращения рейтинга')
+            finally:
+                connections.close_all()
+
+
+rating_updates = RatingUpdateBuffer()
+
+
+def record_review_delta(title_id, score_delta, count_delta,
+                        review_date=None):
+    """Учитывает изменение оценок сразу или через таблицу приращений,
+    в зависимости от RATING_FLUSH_INTERVAL.
+    """
+    if not settings.RATING_FLUSH_INTERVAL:
+        apply_review_delta(title_id, score_delta, count_delta, review_date)
+        return
+    rating_updates.add(title_id, score_delta, count_delta, review_date)
+
+
+def record_review_deltas(deltas, excluded_review_ids=()):
+    """Учитывает изменения оценок нескольких произведений:
+    сразу одним UPDATE или через таблицу приращений. Приращения
+    применяются после фиксации транзакции, когда отзывы
+    excluded_review_ids уже удалены.
+    """
+    if not deltas:
+        return
+    if not settings.RATING_FLUSH_INTERVAL:
+        apply_review_deltas(deltas, excluded_review_ids)
+        return
+    rating_updates.add_many(deltas)
+
+
+def reconcile_ratings(title_ids=None):
+    """Точно пересчитывает рейтинг по таблице отзывов и применяет
+    накопленные приращения всех процессов в одной транзакции.
+    """
+    with transaction.atomic():
+        recalculate_ratings(title_ids)
+        rating_updates.flush(title_ids)
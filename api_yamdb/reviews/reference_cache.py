@@ -0,0 +1,124 @@
+"""
+Справочники жанров и категорий в памяти процесса.
+
+Таблицы жанров и категорий небольшие и меняются редко, а читаются при
+каждой записи произведения (слаг -> id) и при выводе каждого
+произведения (id -> название и слаг). Поэтому процесс держит полную копию
+справочника и перед обращением сверяет её версию в общем кеше: одно
+обращение к кешу вместо запроса к БД.
+
+После фиксации изменения жанра или категории версия увеличивается
+(см. reviews.signals), и при общем кеше все процессы перечитывают
+справочник при следующем обращении. С кешем в памяти процесса
+(LocMemCache) изменения других процессов видны не позже чем через
+REFERENCE_CACHE_TTL секунд. Слаг или id, которых нет в копии, ищутся
+в БД: так находятся записи, созданные другим процессом или в ещё не
+зафиксированной транзакции.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import router, transaction
+
+from reviews.genre_index import bump_shared_version, get_shared_version
+from reviews.models import Category, Genre
+
+FIELDS = ('pk', 'name', 'slug')
+
+
+class ReferenceCache:
+    """Копия справочника: слаг -> id и id -> {'name', 'slug'}."""
+
+    def __init__(self, model):
+        self.model = model
+        self.version_key = f'reference:{model._meta.label_lower}:version'
+        self._lock = threading.RLock()
+        self._version = None
+        self._ids = {}
+        self._rows = {}
+        self._loaded_at = 0.0
+
+    def _ensure_fresh(self):
+        version = get_shared_version(self.version_key)
+        expired = (time.monotonic() - self._loaded_at
+                   >= settings.REFERENCE_CACHE_TTL)
+        if self._version != version or expired:
+            rows = {
+                pk: {'name': name, 'slug': slug}
+                for pk, name, slug in self.model.objects.values_list(*FIELDS)
+            }
+            self._ids = {row['slug']: pk for pk, row in rows.items()}
+            self._rows = rows
+            self._version = version
+            self._loaded_at = time.monotonic()
+
+    def _missing_rows(self, ids):
+        """Записи, которых нет в копии, из БД."""
+        return {
+            pk: {'name': name, 'slug': slug}
+            for pk, name, slug in self.model.objects.filter(
+                pk__in=ids).values_list(*FIELDS)
+        }
+
+    def _instance(self, pk, name, slug):
+        return self.model.from_db(
+            router.db_for_read(self.model), ('id', 'name', 'slug'),
+            (pk, name, slug)
+        )
+
+    def get(self, pk):
+        """Название и слаг по id; None, если записи нет."""
+        if pk is None:
+            return None
+        with self._lock:
+            self._ensure_fresh()
+            row = self._rows.get(pk)
+        if row is None:
+            row = self._missing_rows([pk]).get(pk)
+        return row
+
+    def get_many(self, ids):
+        """Названия и слаги по списку id в порядке сортировки по названию."""
+        with self._lock:
+            self._ensure_fresh()
+            found = {pk: self._rows[pk] for pk in ids if pk in self._rows}
+        missing = set(ids) - set(found)
+        if missing:
+            found.update(self._missing_rows(missing))
+        return [row for _, row in sorted(
+            found.items(), key=lambda item: (item[1]['name'], item[0]))]
+
+    def by_slugs(self, slugs):
+        """Объекты модели по слагам: {слаг: объект}.
+        Неизвестные слаги в результат не попадают.
+        """
+        found = {}
+        with self._lock:
+            self._ensure_fresh()
+            for slug in slugs:
+                pk = self._ids.get(slug)
+                if pk is not None:
+                    found[slug] = self._instance(pk, **self._rows[pk])
+        missing = set(slugs) - set(found)
+        if missing:
+            for pk, name, slug in self.model.objects.filter(
+                    slug__in=missing).values_list(*FIELDS):
+                found[slug] = self._instance(pk, name, slug)
+        return found
+
+    def invalidate(self):
+        """Сбрасывает копию справочника во всех процессах."""
+        with self._lock:
+            self._version = None
+            bump_shared_version(self.version_key)
+
+    def on_commit(self, method, *args):
+        """Откладывает изменение до фиксации транзакции."""
+        transaction.on_commit(lambda: getattr(self, method)(*args))
+
+
+genres = ReferenceCache(Genre)
+categories = ReferenceCache(Category)
+
+REFERENCES = {Genre: genres, Category: categories}
@@ -0,0 +1,112 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.deletion import pre_raw_delete
+from reviews.genre_index import genre_index
+from reviews.models import Category, CustomUser, Genre, Review, Title
+from reviews.ratings import (recalculate_ratings, record_review_delta,
+                             record_review_deltas, review_rating_deltas)
+from reviews.reference_cache import REFERENCES
+from reviews.user_state import forget_user
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    """Обновляет рейтинг произведения после сохранения отзыва."""
+    if raw or instance.is_hidden:
+        return
+    if created:
+        record_review_delta(
+            instance.title_id, instance.score, 1, instance.pub_date
+        )
+    elif getattr(instance, '_loaded_score', None) is None:
+        recalculate_ratings([instance.title_id])
+    elif instance.score != instance._loaded_score:
+        record_review_delta(
+            instance.title_id, instance.score - instance._loaded_score, 0
+        )
+    instance._loaded_score = instance.score
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """Обновляет рейтинг произведения после удаления отзыва."""
+    if instance.is_hidden:
+        return
+    record_review_delta(instance.title_id, -instance.score, -1)
+
+
+@receiver(pre_raw_delete, sender=Review)
+def reviews_raw_deleted(sender, ids, **kwargs):
+    """Обновляет рейтинг произведений перед удалением пачки отзывов."""
+    record_review_deltas(review_rating_deltas(ids, -1), ids)
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, created, **kwargs):
+    if created:
+        genre_index.on_commit('add_title', instance.pk)
+
+
+@receiver(post_delete, sender=Title)
+def title_deleted(sender, instance, **kwargs):
+    genre_index.on_commit('remove_title', instance.pk)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Переносит изменения связей произведений и жанров в битовый индекс."""
+    if action == 'post_clear':
+        genre_index.on_commit('invalidate')
+        return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    genre_ids, title_ids = list(pk_set), [instance.pk]
+    if reverse:
+        genre_ids, title_ids = title_ids, genre_ids
+    method = 'add_relations' if action == 'post_add' else 'remove_relations'
+    genre_index.on_commit(method, genre_ids, title_ids)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def genre_changed(sender, **kwargs):
+    genre_index.on_commit('invalidate')
+
+
+@receiver(pre_raw_delete, sender=Title)
+def titles_raw_deleted(sender, ids, **kwargs):
+    genre_index.on_commit('remove_titles', ids)
+
+
+@receiver(pre_raw_delete, sender=Title.genre.through)
+def genre_relations_raw_deleted(sender, ids, **kwargs):
+    """Удаляет из индекса связи пачки до их удаления из таблицы."""
+    pairs = list(sender.objects.filter(pk__in=ids).values_list(
+        'genre_id', 'title_id'
+    ))
+    genre_index.on_commit('remove_relation_pairs', pairs)
+
+
+@receiver(pre_raw_delete, sender=Genre)
+def genres_raw_deleted(sender, **kwargs):
+    genre_index.on_commit('invalidate')
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(pre_raw_delete, sender=Genre)
+@receiver(pre_raw_delete, sender=Category)
+def reference_changed(sender, **kwargs):
+    """Сбрасывает копию справочника после фиксации изменения."""
+    REFERENCES[sender].on_commit('invalidate')
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    """Сбрасывает кешированный признак активности пользователя."""
+    forget_user(instance.pk)
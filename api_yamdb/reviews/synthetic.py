@@ -0,0 +1,528 @@
+"""
+Синтетический набор данных для нагрузочных испытаний.
+
+Распределения приближены к реальному каталогу:
+- число отзывов на произведение подчиняется закону Ципфа с показателем
+  title_exponent: немногие популярные произведения собирают большую
+  часть отзывов (место произведения в рейтинге популярности случайно);
+- активность пользователей степенная: автор отзыва или комментария
+  с номером k выбирается с весом 1 / k ** user_exponent, при этом
+  у пары (произведение, автор) не больше одного отзыва;
+- категории и наборы жанров произведений выбираются с частотами
+  из образца (static/data), поэтому совместная встречаемость жанров
+  совпадает с образцом. Оттуда же берутся годы, слова для текстов,
+  длины текстов и распределение оценок.
+
+Работа делится на блоки фиксированного размера: блоки пользователей
+и блоки произведений с их жанрами, отзывами и комментариями.
+Идентификаторы блока вычисляются заранее, а генератор случайных чисел
+блока инициализируется от (seed, вид блока, номер блока), поэтому
+результат не зависит от числа процессов и порядка их работы.
+
+Данные пишутся в базу пакетами через executemany в обход моделей
+и сигналов либо в csv-файлы, которые принимает команда importcsv.
+"""
+import csv
+import multiprocessing
+import os
+import random
+import shutil
+from array import array
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.db import connection, connections, transaction
+
+from reviews.models import (MAX_SCORE, MIN_SCORE, Category, Comment, Genre,
+                            Review, Title)
+
+USERS_BLOCK = 10_000
+TITLES_BLOCK = 500
+START_DATE = datetime(2015, 1, 1, tzinfo=timezone.utc).timestamp()
+END_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+# Среднее время до комментария к отзыву, секунды.
+COMMENT_DELAY = 3 * 24 * 3600
+ROLES = (('user', 0.98), ('moderator', 0.015), ('admin', 0.005))
+
+# Столбцы таблиц в порядке значений в строках. Имена совпадают
+# с заголовками csv-файлов, которые понимает importcsv.
+TABLES = {
+    'users': ('id', 'username', 'email', 'role', 'bio', 'first_name',
+              'last_name'),
+    'titles': ('id', 'name', 'year', 'description', 'category_id'),
+    'genre_title': ('id', 'title_id', 'genre_id'),
+    'review': ('id', 'title_id', 'text', 'author_id', 'score', 'pub_date'),
+    'comments': ('id', 'review_id', 'text', 'author_id', 'pub_date'),
+}
+DATETIME_COLUMNS = ('pub_date',)
+
+
+def table_models():
+    return {
+        'users': get_user_model(),
+        'titles': Title,
+        'genre_title': Title.genre.through,
+        'review': Review,
+        'comments': Comment,
+    }
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as file:
+        return list(csv.DictReader(file))
+
+
+def column(row, name):
+    """Значение столбца до или после переименования в importcsv."""
+    return row[name] if name in row else row[f'{name}_id']
+
+
+class Sample:
+    """Частоты и словарь, извлечённые из csv-файлов образца."""
+
+    def __init__(self, directory):
+        self.categories = read_csv(os.path.join(directory, 'category.csv'))
+        self.genres = read_csv(os.path.join(directory, 'genre.csv'))
+        titles = read_csv(os.path.join(directory, 'titles.csv'))
+        genre_sets = defaultdict(list)
+        for row in read_csv(os.path.join(directory, 'genre_title.csv')):
+            genre_sets[row['title_id']].append(int(row['genre_id']))
+        sets = Counter(
+            tuple(sorted(genre_sets.get(row['id'], ()))) for row in titles
+        )
+        self.genre_sets = list(sets)
+        self.genre_set_weights = list(accumulate(sets.values()))
+        self.category_ids = [
+            int(column(row, 'category')) if column(row, 'category') else None
+            for row in titles
+        ]
+        self.years = [int(row['year']) for row in titles]
+        reviews = read_csv(os.path.join(directory, 'review.csv'))
+        comments = read_csv(os.path.join(directory, 'comments.csv'))
+        self.scores = [int(row['score']) for row in reviews]
+        self.review_lengths = [len(row['text'].split()) for row in reviews]
+        self.comment_lengths = [len(row['text'].split()) for row in comments]
+        self.words = [word for row in reviews + comments
+                      for word in row['text'].split()]
+
+    def text(self, rng, lengths):
+        return ' '.join(rng.choices(self.words, k=rng.choice(lengths)))
+
+
+class Plan:
+    """Параметры генерации, общие для всех процессов."""
+
+    def __init__(self, sample, users, seed, user_exponent, directory,
+                 batch_size, genre_ids, category_ids, first_user_id):
+        self.sample = sample
+        self.users = users
+        self.seed = seed
+        self.user_exponent = user_exponent
+        self.directory = directory
+        self.batch_size = batch_size
+        self.genre_ids = genre_ids
+        self.category_ids = category_ids
+        self.first_user_id = first_user_id
+        # Шаг идентификаторов связей произведение-жанр на произведение.
+        self.relation_stride = max(map(len, sample.genre_sets), default=1)
+
+    def rng(self, kind, index):
+        return random.Random(f'{self.seed}:{kind}:{index}')
+
+
+class Sink:
+    """Буферизованная запись строк по таблицам."""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.buffers = defaultdict(list)
+
+    def write(self, table, row):
+        buffer = self.buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, table):
+        rows = self.buffers.pop(table, None)
+        if rows:
+            self.save(table, rows)
+
+    def close(self):
+        for table in TABLES:
+            self.flush(table)
+
+
+class CsvSink(Sink):
+    """Пишет части csv-файлов блока: <таблица>.<блок>.part."""
+
+    def __init__(self, batch_size, directory, block):
+        super().__init__(batch_size)
+        self.directory = directory
+        self.block = block
+
+    def save(self, table, rows):
+        positions = [TABLES[table].index(name) for name in DATETIME_COLUMNS
+                     if name in TABLES[table]]
+        path = os.path.join(self.directory, f'{table}.{self.block}.part')
+        with open(path, 'a', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file, lineterminator='\n')
+            for row in rows:
+                row = list(row)
+                for position in positions:
+                    row[position] = datetime.fromtimestamp(
+                        row[position], timezone.utc
+                    ).isoformat(timespec='milliseconds').replace(
+                        '+00:00', 'Z')
+                writer.writerow(row)
+
+
+class DbSink(Sink):
+    """Вставляет строки через executemany, каждый пакет в своей
+    транзакции. SQLite допускает одного писателя, поэтому для него
+    запись пакетов из разных процессов сериализуется блокировкой.
+    """
+
+    def __init__(self, batch_size, lock=None):
+        super().__init__(batch_size)
+        self.lock = (lock if lock is not None and connection.vendor == 'sqlite'
+                     else nullcontext())
+        self.statements = {}
+
+    def statement(self, table):
+        if table not in self.statements:
+            model = table_models()[table]
+            meta = model._meta
+            columns = TABLES[table]
+            converters = []
+            for name in columns:
+                field = meta.get_field(name)
+                converters.append(
+                    (lambda value, field=field: field.get_db_prep_save(
+                        datetime.fromtimestamp(value, timezone.utc),
+                        connection))
+                    if name in DATETIME_COLUMNS else None
+                )
+            defaults = {'password': UNUSABLE_PASSWORD_PREFIX}
+            extra = [
+                (field.column, field.get_db_prep_save(
+                    defaults.get(field.attname, field.get_default()),
+                    connection))
+                for field in meta.concrete_fields
+                if field.attname not in columns
+            ]
+            names = [meta.get_field(name).column for name in columns]
+            names += [name for name, _ in extra]
+            sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+                connection.ops.quote_name(meta.db_table),
+                ', '.join(map(connection.ops.quote_name, names)),
+                ', '.join(['%s'] * len(names)),
+            )
+            self.statements[table] = (
+                sql, converters, tuple(value for _, value in extra))
+        return self.statements[table]
+
+    def save(self, table, rows):
+        sql, converters, extra = self.statement(table)
+        params = [
+            tuple(value if convert is None else convert(value)
+                  for value, convert in zip(row, converters)) + extra
+            for row in rows
+        ]
+        with self.lock, transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+
+
+def zipf_weights(count, exponent):
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def pick_distinct(rng, count, population, cum_weights):
+    """count различных индексов с весами cum_weights. Если нужно больше
+    половины совокупности или веса слишком неравномерны, недостающие
+    индексы добираются равномерно.
+    """
+    if count * 2 >= population:
+        return rng.sample(range(population), count)
+    chosen = {}
+    for _ in range(4):
+        missing = count - len(chosen)
+        if not missing:
+            break
+        for index in rng.choices(range(population), cum_weights=cum_weights,
+                                 k=missing):
+            chosen[index] = None
+            if len(chosen) == count:
+                break
+    while len(chosen) < count:
+        chosen[rng.randrange(population)] = None
+    return list(chosen)
+
+
+def allocate(rng, total, weights):
+    """Делит total пропорционально weights со случайным округлением."""
+    norm = sum(weights)
+    counts = []
+    for weight in weights:
+        expected = total * weight / norm if norm else 0
+        count = int(expected)
+        if rng.random() < expected - count:
+            count += 1
+        counts.append(count)
+    return counts
+
+
+# Состояние процесса-исполнителя: план, блокировка записи и веса
+# активности пользователей, которые вычисляются один раз на процесс.
+_worker = {}
+
+
+def init_worker(plan, lock=None):
+    _worker.clear()
+    _worker.update(plan=plan, lock=lock)
+
+
+def user_weights():
+    if 'user_weights' not in _worker:
+        plan = _worker['plan']
+        _worker['user_weights'] = zipf_weights(plan.users,
+                                               plan.user_exponent)
+    return _worker['user_weights']
+
+
+def make_sink(block):
+    plan = _worker['plan']
+    if plan.directory is not None:
+        return CsvSink(plan.batch_size, plan.directory, block)
+    return DbSink(plan.batch_size, _worker['lock'])
+
+
+def generate_users(index, first_id, count):
+    plan = _worker['plan']
+    rng = plan.rng('users', index)
+    roles, weights = zip(*ROLES)
+    sink = make_sink(f'users{index:06}')
+    for user_id in range(first_id, first_id + count):
+        sink.write('users', (
+            user_id, f'user{user_id}', f'user{user_id}@yamdb.fake',
+            rng.choices(roles, weights)[0], '', '', '',
+        ))
+    sink.close()
+    return {'users': count}
+
+
+def generate_titles(index, first_id, review_counts, first_review_id,
+                    comment_count, first_comment_id):
+    """Блок произведений с жанрами, отзывами и комментариями."""
+    plan = _worker['plan']
+    sample = plan.sample
+    rng = plan.rng('titles', index)
+    sink = make_sink(f'titles{index:06}')
+    cum_weights = user_weights()
+    counts = Counter()
+    biases = []
+    for title_id in range(first_id, first_id + len(review_counts)):
+        category = rng.choice(sample.category_ids)
+        sink.write('titles', (
+            title_id,
+            ' '.join(rng.choices(sample.words, k=rng.randint(1, 4))),
+            rng.choice(sample.years),
+            sample.text(rng, sample.review_lengths),
+            plan.category_ids.get(category),
+        ))
+        genre_set = rng.choices(sample.genre_sets,
+                                cum_weights=sample.genre_set_weights)[0]
+        for position, genre in enumerate(genre_set):
+            sink.write('genre_title', (
+                (title_id - 1) * plan.relation_stride + position + 1,
+                title_id, plan.genre_ids[genre],
+            ))
+        biases.append(rng.gauss(0, 1.5))
+        counts['titles'] += 1
+        counts['genre_title'] += len(genre_set)
+    # Отзывы и комментарии ссылаются на уже записанные строки.
+    sink.flush('titles')
+    sink.flush('genre_title')
+
+    review_dates = array('d')
+    review_id = first_review_id
+    for offset, count in enumerate(review_counts):
+        authors = pick_distinct(rng, count, plan.users, cum_weights)
+        for author in authors:
+            score = round(rng.choice(sample.scores) + biases[offset])
+            date = round(rng.uniform(START_DATE, END_DATE), 3)
+            sink.write('review', (
+                review_id, first_id + offset,
+                sample.text(rng, sample.review_lengths),
+                plan.first_user_id + author,
+                min(max(score, MIN_SCORE), MAX_SCORE), date,
+            ))
+            review_dates.append(date)
+            review_id += 1
+    sink.flush('review')
+    counts['review'] = len(review_dates)
+
+    for comment_id in range(first_comment_id,
+                            first_comment_id + comment_count):
+        review = rng.randrange(len(review_dates))
+        date = min(review_dates[review]
+                   + rng.expovariate(1 / COMMENT_DELAY), END_DATE)
+        author = rng.choices(range(plan.users), cum_weights=cum_weights)[0]
+        sink.write('comments', (
+            comment_id, first_review_id + review,
+            sample.text(rng, sample.comment_lengths),
+            plan.first_user_id + author, round(date, 3),
+        ))
+    counts['comments'] = comment_count
+    sink.close()
+    return counts
+
+
+def run_block(task):
+    function, args = task
+    return function(*args)
+
+
+def max_id(model):
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return last or 0
+
+
+def reference_ids(sample, directory):
+    """Соответствие id жанров и категорий образца итоговым id. В базе
+    недостающие жанры и категории создаются по slug.
+    """
+    ids = []
+    for rows, model in ((sample.genres, Genre),
+                        (sample.categories, Category)):
+        if directory is not None:
+            ids.append({int(row['id']): int(row['id']) for row in rows})
+            continue
+        mapping = {}
+        for row in rows:
+            instance, _ = model.objects.get_or_create(
+                slug=row['slug'], defaults={'name': row['name']})
+            mapping[int(row['id'])] = instance.pk
+        ids.append(mapping)
+    return ids
+
+
+def write_references(sample, directory):
+    for name, rows in (('category.csv', sample.categories),
+                       ('genre.csv', sample.genres)):
+        with open(os.path.join(directory, name), 'w', encoding='utf-8',
+                  newline='') as file:
+            writer = csv.writer(file, lineterminator='\n')
+            writer.writerow(('id', 'name', 'slug'))
+            writer.writerows(
+                (row['id'], row['name'], row['slug']) for row in rows)
+
+
+def merge_parts(directory, parts):
+    """Склеивает части блоков в файлы таблиц в порядке блоков."""
+    for table, columns in TABLES.items():
+        path = os.path.join(directory, f'{table}.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as target:
+            csv.writer(target, lineterminator='\n').writerow(columns)
+            for name in sorted(os.listdir(parts)):
+                if name.startswith(f'{table}.'):
+                    with open(os.path.join(parts, name),
+                              encoding='utf-8', newline='') as part:
+                        shutil.copyfileobj(part, target)
+
+
+def run_tasks(plan, task_groups, workers, progress=None):
+    """Выполняет группы блоков по очереди: следующая группа начинается
+    после завершения предыдущей.
+    """
+    totals = Counter()
+
+    def report(counts):
+        totals.update(counts)
+        if progress is not None:
+            progress(totals)
+
+    if workers > 1:
+        # Дочерние процессы открывают собственные соединения с базой.
+        connections.close_all()
+        lock = multiprocessing.Lock()
+        with multiprocessing.Pool(workers, init_worker,
+                                  (plan, lock)) as pool:
+            for tasks in task_groups:
+                for counts in pool.imap(run_block, tasks):
+                    report(counts)
+    else:
+        init_worker(plan)
+        for tasks in task_groups:
+            for task in tasks:
+                report(run_block(task))
+    return totals
+
+
+def generate(sample_directory, titles, users, reviews, comments, seed=0,
+             title_exponent=1.0, user_exponent=0.8, workers=1,
+             directory=None, batch_size=5000, progress=None):
+    """
+    Генерирует набор данных. Если указан directory, пишет туда
+    csv-файлы в формате importcsv, иначе добавляет строки в базу
+    после уже существующих. Возвращает число строк по таблицам.
+    """
+    sample = Sample(sample_directory)
+    rng = random.Random(f'{seed}:plan')
+    # Место произведения в рейтинге популярности случайно.
+    ranks = list(range(1, titles + 1))
+    rng.shuffle(ranks)
+    review_counts = [
+        min(count, users) for count in allocate(
+            rng, reviews, [rank ** -title_exponent for rank in ranks])
+    ]
+    blocks = [review_counts[start:start + TITLES_BLOCK]
+              for start in range(0, titles, TITLES_BLOCK)]
+    comment_counts = allocate(rng, comments, [sum(block) for block in blocks])
+
+    if directory is None:
+        first_ids = [max_id(model) for model in table_models().values()]
+    else:
+        first_ids = [0] * len(TABLES)
+        os.makedirs(directory, exist_ok=True)
+        write_references(sample, directory)
+    first_user, first_title, first_relation, first_review, first_comment = (
+        first_ids)
+    genre_ids, category_ids = reference_ids(sample, directory)
+    plan = Plan(sample, users, seed, user_exponent, directory, batch_size,
+                genre_ids, category_ids, first_user + 1)
+    if first_relation > first_title * plan.relation_stride:
+        # Связи с жанрами должны начинаться после существующих.
+        first_title = -(-first_relation // plan.relation_stride)
+
+    # Пользователи пишутся раньше отзывов, которые на них ссылаются.
+    user_tasks = [
+        (generate_users,
+         (index, first_user + 1 + start, min(USERS_BLOCK, users - start)))
+        for index, start in enumerate(range(0, users, USERS_BLOCK))
+    ]
+    title_tasks = []
+    review_id, comment_id = first_review + 1, first_comment + 1
+    for index, block in enumerate(blocks):
+        title_tasks.append((generate_titles, (
+            index, first_title + 1 + index * TITLES_BLOCK, block,
+            review_id, comment_counts[index], comment_id,
+        )))
+        review_id += sum(block)
+        comment_id += comment_counts[index]
+
+    if directory is not None:
+        parts = os.path.join(directory, '.parts')
+        shutil.rmtree(parts, ignore_errors=True)
+        os.makedirs(parts)
+        plan.directory = parts
+    totals = run_tasks(plan, (user_tasks, title_tasks), workers, progress)
+    if directory is not None:
+        merge_parts(directory, parts)
+        shutil.rmtree(parts)
+    return totals
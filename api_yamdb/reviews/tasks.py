@@ -0,0 +1,33 @@
+"""
+Фоновое выполнение длительных операций.
+
+Задача запускается в отдельном потоке после фиксации текущей транзакции,
+чтобы видеть сохранённые в ней данные. При BACKGROUND_TASKS_EAGER задача
+выполняется сразу в текущем потоке (тесты, отладка).
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def run_task(name, func, *args):
+    try:
+        return func(*args)
+    except Exception:
+        logger.exception('Фоновая задача %s завершилась ошибкой', name)
+    finally:
+        connections.close_all()
+
+
+def run_after_commit(name, func, *args):
+    """Выполняет func(*args) в фоновом потоке после фиксации транзакции."""
+    if settings.BACKGROUND_TASKS_EAGER:
+        return func(*args)
+    transaction.on_commit(lambda: threading.Thread(
+        target=run_task, args=(name, func, *args), name=name, daemon=True
+    ).start())
+    return None
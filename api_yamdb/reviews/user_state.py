@@ -0,0 +1,41 @@
+"""
+Кешированный признак активности пользователя.
+
+Проверки, которые обходятся без загрузки пользователя из БД (например,
+повтор сохранённого ответа по ключу идемпотентности), узнают, не
+заблокирован и не удалён ли он, из кеша Django. Запись живёт
+USER_STATE_TTL секунд и удаляется после фиксации изменения пользователя
+или его пометки об удалении.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from reviews.models import CustomUser
+
+USER_STATE_KEY = 'user:active:{}'
+
+
+def remember_user(user):
+    """Запоминает состояние уже загруженного пользователя."""
+    cache.set(USER_STATE_KEY.format(user.pk),
+              user.is_active and not user.is_deleted,
+              settings.USER_STATE_TTL)
+
+
+def is_user_active(user_id):
+    """Пользователь существует, не заблокирован и не удалён."""
+    key = USER_STATE_KEY.format(user_id)
+    active = cache.get(key)
+    if active is None:
+        active = CustomUser.objects.filter(
+            pk=user_id, is_active=True, is_deleted=False
+        ).exists()
+        cache.set(key, active, settings.USER_STATE_TTL)
+    return active
+
+
+def forget_user(user_id):
+    """Сбрасывает запись после фиксации транзакции."""
+    transaction.on_commit(
+        lambda: cache.delete(USER_STATE_KEY.format(user_id)))
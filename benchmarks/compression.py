@@ -0,0 +1,151 @@
+"""
+Сжатие ответов: процессор против трафика.
+
+Для страницы списка произведений (синтетический JSON в формате API)
+измеряет по каждому доступному кодеку в быстром и максимальном режимах
+время сжатия, размер и степень сжатия, а затем время обработки запроса
+простым APIView: без сжатия, со сжатием при каждом запросе, при ответе
+из кеша сжатых ответов (api.response_cache) и при ответе из кеша, который
+сбрасывается записью в каталог после каждых --write-every запросов.
+
+Запуск из корня репозитория:
+    python benchmarks/compression.py [--iterations N] [--page-size N]
+                                     [--write-every N]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'api_yamdb')
+)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import AnonymousUser  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from rest_framework.response import Response  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+from rest_framework.views import APIView  # noqa: E402
+
+from api.compression import CODECS, compress  # noqa: E402
+from api.middleware import CompressionMiddleware  # noqa: E402
+from api.response_cache import invalidate_catalog  # noqa: E402
+
+GENRES = ['Драма', 'Комедия', 'Вестерн', 'Фантастика', 'Детектив',
+          'Триллер', 'Сказка', 'Гонзо', 'Ужасы', 'Роман']
+WORDS = ('произведение история герой время мир жизнь любовь война город '
+         'дорога тайна ночь море путь друг').split()
+
+
+def make_page(size, seed=0):
+    rng = random.Random(seed)
+    results = []
+    for number in range(size):
+        genres = rng.sample(GENRES, rng.randint(1, 3))
+        results.append({
+            'id': number + 1,
+            'name': ' '.join(rng.choices(WORDS, k=rng.randint(1, 4))),
+            'year': rng.randint(1900, 2024),
+            'description': ' '.join(rng.choices(WORDS, k=rng.randint(5, 40))),
+            'genre': [{'name': genre, 'slug': f'genre-{GENRES.index(genre)}'}
+                      for genre in genres],
+            'category': {'name': 'Фильм', 'slug': 'movie'},
+            'rating': rng.randint(1, 10),
+            'weighted_rating': round(rng.uniform(1, 10), 2),
+        })
+    return {'count': 10_000, 'next': None, 'previous': None,
+            'results': results}
+
+
+def per_call(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+
+def bench_codecs(content, iterations):
+    print(f'Тело ответа: {len(content)} байт\n')
+    print(f'{"кодек":<14}{"мкс":>10}{"байт":>10}{"сжатие":>10}'
+          f'{"мкс на 1 КБ экономии":>24}')
+    for encoding in CODECS:
+        for best in (False, True):
+            elapsed = per_call(
+                lambda: compress(content, encoding, best), iterations)
+            size = len(compress(content, encoding, best))
+            saved = (len(content) - size) / 1024
+            name = f'{encoding} ({"макс" if best else "быстр"})'
+            print(f'{name:<14}{elapsed * 1e6:>10.1f}{size:>10}'
+                  f'{len(content) / size:>10.2f}'
+                  f'{elapsed * 1e6 / saved:>24.2f}')
+
+
+def bench_requests(page, iterations, write_every):
+    class PageView(APIView):
+        authentication_classes = ()
+        permission_classes = ()
+        throttle_classes = ()
+
+        def get(self, request):
+            return Response(page)
+
+    view = PageView.as_view()
+
+    def render(request):
+        response = view(request)
+        response.render()
+        return response
+
+    middleware = CompressionMiddleware(render)
+    factory = APIRequestFactory()
+
+    def request(path, encoding='gzip'):
+        request = factory.get(path, HTTP_ACCEPT_ENCODING=encoding)
+        request.user = AnonymousUser()
+        return request
+
+    counter = iter(range(1, 2 ** 62))
+
+    def with_writes():
+        if next(counter) % write_every == 0:
+            invalidate_catalog()
+        return middleware(request('/api/v1/titles/'))
+
+    cache.clear()
+    results = {
+        'без сжатия': per_call(lambda: render(request('/')), iterations),
+        'сжатие в каждом запросе': per_call(
+            lambda: middleware(request('/')), iterations),
+        'из кеша сжатых ответов': per_call(
+            lambda: middleware(request('/api/v1/titles/')), iterations),
+        f'кеш, запись каждые {write_every}': per_call(
+            with_writes, iterations),
+    }
+    print()
+    for name, elapsed in results.items():
+        print(f'{name:<28}{elapsed * 1e6:>10.1f} мкс на запрос')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--write-every', type=int, default=10,
+                        help='Сбрасывать кеш после каждых N запросов.')
+    args = parser.parse_args()
+
+    page = make_page(args.page_size)
+    bench_codecs(json.dumps(page, ensure_ascii=False).encode(),
+                 args.iterations)
+    bench_requests(page, args.iterations, max(args.write_every, 1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,640 @@
+"""
+Нагрузочное тестирование API.
+
+Отправляет запросы на локальный сервер с заданной частотой (RPS) через
+пул соединений HTTP/1.1 с keep-alive на asyncio, без сторонних пакетов.
+Запросы отправляются по расписанию независимо от ответов (открытая
+модель нагрузки), поэтому задержка считается от запланированного
+момента отправки и включает ожидание свободного соединения: перегрузка
+сервера видна в процентилях, а не прячется снижением частоты.
+
+Источники запросов (--mix):
+- `read-heavy` - чтение каталога: списки и страницы произведений
+  с фильтрами, жанры, категории, отзывы и комментарии;
+- `signup-storm` - регистрация новых пользователей и запросы токена
+  с кодами подтверждения пользователей, созданных скриптом;
+- `review-burst` - всплеск отзывов и комментариев, в основном
+  к нескольким популярным произведениям. Отзыв отправляется только от
+  пользователя, который ещё не писал отзыв на это произведение, иначе
+  сервер отклонил бы его как повторный;
+- `postman` - запросы Postman-коллекции postman_collection/ по кругу;
+  переменные коллекции можно задать через --var;
+- `replay` - записанный трафик из JSONL-файла (--replay), по строке
+  на запрос: {"method": "GET", "path": "/api/v1/titles/",
+  "body": {...}, "token": "..."}.
+
+Для изменяющих запросов нужны токены: --token или пользователи,
+которых скрипт регистрирует перед нагрузкой (--users). Коды
+подтверждения читаются из писем файлового почтового бэкенда сервера
+(--mail-dir; для --start-server каталог известен).
+
+Сервер можно запустить из скрипта (--start-server): поднимается
+`manage.py runserver` на свободном порту с настройками
+api_yamdb.settings_loadtest, в которых ограничения частоты запросов
+отключены (--keep-throttling оставляет обычные настройки), и
+останавливается в конце. В отчёте - процентили задержки, доля ошибок,
+отдельно доля ответов 429, коды ответов и самые медленные адреса (id
+в путях заменяются на {id}).
+
+Запуск из корня репозитория:
+    python benchmarks/loadtest.py --start-server --mix read-heavy \\
+        --rps 200 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlencode, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POSTMAN_COLLECTION = os.path.join(
+    ROOT, 'postman_collection', 'Ymdb-collection.postman_collection.json'
+)
+# EMAIL_FILE_PATH из api_yamdb.settings_loadtest.
+MAIL_DIR = os.path.join(ROOT, 'api_yamdb', 'sent_emails', 'loadtest')
+API = '/api/v1'
+
+
+class Request:
+    __slots__ = ('method', 'path', 'body', 'token')
+
+    def __init__(self, method, path, body=None, token=None):
+        self.method = method
+        self.path = path
+        self.body = body
+        self.token = token
+
+
+class Connection:
+    """Соединение HTTP/1.1 с keep-alive."""
+
+    def __init__(self, host, port, timeout):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def request(self, request):
+        """Возвращает (код ответа, тело)."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port)
+        body = b''
+        headers = {'Host': f'{self.host}:{self.port}',
+                   'Accept': 'application/json',
+                   'Connection': 'keep-alive'}
+        if request.body is not None:
+            body = (request.body if isinstance(request.body, bytes)
+                    else json.dumps(request.body).encode())
+            headers['Content-Type'] = 'application/json'
+        headers['Content-Length'] = str(len(body))
+        if request.token:
+            headers['Authorization'] = f'Bearer {request.token}'
+        head = ''.join(f'{name}: {value}\r\n'
+                       for name, value in headers.items())
+        self.writer.write(
+            f'{request.method} {request.path} HTTP/1.1\r\n{head}\r\n'
+            .encode('latin-1') + body)
+        try:
+            return await asyncio.wait_for(self.read_response(), self.timeout)
+        except BaseException:
+            self.close()
+            raise
+
+    async def read_response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('Сервер закрыл соединение')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            content = b''
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                content += chunk[:-2]
+        elif 'content-length' in headers:
+            content = await self.reader.readexactly(
+                int(headers['content-length']))
+        else:
+            content = await self.reader.read()
+            headers['connection'] = 'close'
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, content
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class Stats:
+    """Задержки и коды ответов по адресам."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.service_times = []
+        self.statuses = Counter()
+        self.errors = Counter()
+
+    @staticmethod
+    def endpoint(request):
+        path = re.sub(r'/\d+(?=/)', '/{id}', request.path.split('?')[0])
+        return f'{request.method} {path}'
+
+    def add(self, request, status, latency, service_time):
+        self.latencies[self.endpoint(request)].append(latency)
+        self.service_times.append(service_time)
+        self.statuses[status] += 1
+
+    def add_error(self, request, error):
+        self.errors[type(error).__name__] += 1
+        self.statuses['ошибка сети'] += 1
+
+
+def percentile(values, fraction):
+    """Процентиль по ближайшему рангу; values отсортированы."""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1,
+                       int(round(fraction * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def format_ms(seconds):
+    return f'{seconds * 1000:.1f}'
+
+
+def report(stats, elapsed, slowest):
+    latencies = sorted(value for values in stats.latencies.values()
+                       for value in values)
+    service_times = sorted(stats.service_times)
+    total = sum(stats.statuses.values())
+    throttled = stats.statuses[429]
+    failed = sum(count for status, count in stats.statuses.items()
+                 if not isinstance(status, int)
+                 or status >= 400 and status != 429)
+    server_errors = sum(count for status, count in stats.statuses.items()
+                        if not isinstance(status, int) or status >= 500)
+    print(f'\nЗапросов: {total} за {elapsed:.1f} с '
+          f'({total / elapsed:.1f} RPS)')
+    print(f'Ошибки: {failed / max(total, 1):.2%} ответов 4xx/5xx/сети '
+          f'без 429, из них 5xx и сети: {server_errors / max(total, 1):.2%}')
+    print(f'Ограничение частоты (429): {throttled / max(total, 1):.2%}')
+    if throttled:
+        print('Внимание: часть запросов отклонена ограничением частоты, '
+              'задержки обработчиков занижены.')
+    print('Коды ответов: ' + ', '.join(
+        f'{status}: {count}' for status, count in sorted(
+            stats.statuses.items(), key=lambda item: str(item[0]))))
+    if stats.errors:
+        print('Ошибки сети: ' + ', '.join(
+            f'{name}: {count}' for name, count in stats.errors.items()))
+    print(f'\n{"мс":<22}{"p50":>9}{"p90":>9}{"p99":>9}{"max":>9}')
+    for name, values in (('задержка', latencies),
+                         ('время ответа', service_times)):
+        print(f'{name:<22}' + ''.join(
+            f'{format_ms(percentile(values, fraction)):>9}'
+            for fraction in (0.5, 0.9, 0.99, 1.0)))
+    print('\nСамые медленные адреса (по p99 задержки, мс):')
+    rows = sorted(
+        ((endpoint, sorted(values))
+         for endpoint, values in stats.latencies.items()),
+        key=lambda row: percentile(row[1], 0.99), reverse=True
+    )[:slowest]
+    for endpoint, values in rows:
+        print(f'  {endpoint:<50}{len(values):>7}'
+              f'{format_ms(percentile(values, 0.5)):>9}'
+              f'{format_ms(percentile(values, 0.99)):>9}')
+
+
+class Catalog:
+    """id произведений, отзывов, слаги жанров и категорий сервера,
+    по которым строятся синтетические запросы.
+    """
+
+    def __init__(self):
+        self.title_ids = []
+        self.reviews = []
+        self.genres = []
+        self.categories = []
+        # Пользователи, созданные скриптом: (username, код подтверждения).
+        self.users = []
+        # Пары (токен, id произведения), для которых уже отправлен отзыв.
+        self.reviewed = set()
+
+    async def discover(self, connection, limit=500):
+        status, content = await connection.request(
+            Request('GET', f'{API}/titles/?fields=id&limit={limit}'))
+        if status == 200:
+            self.title_ids = [title['id']
+                              for title in json.loads(content)['results']]
+        for name in ('genres', 'categories'):
+            status, content = await connection.request(
+                Request('GET', f'{API}/{name}/'))
+            if status == 200:
+                setattr(self, name, [item['slug'] for item in
+                                     json.loads(content)['results']])
+        for title_id in self.title_ids[:10]:
+            status, content = await connection.request(
+                Request('GET', f'{API}/titles/{title_id}/reviews/'))
+            if status == 200:
+                self.reviews += [(title_id, review['id']) for review in
+                                 json.loads(content)['results']]
+
+
+def read_codes(directory):
+    """Коды подтверждения из писем файлового почтового бэкенда:
+    {email: код}.
+    """
+    codes = {}
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), encoding='utf-8') as file:
+            messages = file.read().split('-' * 79)
+        for message in messages:
+            recipient = re.search(r'^To: (\S+)', message, re.MULTILINE)
+            code = re.search(r'confirmation code: (\S+)', message)
+            if recipient and code:
+                codes[recipient.group(1)] = code.group(1)
+    return codes
+
+
+async def register_users(connection, catalog, count, mail_dir, rng):
+    """Регистрирует count новых пользователей и возвращает их токены."""
+    emails = {}
+    for _ in range(count):
+        name = f'load-{rng.getrandbits(48):x}'
+        status, _ = await connection.request(Request(
+            'POST', f'{API}/auth/signup/',
+            {'username': name, 'email': f'{name}@example.com'}))
+        if status == 200:
+            emails[name] = f'{name}@example.com'
+    codes = read_codes(mail_dir) if os.path.isdir(mail_dir) else {}
+    tokens = []
+    for name, email in emails.items():
+        if email not in codes:
+            continue
+        status, content = await connection.request(Request(
+            'POST', f'{API}/auth/token/',
+            {'username': name, 'confirmation_code': codes[email]}))
+        if status == 200:
+            catalog.users.append((name, codes[email]))
+            tokens.append(json.loads(content)['token'])
+    return tokens
+
+
+def weighted(choices):
+    """Выбор генератора запроса с учётом весов."""
+    generators, weights = zip(*choices)
+
+    def choose(rng, catalog, tokens):
+        return rng.choices(generators, weights)[0](rng, catalog, tokens)
+    return choose
+
+
+def titles_list(rng, catalog, tokens):
+    params = {'offset': rng.randint(0, 4) * 20}
+    if catalog.genres and rng.random() < 0.3:
+        params['genre'] = rng.choice(catalog.genres)
+    if catalog.categories and rng.random() < 0.3:
+        params['category'] = rng.choice(catalog.categories)
+    if rng.random() < 0.3:
+        params['ordering'] = rng.choice(('name', '-year', '-rating'))
+    return Request('GET', f'{API}/titles/?{urlencode(params)}')
+
+
+def title_detail(rng, catalog, tokens):
+    if not catalog.title_ids:
+        return titles_list(rng, catalog, tokens)
+    return Request('GET', f'{API}/titles/{rng.choice(catalog.title_ids)}/')
+
+
+def title_reviews(rng, catalog, tokens):
+    if not catalog.title_ids:
+        return titles_list(rng, catalog, tokens)
+    title_id = rng.choice(catalog.title_ids)
+    return Request('GET', f'{API}/titles/{title_id}/reviews/')
+
+
+def review_comments(rng, catalog, tokens):
+    if not catalog.reviews:
+        return title_reviews(rng, catalog, tokens)
+    title_id, review_id = rng.choice(catalog.reviews)
+    return Request(
+        'GET', f'{API}/titles/{title_id}/reviews/{review_id}/comments/')
+
+
+def signup(rng, catalog, tokens):
+    name = f'load-{rng.getrandbits(48):x}'
+    return Request('POST', f'{API}/auth/signup/',
+                   {'username': name, 'email': f'{name}@example.com'})
+
+
+def token(rng, catalog, tokens):
+    if not catalog.users:
+        return Request('POST', f'{API}/auth/token/',
+                       {'username': f'load-{rng.getrandbits(48):x}',
+                        'confirmation_code': 'invalid'})
+    username, code = rng.choice(catalog.users)
+    return Request('POST', f'{API}/auth/token/',
+                   {'username': username, 'confirmation_code': code})
+
+
+def hot_index(rng, size):
+    """Номер произведения: первые пять получают большую часть отзывов,
+    остальные - всё реже.
+    """
+    return min(int(rng.expovariate(0.2)), size - 1)
+
+
+def post_review(rng, catalog, tokens):
+    """Отзыв от пользователя, который ещё не писал отзыв
+    на выбранное произведение.
+    """
+    body = {'text': 'Нагрузочный отзыв', 'score': rng.randint(1, 10)}
+    title_ids = catalog.title_ids or [1]
+    start = hot_index(rng, len(title_ids))
+    for offset in range(len(title_ids)):
+        title_id = title_ids[(start + offset) % len(title_ids)]
+        fresh = [value for value in tokens
+                 if (value, title_id) not in catalog.reviewed]
+        if fresh or not tokens:
+            value = rng.choice(fresh) if fresh else None
+            catalog.reviewed.add((value, title_id))
+            return Request('POST', f'{API}/titles/{title_id}/reviews/',
+                           body, value)
+    # Все пользователи уже написали отзывы на все произведения.
+    return title_reviews(rng, catalog, tokens)
+
+
+def post_comment(rng, catalog, tokens):
+    if not catalog.reviews:
+        return post_review(rng, catalog, tokens)
+    title_id, review_id = rng.choice(catalog.reviews[:20])
+    return Request(
+        'POST', f'{API}/titles/{title_id}/reviews/{review_id}/comments/',
+        {'text': 'Нагрузочный комментарий'},
+        rng.choice(tokens) if tokens else None)
+
+
+MIXES = {
+    'read-heavy': weighted((
+        (titles_list, 30), (title_detail, 25),
+        (lambda rng, catalog, tokens: Request('GET', f'{API}/genres/'), 10),
+        (lambda rng, catalog, tokens: Request(
+            'GET', f'{API}/categories/'), 10),
+        (title_reviews, 15), (review_comments, 5),
+        (lambda rng, catalog, tokens: Request(
+            'GET', f'{API}/titles/top/?by=rating'), 5),
+    )),
+    'signup-storm': weighted(((signup, 90), (token, 10))),
+    'review-burst': weighted((
+        (post_review, 60), (post_comment, 25), (title_reviews, 15),
+    )),
+}
+
+
+def substitute(text, variables):
+    return re.sub(r'{{(\w+)}}', lambda match: str(
+        variables.get(match.group(1), match.group(0))), text)
+
+
+def load_postman(path, overrides):
+    """Запросы Postman-коллекции с подставленными переменными."""
+    with open(path, encoding='utf-8') as file:
+        collection = json.load(file)
+    variables = {item['key']: item.get('value', '')
+                 for item in collection.get('variable', ())}
+    variables.update(overrides)
+    requests = []
+
+    def walk(items):
+        for item in items:
+            if 'item' in item:
+                walk(item['item'])
+                continue
+            spec = item['request']
+            url = spec['url']
+            raw = url.get('raw', '') if isinstance(url, dict) else url
+            parts = urlsplit(substitute(raw, variables))
+            path = parts.path + (f'?{parts.query}' if parts.query else '')
+            body = (spec.get('body') or {}).get('raw')
+            auth = spec.get('auth') or {}
+            token_value = None
+            if auth.get('type') == 'bearer':
+                token_value = substitute(next(
+                    (entry['value'] for entry in auth.get('bearer', ())
+                     if entry['key'] == 'token'), ''), variables)
+            requests.append(Request(
+                spec['method'], path,
+                substitute(body, variables).encode() if body else None,
+                token_value if token_value and '{{' not in token_value
+                else None))
+    walk(collection['item'])
+    return requests
+
+
+def load_replay(path):
+    requests = []
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                requests.append(Request(
+                    record.get('method', 'GET'), record['path'],
+                    record.get('body'), record.get('token')))
+    return requests
+
+
+def cycle(requests):
+    position = 0
+
+    def choose(rng, catalog, tokens):
+        nonlocal position
+        request = requests[position % len(requests)]
+        position += 1
+        return request
+    return choose
+
+
+async def prepare_tokens(args, connection, catalog, tokens, rng):
+    """Токены из --token и зарегистрированных скриптом пользователей."""
+    if args.users:
+        if args.mail_dir is None:
+            print('Внимание: без --mail-dir пользователи для нагрузки '
+                  'не регистрируются.')
+        else:
+            tokens = tokens + await register_users(
+                connection, catalog, args.users, args.mail_dir, rng)
+            print(f'Зарегистрировано пользователей: {len(catalog.users)}.')
+    if args.mix == 'review-burst' and not tokens:
+        print('Внимание: без токенов запросы на запись вернут 401.')
+    return tokens
+
+
+async def run(args, host, port, generate, tokens):
+    rng = random.Random(args.seed)
+    catalog = Catalog()
+    discovery = Connection(host, port, args.timeout)
+    await catalog.discover(discovery)
+    tokens = await prepare_tokens(args, discovery, catalog, tokens, rng)
+    discovery.close()
+    if not catalog.title_ids:
+        print('Внимание: на сервере нет произведений, запросы к страницам '
+              'произведений вернут 404 (загрузите данные: importcsv или '
+              'generatedata).')
+
+    stats = Stats()
+    pool = asyncio.Queue()
+    for _ in range(args.connections):
+        pool.put_nowait(Connection(host, port, args.timeout))
+
+    async def send(request, scheduled):
+        connection = await pool.get()
+        started = time.perf_counter()
+        try:
+            status, _ = await connection.request(request)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError,
+                asyncio.IncompleteReadError) as error:
+            stats.add_error(request, error)
+        else:
+            finished = time.perf_counter()
+            stats.add(request, status, finished - scheduled,
+                      finished - started)
+        finally:
+            pool.put_nowait(connection)
+
+    interval = 1 / args.rps
+    start = time.perf_counter()
+    tasks = []
+    number = 0
+    while True:
+        scheduled = start + number * interval
+        if scheduled - start >= args.duration:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(
+            send(generate(rng, catalog, tokens), scheduled)))
+        number += 1
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    while not pool.empty():
+        pool.get_nowait().close()
+    report(stats, elapsed, args.slowest)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, throttling=False):
+    """Запускает сервер разработки и ждёт, пока он начнёт принимать
+    соединения. Без throttling ограничения частоты запросов отключены.
+    """
+    command = [sys.executable, 'manage.py', 'runserver', '--noreload',
+               f'127.0.0.1:{port}']
+    if not throttling:
+        command.append('--settings=api_yamdb.settings_loadtest')
+    server = subprocess.Popen(
+        command,
+        cwd=os.path.join(ROOT, 'api_yamdb'),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise SystemExit('Сервер разработки не запустился.')
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.2).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit('Сервер разработки не ответил за 30 секунд.')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--start-server', action='store_true',
+                        help='запустить manage.py runserver')
+    parser.add_argument('--keep-throttling', action='store_true',
+                        help='не отключать ограничения частоты запросов '
+                             'на запущенном сервере')
+    parser.add_argument('--mix', default='read-heavy',
+                        choices=(*MIXES, 'postman', 'replay'))
+    parser.add_argument('--replay', help='JSONL-файл с запросами')
+    parser.add_argument('--postman', default=POSTMAN_COLLECTION)
+    parser.add_argument('--var', action='append', default=[],
+                        metavar='ИМЯ=ЗНАЧЕНИЕ',
+                        help='переменная Postman-коллекции')
+    parser.add_argument('--token', action='append', default=[],
+                        help='JWT-токен для изменяющих запросов')
+    parser.add_argument('--users', type=int,
+                        help='зарегистрировать пользователей перед '
+                             'нагрузкой (по умолчанию 20 для review-burst '
+                             'и signup-storm)')
+    parser.add_argument('--mail-dir',
+                        help='каталог писем файлового почтового бэкенда '
+                             'сервера')
+    parser.add_argument('--rps', type=float, default=100)
+    parser.add_argument('--duration', type=float, default=10,
+                        help='длительность в секундах')
+    parser.add_argument('--connections', type=int, default=32)
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--slowest', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.mix == 'replay':
+        if not args.replay:
+            parser.error('для --mix replay укажите --replay ФАЙЛ')
+        generate = cycle(load_replay(args.replay))
+    elif args.mix == 'postman':
+        generate = cycle(load_postman(args.postman, dict(
+            variable.split('=', 1) for variable in args.var)))
+    else:
+        generate = MIXES[args.mix]
+    if args.users is None:
+        args.users = (20 if args.mix in ('review-burst', 'signup-storm')
+                      else 0)
+
+    server = None
+    if args.start_server:
+        host, port = '127.0.0.1', free_port()
+        server = start_server(port, args.keep_throttling)
+        if args.mail_dir is None and not args.keep_throttling:
+            args.mail_dir = MAIL_DIR
+    else:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    try:
+        asyncio.run(run(args, host, port, generate, args.token))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Накладные расходы ограничения частоты запросов.
+
+Измеряет время одной проверки ведра в хранилищах `local` и `cache`
+(в том числе при конкуренции потоков) и добавку ко времени обработки
+запроса простым APIView с проверкой и без неё.
+
+Запуск из корня репозитория:
+    python benchmarks/throttle_overhead.py [--iterations N] [--threads N]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'api_yamdb')
+)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from rest_framework.response import Response  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+from rest_framework.views import APIView  # noqa: E402
+
+from api.throttling import (CacheBucketStore, LocalBucketStore,  # noqa: E402
+                            ReadThrottle)
+
+KEYS = 1000
+
+
+def per_call(func, iterations):
+    start = time.perf_counter()
+    for number in range(iterations):
+        func(number)
+    return (time.perf_counter() - start) / iterations
+
+
+def bench_store(store, iterations, threads):
+    def consume(number):
+        store.consume(f'reads:ip:{number % KEYS}', 1000, 1000 / 60,
+                      time.time())
+
+    single = per_call(consume, iterations)
+    results = []
+
+    def worker():
+        results.append(per_call(consume, iterations // threads))
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    contended = (time.perf_counter() - start) / (iterations // threads
+                                                 * threads)
+    return single, contended
+
+
+class PlainView(APIView):
+    authentication_classes = ()
+    permission_classes = ()
+    throttle_classes = ()
+
+    def get(self, request):
+        return Response({})
+
+
+class ThrottledView(PlainView):
+    throttle_classes = (ReadThrottle,)
+
+
+def bench_views(iterations):
+    factory = APIRequestFactory()
+    results = {}
+    for view_class in (PlainView, ThrottledView):
+        view = view_class.as_view()
+
+        def call(number):
+            view(factory.get('/', REMOTE_ADDR=f'10.0.{number % 250}.1'))
+
+        results[view_class.__name__] = per_call(call, iterations)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--iterations', type=int, default=100_000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    stores = {
+        'local': LocalBucketStore(),
+        'cache': CacheBucketStore(cache),
+    }
+    print(f'{"хранилище":<10}{"1 поток, мкс":>16}'
+          f'{f"{args.threads} потоков, мкс":>20}')
+    for name, store in stores.items():
+        single, contended = bench_store(store, args.iterations, args.threads)
+        print(f'{name:<10}{single * 1e6:>16.2f}{contended * 1e6:>20.2f}')
+
+    views = bench_views(args.iterations // 10)
+    overhead = views['ThrottledView'] - views['PlainView']
+    print(f'\nAPIView без ограничения: {views["PlainView"] * 1e6:.1f} мкс, '
+          f'с ReadThrottle: {views["ThrottledView"] * 1e6:.1f} мкс, '
+          f'добавка: {overhead * 1e6:.1f} мкс на запрос')
+
+
+if __name__ == '__main__':
+    main()
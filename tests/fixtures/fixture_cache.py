@@ -0,0 +1,13 @@
+import pytest
+from django.core.cache import cache
+
+from api.throttling import local_store
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    local_store.clear()
+    yield
+    cache.clear()
+    local_store.clear()
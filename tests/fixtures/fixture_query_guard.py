@@ -0,0 +1,24 @@
+"""
+Плагин pytest, включающий строгий режим поиска N+1.
+
+Любой запрос к API в тестах, выполнивший два и более SQL-запроса одной
+формы с разными параметрами, завершается исключением NPlusOneQueryError.
+Тест можно исключить из проверки маркером `allow_n_plus_one`.
+"""
+import pytest
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'allow_n_plus_one: не проверять тест на повторяющиеся SQL-запросы.'
+    )
+
+
+@pytest.fixture(autouse=True)
+def strict_query_guard(request, settings):
+    if request.node.get_closest_marker('allow_n_plus_one'):
+        settings.QUERY_GUARD_MODE = 'off'
+    else:
+        settings.QUERY_GUARD_MODE = 'strict'
+        settings.QUERY_GUARD_THRESHOLD = 2
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def eager_background_tasks(settings):
+    """Фоновые задачи (модерация, удаление) выполняются сразу."""
+    settings.BACKGROUND_TASKS_EAGER = True
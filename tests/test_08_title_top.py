@@ -0,0 +1,185 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Title
+from reviews.ratings import rating_updates, reconcile_ratings
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08TitleTopAPI:
+
+    TOP_URL = '/api/v1/titles/top/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+
+    def test_01_top_by_rating(self, client, admin_client, user_client,
+                              moderator_client):
+        titles, categories, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'], 'text', 4)
+        create_single_review(moderator_client, titles[0]['id'], 'text', 6)
+        create_single_review(user_client, titles[1]['id'], 'text', 9)
+
+        response = client.get(self.TOP_URL)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{self.TOP_URL}` возвращает ответ '
+            'со статусом 200.'
+        )
+        data = response.json()
+        assert [title['id'] for title in data] == [
+            titles[1]['id'], titles[0]['id']
+        ], (
+            f'Проверьте, что `{self.TOP_URL}` возвращает произведения в '
+            'порядке убывания рейтинга.'
+        )
+        assert data[1]['rating'] == 5, (
+            f'Проверьте, что `{self.TOP_URL}` возвращает средний рейтинг '
+            'произведения.'
+        )
+
+        response = client.get(
+            f'{self.TOP_URL}?by=review_count&limit=1'
+        )
+        data = response.json()
+        assert [title['id'] for title in data] == [titles[0]['id']], (
+            f'Проверьте, что `{self.TOP_URL}?by=review_count` учитывает '
+            'количество отзывов и параметр `limit`.'
+        )
+
+        response = client.get(
+            f'{self.TOP_URL}?category={categories[0]["slug"]}'
+        )
+        data = response.json()
+        assert [title['id'] for title in data] == [titles[0]['id']], (
+            f'Проверьте, что `{self.TOP_URL}` поддерживает фильтрацию по '
+            'слагу категории.'
+        )
+
+    def test_02_top_invalid_params(self, client):
+        response = client.get(f'{self.TOP_URL}?by=unknown')
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Если GET-запрос к `{self.TOP_URL}` содержит неизвестное '
+            'значение `by` - должен вернуться ответ со статусом 400.'
+        )
+        response = client.get(f'{self.TOP_URL}?limit=many')
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Если GET-запрос к `{self.TOP_URL}` содержит нечисловой '
+            '`limit` - должен вернуться ответ со статусом 400.'
+        )
+
+    def test_03_rating_follows_review_changes(self, client, admin_client,
+                                              user_client):
+        titles, _, _ = create_titles(admin_client)
+        reviews_url = self.REVIEWS_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+        review = create_single_review(
+            user_client, titles[0]['id'], 'text', 2
+        ).json()
+        create_single_review(admin_client, titles[0]['id'], 'text', 4)
+
+        user_client.patch(f'{reviews_url}{review["id"]}/', data={'score': 8})
+        data = client.get(f'/api/v1/titles/{titles[0]["id"]}/').json()
+        assert data['rating'] == 6, (
+            'Проверьте, что рейтинг произведения пересчитывается при '
+            'изменении оценки отзыва.'
+        )
+
+        user_client.delete(f'{reviews_url}{review["id"]}/')
+        data = client.get(f'/api/v1/titles/{titles[0]["id"]}/').json()
+        assert data['rating'] == 4, (
+            'Проверьте, что рейтинг произведения пересчитывается при '
+            'удалении отзыва.'
+        )
+
+    def test_04_weighted_rating(self, client, admin_client, user_client,
+                                moderator_client, settings):
+        settings.RATING_PRIOR_WEIGHT = 2
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'], 'text', 10)
+        create_single_review(user_client, titles[1]['id'], 'text', 9)
+        create_single_review(moderator_client, titles[1]['id'], 'text', 9)
+        create_single_review(admin_client, titles[1]['id'], 'text', 9)
+        call_command('refreshratings')
+
+        prior = (10 + 9 * 3) / 4
+        expected = {
+            titles[0]['id']: (10 + 2 * prior) / (1 + 2),
+            titles[1]['id']: (27 + 2 * prior) / (3 + 2),
+        }
+        response = client.get('/api/v1/titles/?ordering=-weighted_rating')
+        data = response.json()['results']
+        for title in data:
+            assert title['weighted_rating'] == pytest.approx(
+                expected[title['id']]
+            ), (
+                'Проверьте, что взвешенный рейтинг учитывает среднюю оценку '
+                'по каталогу и количество отзывов.'
+            )
+        assert [title['id'] for title in data] == sorted(
+            expected, key=expected.get, reverse=True
+        ), (
+            'Проверьте, что `/api/v1/titles/?ordering=-weighted_rating` '
+            'сортирует произведения по взвешенному рейтингу.'
+        )
+
+    def test_05_coalesced_rating_updates(self, admin_client, user_client,
+                                         moderator_client, settings):
+        settings.RATING_FLUSH_INTERVAL = 3600
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'], 'text', 3)
+        create_single_review(moderator_client, titles[0]['id'], 'text', 7)
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert title.review_count == 0 and rating_updates.pending() == 1, (
+            'Проверьте, что при `RATING_FLUSH_INTERVAL > 0` изменения '
+            'рейтинга накапливаются по произведениям.'
+        )
+
+        assert rating_updates.flush() == 1
+        title.refresh_from_db()
+        assert (title.review_count, title.rating) == (2, 5), (
+            'Проверьте, что накопленные изменения рейтинга применяются '
+            'одним обновлением на произведение.'
+        )
+
+        create_single_review(admin_client, titles[0]['id'], 'text', 8)
+        Title.objects.filter(pk=title.pk).update(score_sum=0, rating=None)
+        reconcile_ratings([title.pk])
+        title.refresh_from_db()
+        assert (title.score_sum, title.review_count, title.rating) == (
+            18, 3, 6
+        ) and rating_updates.pending() == 0, (
+            'Проверьте, что reconcile_ratings точно пересчитывает рейтинг '
+            'по таблице отзывов и применяет накопленные изменения без '
+            'повторного учёта отзывов.'
+        )
+
+    def test_06_recent_follows_review_deletion(self, client, admin_client,
+                                               user_client):
+        titles, _, _ = create_titles(admin_client)
+        reviews_url = self.REVIEWS_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+        first = create_single_review(
+            user_client, titles[0]['id'], 'text', 5
+        ).json()
+        last = create_single_review(
+            admin_client, titles[0]['id'], 'text', 7
+        ).json()
+
+        admin_client.delete(f'{reviews_url}{last["id"]}/')
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert title.last_review_date.isoformat().replace(
+            '+00:00', 'Z'
+        ).startswith(first['pub_date'][:19]), (
+            'Проверьте, что после удаления последнего отзыва дата '
+            'последнего отзыва сдвигается на предыдущий отзыв.'
+        )
+
+        user_client.delete(f'{reviews_url}{first["id"]}/')
+        data = client.get(f'{self.TOP_URL}?by=recent').json()
+        assert titles[0]['id'] not in [title['id'] for title in data], (
+            f'Проверьте, что `{self.TOP_URL}?by=recent` не возвращает '
+            'произведения, у которых удалены все отзывы.'
+        )
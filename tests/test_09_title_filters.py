@@ -0,0 +1,185 @@
+import itertools
+
+import pytest
+from django.db import connection
+from django.http import QueryDict
+
+from api.filters import TitleFilter
+from reviews.deletion import delete_queryset
+from reviews.genre_index import bitmap_to_ids, genre_index
+from reviews.models import Title
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09TitleFilters:
+
+    TITLES_URL = '/api/v1/titles/'
+    ORDERINGS = ('name', '-year', '-rating', '-review_count')
+    RANGES = (
+        '',
+        'year_min=1980&year_max=1990',
+        'rating_min=5',
+        'year_min=1980&rating_min=5',
+    )
+
+    def test_01_ordering_and_ranges(self, client, admin_client,
+                                    user_client):
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[1]['id'], 'text', 8)
+
+        response = client.get(f'{self.TITLES_URL}?ordering=-year')
+        names = [title['name'] for title in response.json()['results']]
+        assert names == [titles[1]['name'], titles[0]['name']], (
+            f'Проверьте, что `{self.TITLES_URL}` поддерживает параметр '
+            '`ordering` по году выхода произведения.'
+        )
+
+        response = client.get(f'{self.TITLES_URL}?year_min=1985')
+        names = [title['name'] for title in response.json()['results']]
+        assert names == [titles[1]['name']], (
+            f'Проверьте, что `{self.TITLES_URL}` поддерживает фильтр '
+            '`year_min`.'
+        )
+
+        response = client.get(f'{self.TITLES_URL}?year_max=1985')
+        names = [title['name'] for title in response.json()['results']]
+        assert names == [titles[0]['name']], (
+            f'Проверьте, что `{self.TITLES_URL}` поддерживает фильтр '
+            '`year_max`.'
+        )
+
+        response = client.get(f'{self.TITLES_URL}?rating_min=5')
+        names = [title['name'] for title in response.json()['results']]
+        assert names == [titles[1]['name']], (
+            f'Проверьте, что `{self.TITLES_URL}` поддерживает фильтр '
+            '`rating_min`.'
+        )
+
+    def test_02_multi_value_genre_and_category(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        horror, comedy, drama = (genre['slug'] for genre in genres)
+
+        response = client.get(f'{self.TITLES_URL}?genre={horror},{comedy}')
+        data = response.json()
+        assert data['count'] == 1 and len(data['results']) == 1, (
+            f'Проверьте, что фильтр `genre` в `{self.TITLES_URL}` не '
+            'дублирует произведения, подходящие под несколько жанров.'
+        )
+
+        response = client.get(f'{self.TITLES_URL}?genre={horror},{drama}')
+        assert response.json()['count'] == 2, (
+            f'Проверьте, что `{self.TITLES_URL}?genre=a,b` возвращает '
+            'произведения с любым из перечисленных жанров.'
+        )
+
+        response = client.get(
+            f'{self.TITLES_URL}?genre={horror},{drama}&genre_mode=all'
+        )
+        assert response.json()['count'] == 0, (
+            f'Проверьте, что `{self.TITLES_URL}?genre=a,b&genre_mode=all` '
+            'возвращает только произведения со всеми жанрами.'
+        )
+        response = client.get(
+            f'{self.TITLES_URL}?genre={horror},{comedy}&genre_mode=all'
+        )
+        names = [title['name'] for title in response.json()['results']]
+        assert names == [titles[0]['name']], (
+            f'Проверьте, что `{self.TITLES_URL}?genre=a,b&genre_mode=all` '
+            'возвращает только произведения со всеми жанрами.'
+        )
+
+        response = client.get(
+            f'{self.TITLES_URL}?category='
+            f'{categories[0]["slug"]},{categories[1]["slug"]}'
+        )
+        assert response.json()['count'] == 2, (
+            f'Проверьте, что `{self.TITLES_URL}?category=x,y` возвращает '
+            'произведения из любой из перечисленных категорий.'
+        )
+
+    def test_03_genre_index(self, client, admin_client):
+        titles, _, genres = create_titles(admin_client)
+        horror, comedy, drama = (genre['slug'] for genre in genres)
+
+        response = client.get(f'{self.TITLES_URL}?genre_exclude={horror}')
+        names = [title['name'] for title in response.json()['results']]
+        assert names == [titles[1]['name']], (
+            f'Проверьте, что `{self.TITLES_URL}?genre_exclude=a` исключает '
+            'произведения с указанным жанром.'
+        )
+
+        admin_client.patch(
+            f'{self.TITLES_URL}{titles[1]["id"]}/',
+            data={'genre': [comedy]}
+        )
+        response = client.get(
+            f'{self.TITLES_URL}?genre={comedy}&genre_exclude={horror}'
+        )
+        names = [title['name'] for title in response.json()['results']]
+        assert names == [titles[1]['name']], (
+            'Проверьте, что индекс жанров обновляется при изменении '
+            'жанров произведения.'
+        )
+        assert bitmap_to_ids(genre_index.resolve(any_of=[drama])) == [], (
+            'Проверьте, что индекс жанров обновляется при изменении '
+            'жанров произведения.'
+        )
+
+        admin_client.delete(f'{self.TITLES_URL}{titles[1]["id"]}/')
+        assert bitmap_to_ids(genre_index.resolve(any_of=[comedy])) == [
+            titles[0]['id']
+        ], (
+            'Проверьте, что индекс жанров обновляется при удалении '
+            'произведения.'
+        )
+
+    @pytest.mark.skipif(connection.vendor != 'sqlite',
+                        reason='Проверяется план запроса SQLite.')
+    def test_04_filters_use_indexes(self):
+        for ordering, ranges in itertools.product(self.ORDERINGS,
+                                                  self.RANGES):
+            params = QueryDict(f'{ranges}&ordering={ordering}')
+            queryset = TitleFilter(params, queryset=Title.objects.all()).qs
+            sql = str(queryset.query).upper()
+            assert 'AVG(' not in sql, (
+                f'Запрос с параметрами `{params.urlencode()}` не должен '
+                'пересчитывать средний рейтинг.'
+            )
+            plan = queryset.explain().upper()
+            assert 'USING INDEX' in plan or 'USING COVERING INDEX' in plan, (
+                f'Запрос с параметрами `{params.urlencode()}` должен '
+                f'использовать индекс. План запроса: {plan}'
+            )
+
+    def test_05_genre_index_purge_and_ttl(self, admin_client, monkeypatch,
+                                          settings):
+        titles, _, genres = create_titles(admin_client)
+        comedy = genres[1]['slug']
+        genre_index.resolve(any_of=[comedy])
+        builds = []
+        build = genre_index._build
+        monkeypatch.setattr(genre_index, '_build',
+                            lambda version: builds.append(version)
+                            or build(version))
+
+        delete_queryset(Title.objects.filter(pk=titles[1]['id']))
+        assert bitmap_to_ids(genre_index.resolve(any_of=[comedy])) == [
+            titles[0]['id']
+        ], (
+            'Проверьте, что индекс жанров обновляется при удалении '
+            'произведения пачкой.'
+        )
+        assert builds == [], (
+            'Проверьте, что удаление произведений пачкой не перестраивает '
+            'индекс жанров целиком.'
+        )
+
+        # Изменение, о котором процесс не узнал (другой процесс
+        # с LocMemCache), видно после GENRE_INDEX_TTL.
+        Title.genre.through.objects.filter(title_id=titles[0]['id']).delete()
+        settings.GENRE_INDEX_TTL = 0
+        assert bitmap_to_ids(genre_index.resolve(any_of=[comedy])) == [], (
+            'Проверьте, что индекс жанров перестраивается не реже чем '
+            'раз в GENRE_INDEX_TTL секунд.'
+        )
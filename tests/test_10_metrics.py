@@ -0,0 +1,79 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+
+from api.metrics import QueryRecorder, RequestMetrics, current_metrics
+from api.serializers import ReviewSerializer
+from reviews.models import Review
+from tests.utils import create_reviews, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10Metrics:
+
+    METRICS_URL = '/api/v1/_metrics'
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_server_timing(self, client, admin_client):
+        create_titles(admin_client)
+        response = client.get(self.TITLES_URL)
+        timing = response.get('Server-Timing', '')
+        for metric in ('app;dur=', 'db;dur=', 'ser;dur='):
+            assert metric in timing, (
+                'Проверьте, что ответ содержит заголовок `Server-Timing` с '
+                f'метрикой `{metric}`.'
+            )
+
+    def test_02_metrics_endpoint(self, client, admin_client, user_client):
+        create_titles(admin_client)
+        client.get(self.TITLES_URL)
+
+        response = client.get(self.METRICS_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            f'Проверьте, что `{self.METRICS_URL}` недоступен анониму.'
+        )
+        response = user_client.get(self.METRICS_URL)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что `{self.METRICS_URL}` недоступен пользователю.'
+        )
+
+        response = admin_client.get(self.METRICS_URL)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что `{self.METRICS_URL}` доступен администратору.'
+        )
+        assert response['Content-Type'].startswith('text/plain'), (
+            f'Проверьте, что `{self.METRICS_URL}` отдаёт метрики в '
+            'текстовом формате Prometheus.'
+        )
+        content = response.content.decode()
+        for line in (
+            'yamdb_request_duration_seconds_count{view="TitleViewSet.list"}',
+            'yamdb_db_queries_total{view="TitleViewSet.list"}',
+            'yamdb_request_duration_seconds_count{view="TitleViewSet.create"}',
+        ):
+            assert line in content, (
+                f'Проверьте, что `{self.METRICS_URL}` содержит `{line}`.'
+            )
+
+    def test_03_repeated_queries_detection(self, admin_client, admin,
+                                           user_client, user):
+        create_reviews(admin_client, {admin: admin_client, user: user_client})
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with connection.execute_wrapper(QueryRecorder(metrics)):
+                ReviewSerializer(Review.objects.all(), many=True).data
+        finally:
+            current_metrics.reset(token)
+
+        repeated = metrics.repeated_queries(threshold=2)
+        assert len(repeated) == 1, (
+            'Проверьте, что загрузка автора для каждого отзыва '
+            'распознаётся как повторяющийся SQL-запрос (N+1).'
+        )
+        _, count, paths = repeated[0]
+        assert count == 2 and paths == ['ReviewSerializer.author'], (
+            'Проверьте, что для повторяющегося SQL-запроса указывается '
+            'поле сериализатора, при обработке которого он выполнен.'
+        )
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11Profiling:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    @pytest.fixture(autouse=True)
+    def profiles_dir(self, settings, tmp_path):
+        settings.PROFILER_OUTPUT_DIR = str(tmp_path)
+        settings.PROFILER_SAMPLE_RATE = 0.0
+        return tmp_path
+
+    def test_01_admin_profile(self, admin_client, profiles_dir):
+        response = admin_client.get(self.TITLES_URL, HTTP_X_PROFILE='1')
+        profile_id = response.get('X-Profile-Id')
+        assert profile_id and profile_id.endswith('.folded'), (
+            'Проверьте, что запрос администратора с заголовком `X-Profile` '
+            'профилируется и в ответе возвращается `X-Profile-Id`.'
+        )
+        assert os.path.exists(profiles_dir / profile_id), (
+            'Проверьте, что профиль запроса сохраняется в '
+            '`PROFILER_OUTPUT_DIR`.'
+        )
+
+        response = admin_client.get(f'{self.TITLES_URL}?_profile=cprofile')
+        profile_id = response.get('X-Profile-Id')
+        assert profile_id and profile_id.endswith('.prof'), (
+            'Проверьте, что параметр `_profile=cprofile` включает '
+            'детерминированный профилировщик.'
+        )
+
+    def test_02_profile_requires_admin(self, client, user_client,
+                                       profiles_dir):
+        for request_client in (client, user_client):
+            response = request_client.get(
+                self.TITLES_URL, HTTP_X_PROFILE='1'
+            )
+            assert 'X-Profile-Id' not in response, (
+                'Проверьте, что профилирование по заголовку `X-Profile` '
+                'доступно только администратору.'
+            )
+        assert not os.listdir(profiles_dir)
+
+    def test_03_sample_rate(self, client, settings):
+        settings.PROFILER_SAMPLE_RATE = 1.0
+        response = client.get(self.TITLES_URL)
+        assert 'X-Profile-Id' in response, (
+            'Проверьте, что при `PROFILER_SAMPLE_RATE = 1` профилируются '
+            'все запросы.'
+        )
+
+    def test_04_profile_files_limits(self, client, admin_client, settings,
+                                     profiles_dir):
+        settings.PROFILER_SAMPLE_RATE = 1.0
+        settings.PROFILER_MAX_FILES = 2
+        response = client.get(f'{self.TITLES_URL}{"a" * 300}/')
+        assert response.status_code == 404, (
+            'Проверьте, что длинный адрес запроса не мешает сохранить '
+            'профиль.'
+        )
+        assert len(response['X-Profile-Id']) < 255
+        for _ in range(3):
+            client.get(self.TITLES_URL)
+        assert len(os.listdir(profiles_dir)) == 2, (
+            'Проверьте, что в `PROFILER_OUTPUT_DIR` хранится не больше '
+            '`PROFILER_MAX_FILES` профилей.'
+        )
+
+        blocker = profiles_dir / 'file'
+        blocker.write_text('')
+        settings.PROFILER_OUTPUT_DIR = str(blocker)
+        response = admin_client.get(self.TITLES_URL)
+        assert response.status_code == 200 and (
+            'X-Profile-Id' not in response
+        ), (
+            'Проверьте, что ошибка записи профиля не приводит к ответу 500.'
+        )
@@ -0,0 +1,84 @@
+import pytest
+from django.db import connection
+
+from reviews.bulk import bulk_create_comments, bulk_create_reviews
+from reviews.models import Comment, Review, Title
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12BulkReviews:
+
+    def test_01_bulk_create_reviews(self, admin_client, admin, user,
+                                    user_client, moderator,
+                                    django_assert_max_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        first, second = (title['id'] for title in titles)
+        create_single_review(user_client, first, 'text', 4)
+
+        batch = [
+            Review(title_id=first, author=user, text='dup', score=1),
+            Review(title_id=first, author=admin, text='new', score=6),
+            Review(title_id=first, author=admin, text='dup', score=2),
+            Review(title_id=second, author=moderator, text='new', score=8),
+        ]
+        with django_assert_max_num_queries(6):
+            created, skipped = bulk_create_reviews(batch)
+
+        assert [review.text for review in created] == ['new', 'new'], (
+            'Проверьте, что bulk_create_reviews создаёт только новые отзывы.'
+        )
+        assert len(skipped) == 2, (
+            'Проверьте, что bulk_create_reviews пропускает повторы внутри '
+            'пакета и уже существующие отзывы.'
+        )
+        assert all(review.pk for review in created), (
+            'Проверьте, что созданным отзывам проставлены id.'
+        )
+        assert Review.objects.count() == 3
+        assert Title.objects.get(pk=first).rating == 5, (
+            'Проверьте, что bulk_create_reviews обновляет рейтинг '
+            'произведений.'
+        )
+
+    def test_02_concurrent_duplicate(self, admin_client, admin, user,
+                                     user_client, monkeypatch):
+        titles, _, _ = create_titles(admin_client)
+        first = titles[0]['id']
+        create_single_review(user_client, first, 'text', 4)
+        # Отзыв пользователя появился между проверкой и вставкой.
+        monkeypatch.setattr('reviews.bulk.existing_review_pairs',
+                            lambda pairs: set())
+
+        batch = [
+            Review(title_id=first, author=user, text='race', score=1),
+            Review(title_id=first, author=admin, text='new', score=6),
+        ]
+        created, skipped = bulk_create_reviews(batch)
+        assert ([review.text for review in created],
+                [review.text for review in skipped]) == (['new'], ['race']), (
+            'Проверьте, что при параллельном создании отзыва с той же '
+            'парой bulk_create_reviews пропускает его, а не падает '
+            'с IntegrityError.'
+        )
+        assert created[0].pk is not None
+        assert Title.objects.get(pk=first).rating == 5
+
+    def test_03_comment_ids_without_returning(self, admin_client, user,
+                                              user_client, monkeypatch):
+        titles, _, _ = create_titles(admin_client)
+        review = create_single_review(
+            user_client, titles[0]['id'], 'text', 4
+        ).json()
+        monkeypatch.setattr(connection.features,
+                            'can_return_rows_from_bulk_insert', False)
+        monkeypatch.setattr(connection, 'vendor', 'mysql')
+        comments = bulk_create_comments([
+            Comment(review_id=review['id'], author=user, text=str(number))
+            for number in range(3)
+        ])
+        assert [Comment.objects.get(pk=comment.pk).text
+                for comment in comments] == ['0', '1', '2'], (
+            'Проверьте, что без RETURNING вне SQLite комментариям '
+            'проставляются их собственные id.'
+        )
@@ -0,0 +1,64 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_comments
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13NestedRoutes:
+
+    def test_01_list_without_parent_lookup(self, client, admin_client, admin,
+                                           user, user_client, moderator,
+                                           moderator_client):
+        authors_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client,
+        }
+        _, reviews, titles = create_comments(admin_client, authors_map)
+        title_id, review_id = titles[0]['id'], reviews[0]['id']
+        urls = (
+            f'/api/v1/titles/{title_id}/reviews/',
+            f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+        )
+        for url in urls:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            assert response.status_code == 200
+            assert len(response.json()['results']) == 3
+            assert len(context.captured_queries) == 2, (
+                f'Проверьте, что список `{url}` формируется без отдельной '
+                'загрузки родительского объекта: подсчёт и выборка страницы.'
+            )
+
+    def test_02_missing_parent(self, client, admin_client, admin,
+                               user_client, user):
+        authors_map = {admin: admin_client, user: user_client}
+        _, reviews, titles = create_comments(admin_client, authors_map)
+        review_id = reviews[0]['id']
+        other_title_id = titles[1]['id']
+        urls = (
+            '/api/v1/titles/0/reviews/',
+            f'/api/v1/titles/{other_title_id}/reviews/{review_id}/comments/',
+        )
+        for url in urls:
+            response = client.get(url)
+            assert response.status_code == 404, (
+                f'Проверьте, что запрос к `{url}` с несуществующим '
+                'родительским объектом возвращает ответ со статусом 404.'
+            )
+        response = user_client.post(
+            f'/api/v1/titles/{other_title_id}/reviews/{review_id}/comments/',
+            data={'text': 'comment'}
+        )
+        assert response.status_code == 404, (
+            'Проверьте, что комментарий нельзя добавить к отзыву, '
+            'относящемуся к другому произведению.'
+        )
+        response = client.get(f'/api/v1/titles/{other_title_id}/reviews/')
+        assert response.status_code == 200
+        assert response.json()['results'] == [], (
+            'Проверьте, что для произведения без отзывов возвращается '
+            'пустой список.'
+        )
@@ -0,0 +1,98 @@
+import pytest
+from django.test import override_settings
+
+from reviews.models import Comment, Review, Title
+from tests.utils import create_reviews, create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14BulkApi:
+
+    def test_01_bulk_reviews_across_titles(self, admin_client, user,
+                                           user_client, moderator,
+                                           django_assert_max_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        first, second = (title['id'] for title in titles)
+        create_single_review(user_client, first, 'text', 4)
+        items = [
+            {'title': first, 'text': 'повтор', 'score': 5},
+            {'title': second, 'text': 'новый', 'score': 8},
+            {'title': 0, 'text': 'нет произведения', 'score': 5},
+            {'title': second, 'text': 'плохая оценка', 'score': 11},
+            {'title': first, 'author': moderator.username,
+             'text': 'чужой', 'score': 3},
+        ]
+        with django_assert_max_num_queries(10):
+            response = user_client.post(
+                '/api/v1/reviews/bulk/', data=items, format='json'
+            )
+        assert response.status_code == 207, (
+            'Проверьте, что при частичном успехе пакетного создания '
+            'возвращается ответ со статусом 207.'
+        )
+        statuses = [item['status'] for item in response.json()]
+        assert statuses == [400, 201, 404, 400, 403], (
+            'Проверьте, что для каждого элемента пакета возвращается '
+            'свой статус.'
+        )
+        assert response.json()[1]['data']['author'] == user.username
+        assert Review.objects.count() == 2
+        assert Title.objects.get(pk=second).rating == 8, (
+            'Проверьте, что пакетное создание отзывов обновляет рейтинг.'
+        )
+
+    def test_02_bulk_reviews_on_title(self, admin_client, admin, user,
+                                      moderator, moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        url = f'/api/v1/titles/{title_id}/reviews/bulk/'
+        items = [
+            {'author': user.username, 'text': 'первый', 'score': 2},
+            {'author': admin.username, 'text': 'второй', 'score': 6},
+            {'text': 'третий', 'score': 10},
+        ]
+        response = moderator_client.post(url, data=items, format='json')
+        assert response.status_code == 201, (
+            'Проверьте, что модератор может создать пакет отзывов '
+            'от имени других пользователей.'
+        )
+        assert [item['data']['author'] for item in response.json()] == [
+            user.username, admin.username, moderator.username
+        ]
+        assert all(item['data']['id'] for item in response.json())
+        title = Title.objects.get(pk=title_id)
+        assert (title.review_count, title.rating) == (3, 6)
+
+        response = moderator_client.post(
+            '/api/v1/titles/0/reviews/bulk/', data=items, format='json'
+        )
+        assert response.status_code == 404
+        with override_settings(BULK_MAX_ITEMS=2):
+            response = moderator_client.post(url, data=items, format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что пакет больше BULK_MAX_ITEMS отклоняется.'
+        )
+
+    def test_03_bulk_comments(self, admin_client, admin, user, user_client):
+        reviews, titles = create_reviews(admin_client, {admin: admin_client})
+        title_id, review_id = titles[0]['id'], reviews[0]['id']
+        url = f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/bulk/'
+        items = [{'text': f'комментарий {number}'} for number in range(5)]
+        items.append({'text': ''})
+        response = user_client.post(url, data=items, format='json')
+        assert response.status_code == 207
+        created = [item['data'] for item in response.json()[:5]]
+        assert [comment['text'] for comment in created] == [
+            item['text'] for item in items[:5]
+        ]
+        assert response.json()[5]['status'] == 400
+        assert sorted(comment['id'] for comment in created) == sorted(
+            Comment.objects.values_list('pk', flat=True)
+        ), 'Проверьте, что созданным комментариям проставлены id.'
+
+        response = user_client.post(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/{review_id}'
+            '/comments/bulk/',
+            data=items, format='json'
+        )
+        assert response.status_code == 404
@@ -0,0 +1,133 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from reviews.models import Comment, ModerationJob, Review, Title
+from reviews.moderation import process_reviews, run_job
+from tests.utils import (create_single_comment, create_single_review,
+                         create_titles)
+
+
+def create_spam(admin_client, user_client, admin):
+    titles, _, _ = create_titles(admin_client)
+    first, second = (title['id'] for title in titles)
+    spam = create_single_review(user_client, first, 'купите спам', 1).json()
+    create_single_review(user_client, second, 'спам', 1)
+    create_single_review(admin_client, first, 'хороший фильм', 9)
+    create_single_comment(user_client, first, spam['id'], 'ещё спам')
+    create_single_comment(admin_client, first, spam['id'], 'согласен')
+    return first, second
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15Moderation:
+    url = '/api/v1/moderation/jobs/'
+
+    def test_01_hide_and_unhide_reviews(self, admin_client, admin,
+                                        user, user_client, moderator_client):
+        first, second = create_spam(admin_client, user_client, admin)
+        data = {'target': 'reviews', 'action': 'hide',
+                'author': user.username}
+
+        response = moderator_client.post(self.url, data=data)
+        assert response.status_code == 201, (
+            'Проверьте, что модератор может создать задание модерации.'
+        )
+        job = response.json()
+        assert (job['status'], job['total'], job['processed']) == (
+            'done', 2, 2
+        ), 'Проверьте, что задание обрабатывает все подходящие отзывы.'
+        response = moderator_client.get(f'{self.url}{job["id"]}/')
+        assert response.json()['status'] == 'done'
+
+        reviews = admin_client.get(f'/api/v1/titles/{first}/reviews/').json()
+        assert [review['text'] for review in reviews['results']] == [
+            'хороший фильм'
+        ], 'Проверьте, что скрытые отзывы не выводятся в списке.'
+        assert Title.objects.get(pk=first).rating == 9, (
+            'Проверьте, что скрытые отзывы не учитываются в рейтинге.'
+        )
+        assert Title.objects.get(pk=second).rating is None
+
+        moderator_client.post(self.url, data={**data, 'action': 'unhide'})
+        assert Title.objects.get(pk=first).rating == 5, (
+            'Проверьте, что восстановленные отзывы снова учитываются '
+            'в рейтинге.'
+        )
+        assert Title.objects.get(pk=second).review_count == 1
+
+    def test_02_delete_in_chunks(self, settings, admin_client, admin, user,
+                                 user_client, moderator):
+        first, _ = create_spam(admin_client, user_client, admin)
+        settings.MODERATION_CHUNK_SIZE = 1
+        job = ModerationJob.objects.create(
+            moderator=moderator, target=ModerationJob.COMMENTS,
+            action=ModerationJob.DELETE, text='спам'
+        )
+        run_job(job)
+        assert list(Comment.objects.values_list('text', flat=True)) == [
+            'согласен'
+        ], 'Проверьте, что задание отбирает комментарии по фрагменту текста.'
+
+        job = ModerationJob.objects.create(
+            moderator=moderator, target=ModerationJob.REVIEWS,
+            action=ModerationJob.DELETE, author=user.username,
+            title_id=first
+        )
+        run_job(job)
+        job.refresh_from_db()
+        assert (job.status, job.total, job.processed) == ('done', 1, 1)
+        assert Review.objects.filter(author=user).count() == 1
+        assert not Comment.objects.exists(), (
+            'Проверьте, что при удалении отзывов удаляются '
+            'и комментарии к ним.'
+        )
+        title = Title.objects.get(pk=first)
+        assert (title.review_count, title.rating) == (1, 9)
+
+    def test_03_permissions_and_validation(self, user_client,
+                                           moderator_client):
+        data = {'target': 'comments', 'action': 'delete', 'text': 'спам'}
+        response = user_client.post(self.url, data=data)
+        assert response.status_code == 403, (
+            'Проверьте, что пользователь не может создать задание модерации.'
+        )
+        response = moderator_client.post(
+            self.url, data={'target': 'comments', 'action': 'delete'}
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что задание без фильтров отклоняется.'
+        )
+
+    def test_04_claim_and_repeated_chunks(self, admin_client, admin, user,
+                                          user_client, moderator):
+        first, _ = create_spam(admin_client, user_client, admin)
+        job = ModerationJob.objects.create(
+            moderator=moderator, target=ModerationJob.REVIEWS,
+            action=ModerationJob.HIDE, author=user.username,
+            status=ModerationJob.RUNNING, heartbeat=timezone.now()
+        )
+        assert run_job(job) is None, (
+            'Проверьте, что задание, которое выполняет другой процесс, '
+            'не обрабатывается повторно.'
+        )
+        assert not Review.objects.filter(is_hidden=True).exists()
+
+        ModerationJob.objects.filter(pk=job.pk).update(
+            heartbeat=timezone.now() - timedelta(hours=1))
+        job.refresh_from_db()
+        run_job(job)
+        job.refresh_from_db()
+        assert (job.status, job.processed) == ('done', 2), (
+            'Проверьте, что задание с истёкшей арендой продолжается.'
+        )
+
+        ids = list(Review.objects.values_list('pk', flat=True))
+        process_reviews(ModerationJob.HIDE, ids)
+        process_reviews(ModerationJob.HIDE, ids)
+        title = Title.objects.get(pk=first)
+        assert (title.review_count, title.rating) == (0, None), (
+            'Проверьте, что повторная обработка пачки не меняет рейтинг '
+            'дважды.'
+        )
@@ -0,0 +1,78 @@
+import pytest
+
+from reviews.models import Comment, CustomUser, Review, Title
+from reviews.purge import purge_deleted
+from tests.utils import (create_single_comment, create_single_review,
+                         create_titles)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16SoftDelete:
+
+    @pytest.fixture
+    def postponed_purge(self, monkeypatch):
+        """Фоновое удаление ещё не выполнено."""
+        monkeypatch.setattr(
+            'reviews.purge.run_after_commit', lambda *args: None
+        )
+
+    def test_01_title_soft_delete(self, postponed_purge, settings, client,
+                                  admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        review = create_single_review(user_client, title_id, 'текст', 7)
+        create_single_comment(
+            user_client, title_id, review.json()['id'], 'комментарий'
+        )
+
+        response = admin_client.delete(f'/api/v1/titles/{title_id}/')
+        assert response.status_code == 204
+        assert client.get(f'/api/v1/titles/{title_id}/').status_code == 404, (
+            'Проверьте, что удалённое произведение сразу скрывается.'
+        )
+        assert client.get(
+            f'/api/v1/titles/{title_id}/reviews/').status_code == 404
+        names = [title['name']
+                 for title in client.get('/api/v1/titles/').json()['results']]
+        assert titles[0]['name'] not in names
+        assert Review.objects.exists(), (
+            'Проверьте, что отзывы удаляются не в обработчике запроса, '
+            'а фоновой задачей.'
+        )
+
+        settings.DELETION_CHUNK_SIZE = 1
+        assert purge_deleted() == (1, 0)
+        assert not Title.objects.filter(pk=title_id).exists()
+        assert not Review.objects.exists()
+        assert not Comment.objects.exists()
+
+    def test_02_user_soft_delete(self, postponed_purge, client, admin_client,
+                                 user, user_client, moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(user_client, title_id, 'текст', 2)
+        review = create_single_review(moderator_client, title_id, 'текст', 8)
+        create_single_comment(
+            user_client, title_id, review.json()['id'], 'комментарий'
+        )
+
+        response = admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert response.status_code == 204
+        assert user_client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что удалённый пользователь сразу теряет доступ.'
+        )
+        assert admin_client.get(
+            f'/api/v1/users/{user.username}/').status_code == 404
+        reviews = client.get(f'/api/v1/titles/{title_id}/reviews/').json()
+        assert [item['score'] for item in reviews['results']] == [8], (
+            'Проверьте, что отзывы удалённого пользователя не выводятся.'
+        )
+
+        assert purge_deleted() == (0, 1)
+        assert not CustomUser.objects.filter(pk=user.pk).exists()
+        assert not Comment.objects.exists()
+        title = Title.objects.get(pk=title_id)
+        assert (title.review_count, title.rating) == (1, 8), (
+            'Проверьте, что после удаления отзывов пользователя '
+            'пересчитывается рейтинг.'
+        )
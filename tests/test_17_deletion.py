@@ -0,0 +1,126 @@
+import pytest
+from django.db import transaction
+
+from reviews.deletion import delete_queryset, pre_raw_delete
+from reviews.models import (Category, Comment, CustomUser, Genre,
+                            ModerationJob, Review, Title)
+
+MODELS = (CustomUser, Category, Genre, Title, Title.genre.through, Review,
+          Comment, ModerationJob)
+
+
+def snapshot():
+    return {
+        model.__name__: sorted(model._base_manager.values_list())
+        for model in MODELS
+    }
+
+
+def create_data():
+    authors = [
+        CustomUser.objects.create_user(
+            username=f'author{number}', email=f'author{number}@yamdb.fake'
+        )
+        for number in range(3)
+    ]
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genres = [Genre.objects.create(name=slug, slug=slug)
+              for slug in ('drama', 'comedy')]
+    titles = []
+    for number in range(2):
+        title = Title.objects.create(
+            name=f'Произведение {number}', year=2000, description='',
+            category=category
+        )
+        title.genre.set(genres)
+        titles.append(title)
+    for title in titles:
+        for score, author in enumerate(authors, 2):
+            review = Review.objects.create(
+                title=title, author=author, text='отзыв', score=score
+            )
+            for commenter in authors:
+                Comment.objects.create(
+                    review=review, author=commenter, text='комментарий'
+                )
+    ModerationJob.objects.create(
+        moderator=authors[0], target=ModerationJob.COMMENTS,
+        action=ModerationJob.HIDE, text='спам'
+    )
+    return authors, titles
+
+
+def forbid_loading(monkeypatch):
+    def from_db(cls, *args):
+        raise AssertionError(
+            f'Проверьте, что при удалении не загружаются объекты '
+            f'{cls.__name__}.'
+        )
+    for model in (Review, Comment):
+        monkeypatch.setattr(model, 'from_db', classmethod(from_db))
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17Deletion:
+
+    @pytest.mark.parametrize('target', ('user', 'title', 'review', 'users'))
+    def test_01_same_result_as_collector(self, target, monkeypatch):
+        authors, titles = create_data()
+        queryset = {
+            'user': CustomUser.objects.filter(pk=authors[0].pk),
+            'title': Title.objects.filter(pk=titles[0].pk),
+            'review': Review.objects.filter(author=authors[1],
+                                            title=titles[1]),
+            'users': CustomUser.objects.all(),
+        }[target]
+        with transaction.atomic():
+            expected_count = queryset.delete()
+            expected = snapshot()
+            transaction.set_rollback(True)
+
+        forbid_loading(monkeypatch)
+        count = delete_queryset(queryset, chunk_size=2)
+        assert snapshot() == expected, (
+            'Проверьте, что delete_queryset приводит БД в то же состояние, '
+            'что и QuerySet.delete().'
+        )
+        assert count == expected_count
+
+    def test_02_review_destroy(self, admin_client, admin, user, user_client):
+        _, titles = create_data()
+        review = Review.objects.create(
+            title=titles[0], author=user, text='отзыв', score=10
+        )
+        Comment.objects.create(review=review, author=admin, text='ответ')
+        response = user_client.delete(
+            f'/api/v1/titles/{titles[0].pk}/reviews/{review.pk}/'
+        )
+        assert response.status_code == 204
+        assert not Comment.objects.filter(review_id=review.pk).exists()
+        title = Title.objects.get(pk=titles[0].pk)
+        assert (title.review_count, title.rating) == (3, 3), (
+            'Проверьте, что удаление отзыва обновляет рейтинг.'
+        )
+
+    def test_03_review_destroy_atomic(self, admin, user, user_client):
+        _, titles = create_data()
+        review = Review.objects.create(
+            title=titles[0], author=user, text='отзыв', score=10
+        )
+        Comment.objects.create(review=review, author=admin, text='ответ')
+
+        def fail(sender, **kwargs):
+            raise RuntimeError('сбой после удаления комментариев')
+
+        pre_raw_delete.connect(fail, sender=Review)
+        try:
+            with pytest.raises(RuntimeError):
+                user_client.delete(
+                    f'/api/v1/titles/{titles[0].pk}/reviews/{review.pk}/'
+                )
+        finally:
+            pre_raw_delete.disconnect(fail, sender=Review)
+        assert Comment.objects.filter(review_id=review.pk).exists(), (
+            'Проверьте, что отзыв удаляется вместе с комментариями '
+            'одной транзакцией.'
+        )
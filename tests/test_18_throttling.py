@@ -0,0 +1,65 @@
+import pytest
+
+from api.throttling import LocalBucketStore
+
+
+def set_rates(settings, **rates):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {
+            **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], **rates
+        },
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18Throttling:
+
+    def test_01_token_bucket(self):
+        store = LocalBucketStore(shards=2)
+        results = [store.consume('key', 2, 1, 100)[0] for _ in range(3)]
+        assert results == [True, True, False], (
+            'Проверьте, что ведро пропускает не больше ёмкости подряд.'
+        )
+        assert store.consume('key', 2, 1, 100) == (False, 1)
+        assert store.consume('key', 2, 1, 101)[0], (
+            'Проверьте, что ведро пополняется со временем.'
+        )
+        assert store.consume('other', 2, 1, 101)[0]
+
+    @pytest.mark.parametrize('store', ('local', 'cache'))
+    def test_02_reads_throttle(self, store, settings, client, user_client):
+        settings.THROTTLE_STORE = store
+        set_rates(settings, reads='3/min')
+        statuses = [client.get('/api/v1/genres/').status_code
+                    for _ in range(4)]
+        assert statuses == [200, 200, 200, 429], (
+            'Проверьте, что чтение ограничивается по частоте.'
+        )
+        response = client.get('/api/v1/genres/')
+        assert 'Retry-After' in response, (
+            'Проверьте, что ответ 429 содержит заголовок Retry-After.'
+        )
+        assert user_client.get('/api/v1/genres/').status_code == 200, (
+            'Проверьте, что у каждого пользователя своё ведро.'
+        )
+
+    def test_03_signup_throttle(self, settings, client):
+        set_rates(settings, signup='2/hour')
+        statuses = [
+            client.post('/api/v1/auth/signup/', data={
+                'username': f'user{number}',
+                'email': f'user{number}@yamdb.fake',
+            }).status_code
+            for number in range(3)
+        ]
+        assert statuses == [200, 200, 429], (
+            'Проверьте, что регистрация ограничивается по частоте.'
+        )
+        response = client.post('/api/v1/auth/signup/', data={
+            'username': 'spoofed', 'email': 'spoofed@yamdb.fake',
+        }, HTTP_X_FORWARDED_FOR='203.0.113.7')
+        assert response.status_code == 429, (
+            'Проверьте, что заголовок X-Forwarded-For от клиента не '
+            'сбрасывает ограничение частоты.'
+        )
@@ -0,0 +1,44 @@
+import pytest
+from django.core import mail
+
+from reviews.models import CustomUser
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19SignUp:
+    url = '/api/v1/auth/signup/'
+    data = {'username': 'new_user', 'email': 'new_user@yamdb.fake'}
+
+    def test_01_new_user(self, client, django_assert_num_queries):
+        with django_assert_num_queries(2):
+            response = client.post(self.url, data=self.data)
+        assert response.status_code == 200, (
+            'Проверьте, что регистрация выполняется одним запросом на '
+            'поиск и одним на вставку пользователя.'
+        )
+        user = CustomUser.objects.get(username=self.data['username'])
+        assert user.confirmation_code, (
+            'Проверьте, что код подтверждения сохраняется при создании '
+            'пользователя.'
+        )
+        assert user.confirmation_code in mail.outbox[-1].body
+
+    def test_02_conflicts(self, client, django_assert_num_queries):
+        client.post(self.url, data=self.data)
+        with django_assert_num_queries(1):
+            response = client.post(self.url, data=self.data)
+        assert response.status_code == 200
+
+        conflicts = {
+            'username': {**self.data, 'email': 'other@yamdb.fake'},
+            'email': {**self.data, 'username': 'other'},
+        }
+        for field, data in conflicts.items():
+            with django_assert_num_queries(1):
+                response = client.post(self.url, data=data)
+            assert response.status_code == 400
+            assert list(response.json()) == [field], (
+                f'Проверьте, что при занятом `{field}` ошибка указывает '
+                'на это поле.'
+            )
+        assert CustomUser.objects.count() == 1
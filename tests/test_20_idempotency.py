@@ -0,0 +1,80 @@
+import pytest
+
+from reviews.models import Comment, Review
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20Idempotency:
+
+    def test_01_review_retry(self, admin_client, user_client,
+                             moderator_client, django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        data = {'text': 'отзыв', 'score': 7}
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'retry-1'}
+
+        first = user_client.post(url, data=data, format='json', **headers)
+        assert first.status_code == 201
+        with django_assert_num_queries(0):
+            retry = user_client.post(url, data=data, format='json',
+                                     **headers)
+        assert retry.status_code == 201, (
+            'Проверьте, что повтор запроса с тем же Idempotency-Key '
+            'возвращает сохранённый ответ без обращения к БД.'
+        )
+        assert retry.json() == first.json()
+        assert retry['Idempotent-Replayed'] == 'true'
+        assert retry['Vary'] == first['Vary'], (
+            'Проверьте, что повтор возвращает заголовки сохранённого ответа.'
+        )
+        assert Review.objects.count() == 1
+
+        response = user_client.post(url, data={**data, 'score': 1},
+                                    format='json', **headers)
+        assert response.status_code == 422, (
+            'Проверьте, что повтор ключа с другими данными отклоняется.'
+        )
+        response = moderator_client.post(url, data=data, format='json',
+                                         **headers)
+        assert response.status_code == 201, (
+            'Проверьте, что ключи идемпотентности разных пользователей '
+            'не пересекаются.'
+        )
+
+    def test_02_comment_retry(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        review = create_single_review(admin_client, title_id, 'текст', 5)
+        url = f'/api/v1/titles/{title_id}/reviews/{review.json()["id"]}/'
+        url += 'comments/'
+        for _ in range(3):
+            response = user_client.post(
+                url, data={'text': 'комментарий'},
+                HTTP_IDEMPOTENCY_KEY='comment-1'
+            )
+            assert response.status_code == 201
+        assert Comment.objects.count() == 1, (
+            'Проверьте, что повторы запроса с Idempotency-Key не создают '
+            'дубликаты комментариев.'
+        )
+        for _ in range(2):
+            user_client.post(url, data={'text': 'комментарий'})
+        assert Comment.objects.count() == 3, (
+            'Проверьте, что запросы без Idempotency-Key не изменились.'
+        )
+
+    def test_03_inactive_user_retry(self, admin_client, user_client, user):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        data = {'text': 'отзыв', 'score': 7}
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'retry-inactive'}
+        first = user_client.post(url, data=data, format='json', **headers)
+        assert first.status_code == 201
+        user.is_active = False
+        user.save()
+        retry = user_client.post(url, data=data, format='json', **headers)
+        assert retry.status_code == 401, (
+            'Проверьте, что заблокированный пользователь не получает '
+            'сохранённый ответ.'
+        )
@@ -0,0 +1,51 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+
+from api.permissions import can_modify, is_owner
+from reviews.models import Comment, CustomUser, Review
+from tests.utils import create_comments
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21Permissions:
+
+    def test_01_capabilities(self, admin, moderator, user, user_superuser):
+        expected = {
+            user: 0,
+            moderator: CustomUser.CAN_MODERATE,
+            admin: CustomUser.ALL_CAPABILITIES,
+            user_superuser: CustomUser.ALL_CAPABILITIES,
+        }
+        for account, capabilities in expected.items():
+            assert account.capabilities == capabilities, (
+                'Проверьте битовую маску возможностей роли '
+                f'`{account.role}`.'
+            )
+
+    def test_02_object_checks_without_queries(
+            self, admin_client, admin, user, user_client, moderator,
+            moderator_client, django_assert_num_queries):
+        create_comments(admin_client, {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client,
+        })
+        accounts = [CustomUser.objects.get(pk=account.pk)
+                    for account in (user, moderator)]
+        objects = list(Review.objects.all()) + list(Comment.objects.all())
+        with django_assert_num_queries(0):
+            editable = {
+                account.username: [
+                    obj for obj in objects if can_modify(account, obj)
+                ]
+                for account in accounts
+            }
+            assert is_owner(accounts[0], accounts[0])
+            assert not can_modify(AnonymousUser(), objects[0])
+        assert editable[user.username] == [
+            obj for obj in objects if obj.author_id == user.pk
+        ], 'Проверьте, что пользователь может изменять только свои объекты.'
+        assert editable[moderator.username] == objects, (
+            'Проверьте, что модератор может изменять любые отзывы '
+            'и комментарии.'
+        )
@@ -0,0 +1,83 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Genre
+from reviews.reference_cache import genres
+from tests.utils import create_titles
+
+
+def reference_queries(queries, table):
+    return [query['sql'] for query in queries
+            if f'"reviews_{table}"' in query['sql']]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22ReferenceCache:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_no_reference_queries(self, client, admin_client):
+        titles, categories, genre_list = create_titles(admin_client)
+        client.get(self.TITLES_URL)
+        data = {
+            'name': 'Чужие',
+            'year': 1986,
+            'genre': [genre_list[0]['slug'], genre_list[2]['slug']],
+            'category': categories[0]['slug'],
+            'description': 'Get away from her!'
+        }
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(self.TITLES_URL, data=data)
+        assert response.status_code == HTTPStatus.CREATED
+        assert not (reference_queries(context.captured_queries, 'genre')
+                    + reference_queries(context.captured_queries,
+                                        'category')), (
+            'Проверьте, что слаги жанров и категорий и их вывод в '
+            'созданном произведении берутся из справочника в памяти '
+            'процесса.'
+        )
+        with CaptureQueriesContext(connection) as context:
+            listing = client.get(self.TITLES_URL)
+        assert not reference_queries(context.captured_queries,
+                                     'category'), (
+            'Проверьте, что категории произведений берутся из справочника '
+            'в памяти процесса.'
+        )
+        assert len(reference_queries(context.captured_queries,
+                                     'genre')) == 1, (
+            'Проверьте, что жанры произведений загружаются одним запросом '
+            'prefetch_related.'
+        )
+        assert response.json()['genre'] == sorted(
+            [genre_list[0], genre_list[2]], key=lambda genre: genre['name']
+        ), 'Проверьте вывод жанров только что созданного произведения.'
+        results = {title['id']: title for title in listing.json()['results']}
+        assert results[titles[1]['id']]['category'] == categories[1], (
+            'Проверьте вывод категории произведения.'
+        )
+
+    def test_02_invalidation(self, client, admin_client):
+        titles, _, genre_list = create_titles(admin_client)
+        client.get(self.TITLES_URL)
+        genre = Genre.objects.get(slug=genre_list[2]['slug'])
+        genre.name = 'Боевик'
+        genre.save()
+        response = client.get(f'{self.TITLES_URL}{titles[1]["id"]}/')
+        assert response.json()['genre'] == [
+            {'name': 'Боевик', 'slug': genre.slug}
+        ], (
+            'Проверьте, что изменение жанра сбрасывает справочник '
+            'в памяти процесса.'
+        )
+
+    def test_03_unknown_slug_falls_back_to_database(self):
+        genres.get(None)
+        genre = Genre(name='Нуар', slug='noir')
+        Genre.objects.bulk_create([genre])
+        assert list(genres.by_slugs(['noir', 'missing'])) == ['noir'], (
+            'Проверьте, что слаг, которого нет в копии справочника, '
+            'ищется в БД.'
+        )
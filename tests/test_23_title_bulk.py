@@ -0,0 +1,72 @@
+import pytest
+
+from reviews.genre_index import bitmap_to_ids, genre_index
+from reviews.models import Title
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23TitleBulk:
+
+    URL = '/api/v1/titles/bulk/'
+
+    def test_01_upsert(self, admin_client, client,
+                       django_assert_max_num_queries):
+        titles, categories, genres = create_titles(admin_client)
+        horror, comedy, drama = (genre['slug'] for genre in genres)
+        items = [
+            {'name': 'Чужие', 'year': 1986, 'description': 'Сиквел',
+             'genre': [horror, drama], 'category': categories[0]['slug']},
+            {'id': titles[0]['id'], 'name': 'Терминатор 2', 'year': 1991,
+             'description': 'Судный день', 'genre': [comedy],
+             'category': categories[1]['slug']},
+            {'name': 'Нет жанра', 'year': 2000, 'description': '-',
+             'genre': ['unknown'], 'category': categories[0]['slug']},
+            {'id': 0, 'name': 'Нет произведения', 'year': 2000,
+             'description': '-', 'genre': [],
+             'category': categories[0]['slug']},
+            {'name': 'Без года', 'description': '-', 'genre': [],
+             'category': categories[0]['slug']},
+        ]
+        with django_assert_max_num_queries(10):
+            response = admin_client.post(self.URL, data=items, format='json')
+        assert response.status_code == 207, (
+            'Проверьте, что при частичном успехе пакетной загрузки '
+            'возвращается ответ со статусом 207.'
+        )
+        results = response.json()
+        assert [item['status'] for item in results] == [
+            201, 200, 400, 404, 400
+        ], 'Проверьте статусы элементов пакетной загрузки произведений.'
+        created = Title.objects.get(pk=results[0]['data']['id'])
+        assert created.name == 'Чужие' and created.rating is None
+        updated = client.get(f'/api/v1/titles/{titles[0]["id"]}/').json()
+        assert updated['name'] == 'Терминатор 2'
+        assert [genre['slug'] for genre in updated['genre']] == [comedy], (
+            'Проверьте, что жанры перезаписанного произведения заменяются.'
+        )
+        assert updated['category'] == categories[1]
+        assert bitmap_to_ids(genre_index.resolve(all_of=[horror])) == [
+            created.pk
+        ], 'Проверьте, что пакетная загрузка обновляет индекс жанров.'
+
+    def test_02_permissions_and_limits(self, admin_client, user_client,
+                                       settings):
+        _, categories, genres = create_titles(admin_client)
+        item = {'name': 'Фильм', 'year': 2000, 'description': '-',
+                'genre': [genres[0]['slug']],
+                'category': categories[0]['slug']}
+        response = user_client.post(self.URL, data=[item], format='json')
+        assert response.status_code == 403, (
+            'Проверьте, что пакетная загрузка доступна только администратору.'
+        )
+        settings.TITLE_BULK_MAX_ITEMS = 2
+        response = admin_client.post(
+            self.URL, data=[item] * 3, format='json')
+        assert response.status_code == 400, (
+            'Проверьте ограничение размера пакета произведений.'
+        )
+        response = admin_client.post(
+            self.URL, data=[item] * 2, format='json')
+        assert response.status_code == 201
+        assert Title.objects.filter(name='Фильм').count() == 2
@@ -0,0 +1,73 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_comments
+
+
+def captured_sql(context):
+    return ' '.join(query['sql'] for query in context.captured_queries)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24SparseFields:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_titles(self, client, admin_client, user_client, admin,
+                       user):
+        create_comments(admin_client, {admin: admin_client,
+                                       user: user_client})
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f'{self.TITLES_URL}?fields=id,name')
+        results = response.json()['results']
+        assert results and all(
+            list(title) == ['id', 'name'] for title in results
+        ), 'Проверьте, что параметр `fields` ограничивает поля ответа.'
+        assert '"description"' not in captured_sql(context), (
+            'Проверьте, что невыводимые колонки не загружаются из БД.'
+        )
+        assert '"reviews_genre"' not in captured_sql(context), (
+            'Проверьте, что жанры не загружаются, если они не выводятся.'
+        )
+        response = client.get(
+            f'{self.TITLES_URL}{results[0]["id"]}/?omit=description,rating'
+        )
+        assert list(response.json()) == [
+            'id', 'name', 'year', 'genre', 'category', 'weighted_rating'
+        ], 'Проверьте, что параметр `omit` исключает поля из ответа.'
+        response = client.get(f'{self.TITLES_URL}?fields=id,secret')
+        assert response.status_code == 400, (
+            'Проверьте, что запрос неизвестных полей возвращает ошибку 400.'
+        )
+
+    def test_02_reviews_and_comments(self, client, admin_client,
+                                     user_client, admin, user):
+        _, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client})
+        title_id = titles[0]['id']
+        review_id = reviews[0]['id']
+        url = f'{self.TITLES_URL}{title_id}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f'{url}?omit=text,author')
+        sql = captured_sql(context)
+        assert all('text' not in review and 'author' not in review
+                   for review in response.json()['results'])
+        assert '"reviews_review"."text"' not in sql, (
+            'Проверьте, что текст отзыва не загружается, если он не нужен.'
+        )
+        assert '"reviews_customuser"."username"' not in sql, (
+            'Проверьте, что автор не загружается, если он не выводится.'
+        )
+        response = client.get(
+            f'{url}{review_id}/comments/?fields=author,id')
+        results = response.json()['results']
+        assert results and all(
+            list(comment) == ['id', 'author'] for comment in results
+        ), 'Проверьте параметр `fields` в списке комментариев.'
+        response = user_client.patch(
+            f'{url}{reviews[1]["id"]}/?fields=id', data={'score': 3})
+        assert 'text' in response.json(), (
+            'Проверьте, что параметры `fields` и `omit` не влияют '
+            'на изменяющие запросы.'
+        )
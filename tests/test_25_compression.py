@@ -0,0 +1,91 @@
+import gzip
+import json
+
+import pytest
+
+from api.compression import choose_encoding
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25Compression:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_choose_encoding(self):
+        encodings = ['br', 'gzip']
+        assert choose_encoding('gzip, br', encodings) == 'br'
+        assert choose_encoding('br;q=0, gzip;q=0.5', encodings) == 'gzip'
+        assert choose_encoding('*', encodings) == 'br'
+        assert choose_encoding('identity', encodings) is None
+        assert choose_encoding(None, encodings) is None
+
+    def test_02_cached_compressed_catalog(self, client, admin_client,
+                                          user_client, settings,
+                                          django_assert_num_queries):
+        settings.RESPONSE_COMPRESSION_ENCODINGS = ('gzip',)
+        settings.RESPONSE_COMPRESSION_MIN_SIZE = 100
+        titles, _, _ = create_titles(admin_client)
+        plain = client.get(self.TITLES_URL)
+        with django_assert_num_queries(0):
+            response = client.get(self.TITLES_URL,
+                                  HTTP_ACCEPT_ENCODING='gzip')
+        assert response['Content-Encoding'] == 'gzip', (
+            'Проверьте, что ответ каталога сжимается для клиентов, '
+            'принимающих gzip.'
+        )
+        assert 'Accept-Encoding' in response['Vary']
+        assert json.loads(gzip.decompress(response.content)) == plain.json(), (
+            'Проверьте, что сжатый ответ из кеша совпадает с исходным.'
+        )
+
+        url = f'{self.TITLES_URL}{titles[0]["id"]}/'
+        other_url = f'{self.TITLES_URL}{titles[1]["id"]}/'
+        top_url = f'{self.TITLES_URL}top/?by=rating'
+        assert client.get(url).json()['rating'] is None
+        client.get(other_url)
+        client.get(top_url)
+        create_single_review(user_client, titles[0]['id'], 'text', 7)
+        assert client.get(url).json()['rating'] == 7, (
+            'Проверьте, что изменение рейтинга сбрасывает кеш страницы '
+            'произведения.'
+        )
+        assert client.get(top_url).json()[0]['rating'] == 7, (
+            'Проверьте, что изменение рейтинга сбрасывает кеш лучших '
+            'произведений.'
+        )
+        with django_assert_num_queries(0):
+            client.get(other_url)
+        admin_client.patch(url, data={'name': 'Новое название'})
+        assert client.get(url).json()['name'] == 'Новое название', (
+            'Проверьте, что изменение произведения сбрасывает кеш ответов.'
+        )
+
+    def test_03_not_cached(self, client, admin_client, settings,
+                           django_assert_max_num_queries):
+        settings.RESPONSE_COMPRESSION_MIN_SIZE = 100
+        create_titles(admin_client)
+        admin_client.get(self.TITLES_URL)
+        with django_assert_max_num_queries(10) as context:
+            admin_client.get(self.TITLES_URL)
+        assert len(context.captured_queries) > 0, (
+            'Проверьте, что ответы аутентифицированным пользователям '
+            'не берутся из кеша.'
+        )
+        settings.RESPONSE_COMPRESSION_MIN_SIZE = 10 ** 6
+        response = client.get('/api/v1/genres/', HTTP_ACCEPT_ENCODING='gzip')
+        assert not response.has_header('Content-Encoding'), (
+            'Проверьте, что ответы меньше минимального размера не сжимаются.'
+        )
+
+    def test_04_key_includes_host(self, client, admin_client):
+        create_titles(admin_client)
+        url = f'{self.TITLES_URL}?limit=1'
+        forged = client.get(url, HTTP_HOST='evil.example')
+        assert forged.json()['next'].startswith('http://evil.example/')
+        response = client.get(url, HTTP_HOST='api.example.com')
+        assert response.json()['next'].startswith(
+            'http://api.example.com/'), (
+            'Проверьте, что ключ кеша ответов включает Host: иначе '
+            'ссылки next и previous берутся из чужого запроса.'
+        )
@@ -0,0 +1,58 @@
+import csv
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Count
+
+from reviews.models import Comment, Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test26GenerateData:
+
+    OPTIONS = {'titles': 30, 'users': 40, 'reviews': 200, 'comments': 50,
+               'seed': 7}
+
+    def read(self, path):
+        with open(path, encoding='utf-8', newline='') as file:
+            return list(csv.reader(file))
+
+    def test_01_csv_deterministic(self, tmp_path):
+        call_command('generatedata', csv=str(tmp_path / 'one'), workers=1,
+                     **self.OPTIONS)
+        call_command('generatedata', csv=str(tmp_path / 'two'), workers=2,
+                     **self.OPTIONS)
+        for name in ('users.csv', 'titles.csv', 'genre_title.csv',
+                     'review.csv', 'comments.csv'):
+            assert (self.read(tmp_path / 'one' / name)
+                    == self.read(tmp_path / 'two' / name)), (
+                'Проверьте, что при одинаковом seed результат не зависит '
+                'от количества процессов.'
+            )
+        reviews = self.read(tmp_path / 'one' / 'review.csv')
+        assert reviews[0] == ['id', 'title_id', 'text', 'author_id',
+                              'score', 'pub_date']
+        pairs = [(row[1], row[3]) for row in reviews[1:]]
+        assert len(pairs) == len(set(pairs)), (
+            'Проверьте, что у пары (произведение, автор) не больше '
+            'одного отзыва.'
+        )
+
+    def test_02_database(self):
+        call_command('generatedata', workers=1, **self.OPTIONS)
+        assert Title.objects.count() == self.OPTIONS['titles']
+        assert Comment.objects.count() == self.OPTIONS['comments']
+        counts = sorted(
+            Review.objects.order_by().values('title')
+            .annotate(total=Count('pk'))
+            .values_list('total', flat=True), reverse=True
+        )
+        assert counts[0] > 3 * counts[len(counts) // 2], (
+            'Проверьте, что отзывы распределены по произведениям '
+            'неравномерно (закон Ципфа).'
+        )
+        title = Title.objects.order_by('-review_count').first()
+        assert title.review_count == counts[0], (
+            'Проверьте, что после генерации пересчитывается рейтинг.'
+        )
+        assert title.genre.exists()